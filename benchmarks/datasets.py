@@ -0,0 +1,119 @@
+"""
+Module for generating synthetic CSV files for the benchmarks.
+
+Every shape stresses a different part of the pipeline:
+
+- tall: many rows of a few numeric and short text columns
+- wide: few rows of many columns
+- high_cardinality: text columns that are nearly unique per row
+- dates: dates and timestamps in several formats
+- nulls: mostly missing values in every type of column
+- quoted: text with embedded commas, quotes and newlines
+
+Files are generated from a seed, so the same shape, rows and seed always
+give the same bytes and runs on different machines or commits measure the
+same input.
+"""
+
+import string
+import zlib
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+def _tall(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'amount': rng.normal(100, 25, rows).round(2),
+        'quantity': rng.integers(0, 1000, rows),
+        'region': rng.choice(['north', 'south', 'east', 'west'], rows),
+        'active': rng.choice(['true', 'false'], rows)
+    })
+
+def _wide(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    # Same number of cells as the other shapes, spread over 200 columns
+    rows = max(rows // 40, 10)
+    columns = {}
+    for i in range(100):
+        columns[f'int_{i}'] = rng.integers(0, 10000, rows)
+        columns[f'float_{i}'] = rng.random(rows).round(4)
+    return pd.DataFrame(columns)
+
+def _high_cardinality(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    letters = np.array(list(string.ascii_lowercase + string.digits))
+    codes = [''.join(row) for row in rng.choice(letters, (rows, 16))]
+    return pd.DataFrame({
+        'code': codes,
+        'email': [f"{code[:8]}@example.{code[8:11]}" for code in codes],
+        'score': rng.integers(0, 100, rows)
+    })
+
+def _dates(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    start = np.datetime64('2000-01-01T00:00:00')
+    seconds = rng.integers(0, 25 * 365 * 86400, rows)
+    stamps = pd.to_datetime(start + seconds.astype('timedelta64[s]'))
+    return pd.DataFrame({
+        'day': stamps.strftime('%Y-%m-%d'),
+        'us_day': stamps.strftime('%m/%d/%Y'),
+        'timestamp': stamps.strftime('%Y-%m-%d %H:%M:%S'),
+        'value': rng.normal(0, 1, rows).round(3)
+    })
+
+def _nulls(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    frame = pd.DataFrame({
+        'amount': rng.normal(100, 25, rows).round(2),
+        'count': rng.integers(0, 100, rows).astype(float),
+        'label': rng.choice(['a', 'b', 'c'], rows).astype(object),
+        'note': rng.choice(['ok', 'late', 'missing'], rows).astype(object)
+    })
+    for column, share in zip(frame.columns, (0.6, 0.75, 0.9, 0.99)):
+        frame.loc[rng.random(rows) < share, column] = None
+    return frame
+
+def _quoted(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    fragments = np.array(['plain', 'with, comma', 'with "quotes"', 'two\nlines', 'trailing space ', ''])
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'comment': [' '.join(row) for row in rng.choice(fragments, (rows, 3))],
+        'rating': rng.integers(1, 6, rows)
+    })
+
+SHAPES: Dict[str, Callable[[np.random.Generator, int], pd.DataFrame]] = {
+    'tall': _tall,
+    'wide': _wide,
+    'high_cardinality': _high_cardinality,
+    'dates': _dates,
+    'nulls': _nulls,
+    'quoted': _quoted
+}
+
+def generate(shape: str, rows: int, seed: int, data_dir: Path) -> Path:
+    """
+    Write a synthetic CSV file, unless it was already generated.
+
+    Args:
+        shape (str): One of SHAPES.
+        rows (int): Number of rows; the wide shape scales it down to keep
+            the number of cells comparable.
+        seed (int): Seed of the random generator.
+        data_dir (Path): Directory the file is written to.
+
+    Returns:
+        Path: Path of the CSV file.
+
+    Raises:
+        KeyError: If the shape is unknown.
+    """
+    build = SHAPES[shape]
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    path = data_dir / f"{shape}_{rows}_{seed}.csv"
+    if not path.exists():
+        # Each shape gets its own stream, so adding shapes changes no other file
+        rng = np.random.default_rng([seed, zlib.crc32(shape.encode())])
+        temporary = path.with_suffix('.tmp')
+        build(rng, rows).to_csv(temporary, index=False)
+        temporary.replace(path)
+    return path
@@ -0,0 +1,102 @@
+"""
+Module for the databases the load benchmarks run against.
+
+With a local Postgres, each run gets a throwaway database that is dropped
+afterwards. Without one, RecordingPools stands in for PoolManager: its
+connections answer the loader's queries, record every call, and consume
+the COPY records, so the conversion of the rows is still measured, just
+not the network and the server.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+class RecordingConnection:
+    """Connection stand-in that records the calls DBLoader makes."""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+        self.calls.append({'call': 'fetchval', 'query': query})
+        # Every table exists and is empty
+        return 0 if 'COUNT(' in query.upper() else True
+
+    async def execute(self, query: str, *args: Any) -> str:
+        self.calls.append({'call': 'execute', 'query': query})
+        return 'OK'
+
+    async def reload_schema_state(self):
+        self.calls.append({'call': 'reload_schema_state'})
+
+    async def copy_records_to_table(self, table_name: str, records: Iterable[tuple], columns: List[str]) -> str:
+        rows = sum(1 for _ in records)
+        self.calls.append({'call': 'copy_records_to_table', 'table': table_name, 'rows': rows})
+        return f'COPY {rows}'
+
+class RecordingPools:
+    """PoolManager stand-in whose connections are RecordingConnections."""
+
+    def __init__(self):
+        self.connection = RecordingConnection()
+
+    @asynccontextmanager
+    async def acquire(self, database: str) -> AsyncIterator[RecordingConnection]:
+        yield self.connection
+
+    async def close(self):
+        pass
+
+async def postgres_available(db_config: Dict[str, Any]) -> bool:
+    """
+    Check whether Postgres accepts connections with the given settings.
+
+    Args:
+        db_config (Dict[str, Any]): Connection settings.
+
+    Returns:
+        bool: Whether a connection could be made.
+    """
+    if not db_config.get('password'):
+        return False
+    try:
+        conn = await asyncpg.connect(**db_config, database='postgres', timeout=5)
+    except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as e:
+        logger.info(f"Postgres is not available ({e}); using the recorded stand-in")
+        return False
+    await conn.close()
+    return True
+
+@asynccontextmanager
+async def throwaway_database(db_config: Dict[str, Any]) -> AsyncIterator[str]:
+    """
+    Create a database for one benchmark run and drop it afterwards.
+
+    Args:
+        db_config (Dict[str, Any]): Connection settings.
+
+    Yields:
+        str: Name of the database.
+    """
+    name = f"benchmark_{os.getpid()}_{int(time.time())}"
+    conn = await asyncpg.connect(**db_config, database='postgres')
+    try:
+        await conn.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await conn.close()
+    try:
+        yield name
+    finally:
+        conn = await asyncpg.connect(**db_config, database='postgres')
+        try:
+            await conn.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        finally:
+            await conn.close()
@@ -0,0 +1,303 @@
+"""
+Benchmarks of the pipeline's hot paths on synthetic datasets.
+
+For every dataset shape, the profiler, the CSV loader, the cleaner, the
+SQL type mapping, the visualizer and the database load are timed several
+times, and the results are written as JSON. Passing the JSON of an earlier
+run as the baseline compares the two and fails on regressions.
+
+Usage:
+    poetry run python -m benchmarks.run --rows 100000 --repeat 5
+    poetry run python -m benchmarks.run --baseline benchmarks/results/<earlier>.json
+
+The database load runs against a throwaway database on the Postgres set up
+through the usual DB_* settings, or against a recorded stand-in when that
+is not available (or with --db stand-in).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datasets import SHAPES, generate
+from benchmarks.db import RecordingPools, postgres_available, throwaway_database
+from data_pipeline.cleaning.cleaner import DataCleaner
+from data_pipeline.config import Config
+from data_pipeline.ingest.files import CSVLoader
+from data_pipeline.ingest.loader import DBLoader
+from data_pipeline.ingest.pool import PoolManager
+from data_pipeline.profiling.profiler import DataProfiler
+from data_pipeline.visualize.visualizer import Visualizer
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = Path(__file__).parent
+
+async def measure(
+    run: Callable[[], Awaitable[Any]],
+    repeat: int,
+    setup: Optional[Callable[[], Awaitable[Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Time a coroutine function over several runs.
+
+    Args:
+        run (Callable[[], Awaitable[Any]]): Code to time.
+        repeat (int): Number of timed runs.
+        setup (Optional[Callable[[], Awaitable[Any]]]): Awaited before every
+            run, outside the timing.
+
+    Returns:
+        Dict[str, Any]: Durations of the runs in seconds with their minimum,
+            median and mean.
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            await setup()
+        started = time.perf_counter()
+        await run()
+        durations.append(time.perf_counter() - started)
+    return {
+        'runs': durations,
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'mean': statistics.fmean(durations)
+    }
+
+async def benchmark_shape(
+    shape: str,
+    rows: int,
+    seed: int,
+    repeat: int,
+    db_loader: DBLoader,
+    db_name: str,
+    output_dir: Path
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every benchmark on one dataset shape.
+
+    Args:
+        shape (str): Dataset shape.
+        rows (int): Rows of the dataset.
+        seed (int): Seed of the dataset.
+        repeat (int): Timed runs per benchmark.
+        db_loader (DBLoader): Loader of the database to load into.
+        db_name (str): Name of the database to load into.
+        output_dir (Path): Directory the charts are written to.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Timings by benchmark name.
+    """
+    path = generate(shape, rows, seed, BENCHMARK_DIR / 'data')
+    profiler = DataProfiler()
+    csv_loader = CSVLoader(path.parent)
+    cleaner = DataCleaner()
+    visualizer = Visualizer(str(output_dir))
+    table_name = f"bench_{shape}"
+
+    profile = await profiler.profile_csv(str(path))
+    df = await csv_loader.load_csv(path.name)
+    cleaned = await cleaner.clean_data(df, profile)
+    sql_data_types = cleaner.get_sql_data_types(profile)
+
+    async def sql_types():
+        cleaner.get_sql_data_types(profile)
+
+    async def visualize():
+        charts = await visualizer.aggregate(cleaned)
+        await visualizer.create_visualizations(charts, table_name, profile['full_profile'])
+
+    async def empty_table():
+        await db_loader.drop_table(db_name, table_name)
+        await db_loader.create_table(db_name, table_name, cleaned, sql_data_types)
+
+    results = {
+        'profile_csv': await measure(lambda: profiler.profile_csv(str(path)), repeat),
+        'load_csv': await measure(lambda: csv_loader.load_csv(path.name), repeat),
+        'clean_data': await measure(lambda: cleaner.clean_data(df, profile), repeat),
+        'get_sql_data_types': await measure(sql_types, repeat),
+        'visualize': await measure(visualize, repeat),
+        'insert_data': await measure(
+            lambda: db_loader.insert_data(db_name, table_name, cleaned, sql_data_types), repeat, setup=empty_table
+        )
+    }
+    await db_loader.drop_table(db_name, table_name)
+    for timing in results.values():
+        timing['rows'] = len(df)
+        timing['bytes'] = path.stat().st_size
+        timing['rows_per_second'] = len(df) / max(timing['median'], 1e-9)
+    return results
+
+async def run_benchmarks(
+    shapes: List[str],
+    rows: int,
+    seed: int,
+    repeat: int,
+    db: str
+) -> Dict[str, Any]:
+    """
+    Run the benchmarks of every shape.
+
+    Args:
+        shapes (List[str]): Dataset shapes to run.
+        rows (int): Rows per dataset.
+        seed (int): Seed of the datasets.
+        repeat (int): Timed runs per benchmark.
+        db (str): 'postgres', 'stand-in', or 'auto' to use Postgres when
+            it is available.
+
+    Returns:
+        Dict[str, Any]: Run settings, environment and timings by
+            'shape/benchmark'.
+    """
+    db_config = Config().db_config
+    if db == 'auto':
+        db = 'postgres' if await postgres_available(db_config) else 'stand-in'
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        if db == 'postgres':
+            async with throwaway_database(db_config) as db_name:
+                db_loader = DBLoader(db_config, pools=PoolManager(db_config))
+                try:
+                    for shape in shapes:
+                        results.update(_prefixed(shape, await benchmark_shape(
+                            shape, rows, seed, repeat, db_loader, db_name, Path(output_dir)
+                        )))
+                finally:
+                    await db_loader.close()
+        else:
+            db_loader = DBLoader(db_config, pools=RecordingPools())
+            for shape in shapes:
+                results.update(_prefixed(shape, await benchmark_shape(
+                    shape, rows, seed, repeat, db_loader, 'benchmark', Path(output_dir)
+                )))
+
+    return {
+        'settings': {'shapes': shapes, 'rows': rows, 'seed': seed, 'repeat': repeat, 'db': db},
+        'environment': _environment(),
+        'results': results
+    }
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    noise: float = 0.002
+) -> List[str]:
+    """
+    Compare the median timings of a run with those of a baseline run.
+
+    Only benchmarks run on the same datasets and the same kind of database
+    are compared.
+
+    Args:
+        current (Dict[str, Any]): Results of this run.
+        baseline (Dict[str, Any]): Results of the baseline run.
+        threshold (float): Relative slowdown counted as a regression.
+        noise (float): Slowdown in seconds below which a change is timer
+            noise, however large relative to the baseline.
+
+    Returns:
+        List[str]: Names of the regressed benchmarks.
+    """
+    settings, base_settings = current['settings'], baseline['settings']
+    if (settings['rows'], settings['seed']) != (base_settings['rows'], base_settings['seed']):
+        print(
+            f"Baseline ran on other datasets (rows {base_settings['rows']}, seed {base_settings['seed']}); "
+            "not comparing"
+        )
+        return []
+
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, timing in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if name.endswith('/insert_data') and settings['db'] != base_settings['db']:
+            continue
+        change = timing['median'] / max(base['median'], 1e-9) - 1
+        flag = ''
+        if change > threshold and timing['median'] - base['median'] > noise:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<40} {base['median']:>9.4f}s {timing['median']:>9.4f}s {change:>+7.1%}{flag}")
+    return regressions
+
+def _prefixed(shape: str, results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Results keyed by 'shape/benchmark'."""
+    return {f"{shape}/{name}": timing for name, timing in results.items()}
+
+def _environment() -> Dict[str, Any]:
+    """Versions and machine the benchmarks ran on."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=BENCHMARK_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine()
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic datasets.")
+    parser.add_argument('--shapes', default=','.join(SHAPES), help="comma-separated dataset shapes")
+    parser.add_argument('--rows', type=int, default=100000, help="rows per dataset")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the datasets")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('--db', choices=('auto', 'postgres', 'stand-in'), default='auto')
+    parser.add_argument('--output', type=Path, help="results file (default benchmarks/results/<time>.json)")
+    parser.add_argument('--baseline', type=Path, help="results of an earlier run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.1, help="slowdown counted as a regression")
+    parser.add_argument('--noise', type=float, default=0.002, help="seconds of slowdown ignored as timer noise")
+    args = parser.parse_args(argv)
+
+    shapes = args.shapes.split(',')
+    unknown = [shape for shape in shapes if shape not in SHAPES]
+    if unknown:
+        parser.error(f"unknown shapes: {', '.join(unknown)}")
+    if args.rows <= 0 or args.repeat <= 0:
+        parser.error("--rows and --repeat must be positive")
+
+    # The pipeline's own progress logging would swamp the output
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    results = asyncio.run(run_benchmarks(shapes, args.rows, args.seed, args.repeat, args.db))
+
+    output = args.output or BENCHMARK_DIR / 'results' / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline is None:
+        for name, timing in results['results'].items():
+            print(f"{name:<40} {timing['median']:>9.4f}s {timing['rows_per_second']:>12.0f} rows/s")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold, args.noise)
+    if regressions:
+        print(f"{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,77 +3,135 @@ Module for AI-powered data analysis using the Anthropic API.
 """
 
 import logging
-from typing import Dict, Tuple, Optional
+from typing import Any, Dict, Tuple, Optional
 from anthropic import AsyncAnthropic
-import aiofiles
-import time
 import json
 
+from data_pipeline.analyze.cache import ResponseCache
+from data_pipeline.analyze.dispatcher import LLMDispatcher
+from data_pipeline.analyze.llm_logger import LLMLogger
+from data_pipeline.analyze.summarizer import ProfileSummarizer
+
 logger = logging.getLogger(__name__)
 
 class LLMAnalyzer:
     """Class for AI-powered data analysis."""
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        client: Optional[Any] = None,
+        cache: Optional[ResponseCache] = None,
+        bypass_cache: bool = False,
+        summarizer: Optional[ProfileSummarizer] = None,
+        dispatcher: Optional[LLMDispatcher] = None,
+        interaction_log: Optional[LLMLogger] = None
+    ):
         """
         Initialize the LLMAnalyzer.
 
         Args:
             api_key (str): Anthropic API key.
+            client (Optional[Any]): Client with an async messages.create, used
+                instead of AsyncAnthropic (e.g. a local stub).
+            cache (Optional[ResponseCache]): Cache of earlier responses.
+            bypass_cache (bool): Always call the API, but still store the
+                fresh responses in the cache.
+            summarizer (Optional[ProfileSummarizer]): Fits profiles into the
+                prompt's token budget.
+            dispatcher (Optional[LLMDispatcher]): Rate-limits and retries the
+                requests; one with default limits around the client when not set.
+            interaction_log (Optional[LLMLogger]): Store the prompts and
+                responses are logged to; they are not logged when not set.
         """
-        self.client = AsyncAnthropic(api_key=api_key)
+        # The dispatcher does the retrying, so the SDK must not retry as well
+        self.client = client or AsyncAnthropic(api_key=api_key, max_retries=0)
+        self.dispatcher = dispatcher or LLMDispatcher(self.client)
         self.model = "claude-3-5-sonnet-20240620"
-
-    async def analyze_structure(self, csv_structure: Dict) -> Tuple[Optional[str], Optional[str]]:
+        self.cache = cache
+        self.bypass_cache = bypass_cache
+        self.summarizer = summarizer or ProfileSummarizer()
+        self.interaction_log = interaction_log
+
+    async def analyze_structure(
+        self,
+        csv_structure: Dict,
+        table_name: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
         """
         Analyze the structure of CSV data using AI.
 
         Args:
             csv_structure (Dict): Structure of the CSV data.
+            table_name (Optional[str]): Table the data is loaded into, for
+                finding the interaction in the log.
 
         Returns:
-            Tuple[Optional[str], Optional[str]]: Analysis result and log file path.
+            Tuple[Optional[str], Optional[str]]: Analysis result and log entry id.
         """
         system_message = "You are an expert data analyst with extensive knowledge of data structures, data quality, and SQL. Your task is to analyze CSV data structures and provide insights and recommendations."
 
-        simplified_structure = self._prepare_profile(csv_structure)
-        
-        user_message = f"""Analyze the following CSV structure and provide insights:
-        
-        Columns: {simplified_structure.get('columns', 'No column information available')}
-        Data Types: {simplified_structure.get('sample_analysis', {})}
-        Full Profile: {simplified_structure.get('full_profile', {})}
-        
+        user_message = self.build_structure_prompt(csv_structure)
+        logger.info(f"Structure analysis prompt is about {self.estimate_prompt_tokens(system_message, user_message)} tokens")
+
+        try:
+            analysis, cached = await self._complete(system_message, user_message, "structure_analysis")
+            if cached:
+                return analysis, None
+            log_entry = await self.log_interaction(user_message, analysis, "structure_analysis", table_name)
+            return analysis, log_entry
+
+        except Exception as e:
+            logger.error(f"An error occurred during structure analysis: {e}")
+            return None, None
+
+    def build_structure_prompt(self, csv_structure: Dict) -> str:
+        """
+        Build the user prompt of the structure analysis.
+
+        Args:
+            csv_structure (Dict): Structure of the CSV data.
+
+        Returns:
+            str: Prompt with the profile summarized to fit the token budget.
+        """
+        return f"""Analyze the following CSV structure and provide insights:
+
+        {self.summarizer.summarize(csv_structure)}
+
         Please provide:
         1. A summary of the data
         2. Potential data quality issues
         3. Suggestions for data cleaning and normalization"""
 
-        try:
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                system=system_message,
-                messages=[{"role": "user", "content": user_message}]
-            )
+    def estimate_prompt_tokens(self, system_message: str, user_message: str) -> int:
+        """
+        Estimate the size of a request before it is sent.
 
-            analysis = response.content[0].text
-            log_file = await self.log_interaction(user_message, analysis, "structure_analysis")
-            return analysis, log_file
+        Args:
+            system_message (str): System prompt.
+            user_message (str): User prompt.
 
-        except Exception as e:
-            logger.error(f"An error occurred during structure analysis: {e}")
-            return None, None
+        Returns:
+            int: Estimated number of input tokens.
+        """
+        return self.summarizer.estimate_tokens(system_message) + self.summarizer.estimate_tokens(user_message)
 
-    async def generate_sql_transformations(self, analysis: str) -> Tuple[Optional[str], Optional[str]]:
+    async def generate_sql_transformations(
+        self,
+        analysis: str,
+        table_name: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
         """
         Generate SQL transformations based on the analysis.
 
         Args:
             analysis (str): Analysis of the data structure.
+            table_name (Optional[str]): Name of the PostgreSQL table the
+                statements should work on, so they can be run as given.
 
         Returns:
-            Tuple[Optional[str], Optional[str]]: SQL transformations and log file path.
+            Tuple[Optional[str], Optional[str]]: SQL transformations and log entry id.
         """
         system_message = "You are an expert SQL developer. Your task is to generate SQL transformations based on the provided data analysis."
 
@@ -85,70 +143,93 @@ class LLMAnalyzer:
         1. SQL statements for data cleaning
         2. SQL statements for data normalization
         3. Any additional SQL transformations that would improve data quality"""
+        if table_name:
+            user_message += f"""
 
-        try:
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                system=system_message,
-                messages=[{"role": "user", "content": user_message}]
-            )
+        The data is in the PostgreSQL table "{table_name}". Write PostgreSQL statements against it in ```sql blocks."""
 
-            sql_transformations = response.content[0].text
-            log_file = await self.log_interaction(user_message, sql_transformations, "sql_transformations")
-            return sql_transformations, log_file
+        try:
+            sql_transformations, cached = await self._complete(system_message, user_message, "sql_transformations")
+            if cached:
+                return sql_transformations, None
+            log_entry = await self.log_interaction(user_message, sql_transformations, "sql_transformations", table_name)
+            return sql_transformations, log_entry
 
         except Exception as e:
             logger.error(f"An error occurred during SQL transformation generation: {e}")
             return None, None
 
-    async def log_interaction(self, user_message: str, ai_response: str, interaction_type: str) -> str:
+    async def _complete(
+        self,
+        system_message: str,
+        user_message: str,
+        label: str = "request",
+        max_tokens: int = 1024
+    ) -> Tuple[str, bool]:
+        """
+        Get the model's reply to a prompt, from the cache when possible.
+
+        Args:
+            system_message (str): System prompt.
+            user_message (str): User prompt.
+            label (str): Name of the request in the dispatcher's metrics.
+            max_tokens (int): Maximum number of tokens in the reply.
+
+        Returns:
+            Tuple[str, bool]: Reply text and whether it came from the cache.
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.model, system_message, user_message, max_tokens)
+            if not self.bypass_cache:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    logger.info("Using cached LLM response")
+                    return cached, True
+
+        response = await self.dispatcher.create(
+            label=label,
+            model=self.model,
+            max_tokens=max_tokens,
+            system=system_message,
+            messages=[{"role": "user", "content": user_message}]
+        )
+        text = response.content[0].text
+        if key is not None:
+            await self.cache.set(key, text)
+        return text, False
+
+    async def log_interaction(
+        self,
+        user_message: str,
+        ai_response: str,
+        interaction_type: str,
+        table_name: Optional[str] = None
+    ) -> Optional[str]:
         """
         Log the interaction between the user and AI.
 
+        The entry is only queued; the log writes it in the background.
+
         Args:
             user_message (str): User's message.
             ai_response (str): AI's response.
             interaction_type (str): Type of interaction.
+            table_name (Optional[str]): Table the interaction was about.
 
         Returns:
-            str: Path to the log file.
+            Optional[str]: Id of the log entry, or None if it was not logged.
         """
-        timestamp = time.time()
-        log_filename = f"{interaction_type}_{timestamp}.log"
-        
+        if self.interaction_log is None:
+            return None
         try:
-            async with aiofiles.open(log_filename, mode='w') as log_file:
-                await log_file.write(f"User Message:\n{user_message}\n\nAI Response:\n{ai_response}")
-            logger.info(f"Interaction logged to {log_filename}")
-            return log_filename
+            return self.interaction_log.log_interaction(
+                user_message, ai_response, interaction_type, table_name=table_name, model=self.model
+            )
         except Exception as e:
             logger.error(f"Error logging interaction: {e}")
             return None
 
-    def _prepare_profile(self, profile: Dict) -> Dict:
-        """
-        Prepare the profile data for AI analysis.
-
-        Args:
-            profile (Dict): Raw profile data.
-
-        Returns:
-            Dict: Simplified profile data.
-        """
-        def simplify(obj):
-            if isinstance(obj, (int, float, str, bool, type(None))):
-                return obj
-            elif isinstance(obj, (list, tuple)):
-                return [simplify(item) for item in obj]
-            elif isinstance(obj, dict):
-                return {str(key): simplify(value) for key, value in obj.items()}
-            elif isinstance(obj, set):
-                return list(obj)
-            return str(obj)
-
-        return simplify(profile)
-
     @staticmethod
     def _convert_to_serializable(obj):
         """
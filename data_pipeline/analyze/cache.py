@@ -0,0 +1,167 @@
+"""
+Module for caching LLM responses on local disk.
+
+Responses are stored in a SQLite database under a key that hashes
+everything that determines them: model, system prompt, user prompt and
+max_tokens. Entries expire after a TTL, and the least recently used ones
+are evicted once the cache holds too many entries or bytes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Class for a content-addressed, size-bounded cache of LLM responses."""
+
+    def __init__(
+        self,
+        path: str = 'llm_cache/responses.sqlite',
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 1000,
+        max_bytes: int = 50 * 1024 * 1024
+    ):
+        """
+        Initialize the ResponseCache.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            ttl (float): Seconds after which an entry expires.
+            max_entries (int): Maximum number of entries kept.
+            max_bytes (int): Maximum total size of the cached responses.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @staticmethod
+    def make_key(model: str, system: str, user_message: str, max_tokens: int) -> str:
+        """
+        Hash the inputs of a request into a cache key.
+
+        Args:
+            model (str): Model name.
+            system (str): System prompt.
+            user_message (str): User prompt.
+            max_tokens (int): Maximum number of tokens in the response.
+
+        Returns:
+            str: Hex SHA-256 digest of the inputs.
+        """
+        payload = json.dumps([model, system, user_message, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): Cache key from make_key.
+
+        Returns:
+            Optional[str]: Cached response, or None when missing or expired.
+        """
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, response: str):
+        """
+        Store a response and evict entries beyond the limits.
+
+        Args:
+            key (str): Cache key from make_key.
+            response (str): Response text to cache.
+        """
+        await asyncio.to_thread(self._set, key, response)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a connection for one transaction; threads never share one.
+
+        Yields:
+            sqlite3.Connection: Connection, committed and closed on exit.
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, key: str) -> Optional[str]:
+        """Blocking part of get."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if now - created_at > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            return response
+
+    def _set(self, key: str, response: str):
+        """Blocking part of set."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode('utf-8')), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """
+        Drop expired entries, then the least recently used ones over the limits.
+
+        Args:
+            conn (sqlite3.Connection): Open connection to the cache.
+            now (float): Current time.
+        """
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.debug(f"Evicted {len(evicted)} cached responses")
@@ -0,0 +1,280 @@
+"""
+Module for sending LLM requests within rate limits.
+
+All requests go through one LLMDispatcher, which keeps them under the
+requests-per-minute and tokens-per-minute limits with token buckets, caps
+how many are in flight, and retries rate-limit errors, overloads, server
+errors and timeouts with exponential backoff and full jitter. Latency,
+attempts and token usage are recorded for the most recent requests and
+added to the metrics of the stage that sent them.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from data_pipeline import metrics
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: rate limited, server errors, overloaded
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+class TokenBucket:
+    """Class for a token bucket that refills continuously at a per-minute rate."""
+
+    def __init__(
+        self,
+        per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ):
+        """
+        Initialize the TokenBucket.
+
+        Args:
+            per_minute (float): Tokens added per minute.
+            capacity (Optional[float]): Maximum tokens held; one minute's worth
+                when not set.
+            clock (Callable[[], float]): Monotonic clock in seconds.
+            sleep (Callable[[float], Awaitable[None]]): Sleep function.
+        """
+        self.rate = per_minute / 60
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float):
+        """
+        Wait until the bucket holds enough tokens, then take them.
+
+        Waiters are served in arrival order. Requests larger than the
+        capacity wait for a full bucket instead of waiting forever.
+
+        Args:
+            amount (float): Tokens to take.
+        """
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await self.sleep((amount - self.tokens) / self.rate)
+
+    def refund(self, amount: float):
+        """
+        Give back tokens that were taken but not used.
+
+        Args:
+            amount (float): Tokens to return.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def _refill(self):
+        """Add the tokens accrued since the last update."""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+class LLMDispatcher:
+    """Class for rate-limited, retrying calls to a messages API client."""
+
+    def __init__(
+        self,
+        client: Any,
+        requests_per_minute: Optional[float] = 50,
+        tokens_per_minute: Optional[float] = 40000,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        timeout: Optional[float] = 120.0,
+        chars_per_token: float = 3.5,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        seed: Optional[int] = None,
+        history: int = 1000
+    ):
+        """
+        Initialize the LLMDispatcher.
+
+        Args:
+            client (Any): Client with an async messages.create, e.g. AsyncAnthropic.
+            requests_per_minute (Optional[float]): Request rate limit; None for none.
+            tokens_per_minute (Optional[float]): Input plus output token rate
+                limit; None for none.
+            max_concurrency (int): Maximum requests in flight.
+            max_retries (int): Retries after the first attempt.
+            base_delay (float): Backoff before the first retry, in seconds.
+            max_delay (float): Upper bound of a single backoff, in seconds.
+            timeout (Optional[float]): Seconds before an attempt is abandoned.
+            chars_per_token (float): Characters per token for estimating
+                the size of a request before sending it.
+            sleep (Callable[[float], Awaitable[None]]): Sleep function.
+            seed (Optional[int]): Seed of the backoff jitter.
+            history (int): Requests whose metrics are kept for the latency
+                percentiles; counts and token totals cover every request.
+        """
+        self.client = client
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.chars_per_token = chars_per_token
+        self.sleep = sleep
+        self.request_bucket = TokenBucket(requests_per_minute, sleep=sleep) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute, sleep=sleep) if tokens_per_minute else None
+        self.metrics: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.totals = {"requests": 0, "failures": 0, "retries": 0, "input_tokens": 0, "output_tokens": 0}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._random = random.Random(seed)
+
+    async def create(self, label: str = "request", **request: Any) -> Any:
+        """
+        Send a messages.create request, waiting for capacity and retrying failures.
+
+        Args:
+            label (str): Name of the request in the metrics.
+            **request (Any): Arguments of messages.create.
+
+        Returns:
+            Any: Response of the client.
+
+        Raises:
+            Exception: The last error once retries are exhausted, or any error
+                that is not worth retrying.
+        """
+        estimated = self.estimate_tokens(request)
+        metric = {"label": label, "estimated_tokens": estimated, "attempts": 0, "status": "pending"}
+        self.metrics.append(metric)
+        started = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            metric["attempts"] = attempt + 1
+            if self.request_bucket is not None:
+                await self.request_bucket.acquire(1)
+            if self.token_bucket is not None:
+                await self.token_bucket.acquire(estimated)
+            try:
+                async with self._semaphore:
+                    attempt_started = time.perf_counter()
+                    response = await asyncio.wait_for(self.client.messages.create(**request), self.timeout)
+            except Exception as e:
+                if attempt == self.max_retries or not self.is_retryable(e):
+                    metric.update(status="error", error=f"{type(e).__name__}: {e}", latency=time.perf_counter() - started)
+                    self._count(metric)
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(f"LLM {label} failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                await self.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            input_tokens = getattr(usage, "input_tokens", None)
+            output_tokens = getattr(usage, "output_tokens", None)
+            if self.token_bucket is not None and input_tokens is not None and output_tokens is not None:
+                self.token_bucket.refund(max(0, estimated - input_tokens - output_tokens))
+            metric.update(
+                status="ok",
+                latency=time.perf_counter() - started,
+                last_attempt_latency=time.perf_counter() - attempt_started,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens
+            )
+            self._count(metric)
+            return response
+
+    def _count(self, metric: Dict[str, Any]):
+        """Add a finished request to the totals and to the metrics of the stage that sent it."""
+        self.totals["requests"] += 1
+        self.totals["failures"] += metric["status"] == "error"
+        self.totals["retries"] += metric["attempts"] - 1
+        self.totals["input_tokens"] += metric.get("input_tokens") or 0
+        self.totals["output_tokens"] += metric.get("output_tokens") or 0
+        metrics.count('llm_requests')
+        metrics.count('llm_input_tokens', metric.get("input_tokens") or 0)
+        metrics.count('llm_output_tokens', metric.get("output_tokens") or 0)
+        metrics.count('llm_seconds', metric["latency"])
+
+    def estimate_tokens(self, request: Dict[str, Any]) -> int:
+        """
+        Estimate the input plus maximum output tokens of a request.
+
+        Args:
+            request (Dict[str, Any]): Arguments of messages.create.
+
+        Returns:
+            int: Estimated tokens.
+        """
+        chars = len(str(request.get("system", "")))
+        for message in request.get("messages", []):
+            chars += len(str(message.get("content", "")))
+        return math.ceil(chars / self.chars_per_token) + int(request.get("max_tokens", 0))
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """
+        Whether an error is transient: a timeout, a dropped connection, or a
+        rate-limit, overload or server error status.
+
+        Args:
+            error (Exception): Error raised by the client.
+
+        Returns:
+            bool: True when the request should be retried.
+        """
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+            return True
+        if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+            return True
+        return getattr(error, "status_code", None) in RETRYABLE_STATUS
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """
+        Delay before the next attempt: full jitter over an exponential bound,
+        but never less than a Retry-After header asks for.
+
+        Args:
+            attempt (int): Number of the failed attempt, from 0.
+            error (Exception): Error of the failed attempt.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            delay = max(delay, float(headers.get("retry-after", 0)))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregate the recorded metrics.
+
+        Returns:
+            Dict[str, Any]: Request, failure and retry counts and token totals
+                of the finished requests, and median and 95th percentile
+                latency of the most recent ones.
+        """
+        latencies = sorted(metric["latency"] for metric in self.metrics if "latency" in metric)
+
+        def percentile(q: float) -> Optional[float]:
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+        return {
+            **self.totals,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95)
+        }
@@ -1,25 +1,386 @@
+"""
+Module for logging LLM interactions to an indexed store.
+
+Every prompt and response goes into one SQLite database in WAL mode
+instead of a file per interaction. Entries are indexed by run, table,
+interaction type and prompt hash, so past interactions can be looked up
+without scanning anything, and exported as JSON lines.
+
+Logging never blocks the event loop. log_interaction only queues the
+entry; a background task writes the queued entries in batches, one
+transaction per batch, from a worker thread. close() writes whatever is
+still queued.
+"""
+
+import asyncio
+import hashlib
 import json
+import logging
 import os
-from datetime import datetime
+import re
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ('id', 'run_id', 'created_at', 'table_name', 'interaction_type', 'prompt_hash', 'model', 'prompt', 'response')
+
+# Files written by earlier versions: <type>_<unix time>.log, <type>_<YYYYmmdd_HHMMSS>.json
+_LEGACY_NAME = re.compile(r'^(?P<type>.+?)_(?P<time>\d+(?:\.\d+)?|\d{8}_\d{6})\.(?:log|json)$')
 
 class LLMLogger:
-    def __init__(self, log_dir='llm_logs'):
-        self.log_dir = log_dir
-        os.makedirs(log_dir, exist_ok=True)
-
-    def log_interaction(self, prompt, response, analysis_type):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{analysis_type}_{timestamp}.json"
-        log_entry = {
-            "timestamp": timestamp,
-            "analysis_type": analysis_type,
-            "prompt": prompt,
-            "response": response
+    """Class for an append-only, indexed log of LLM interactions."""
+
+    def __init__(
+        self,
+        path: str = 'llm_logs/interactions.sqlite',
+        run_id: Optional[str] = None,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000
+    ):
+        """
+        Initialize the LLMLogger.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            run_id (Optional[str]): Identifier of this run of the pipeline;
+                generated from the time when not set.
+            batch_size (int): Most entries written per transaction.
+            flush_interval (float): Seconds a queued entry may wait for
+                others to share its transaction.
+            max_pending (int): Entries queued before new ones are dropped
+                rather than holding up the caller.
+        """
+        self.path = path
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._sequence = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS interactions (
+                    id TEXT PRIMARY KEY,
+                    run_id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    table_name TEXT,
+                    interaction_type TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    model TEXT,
+                    prompt TEXT NOT NULL,
+                    response TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS interactions_run ON interactions (run_id, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS interactions_table ON interactions (table_name, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS interactions_type ON interactions (interaction_type, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS interactions_prompt ON interactions (prompt_hash)")
+
+    @staticmethod
+    def prompt_hash(prompt: str) -> str:
+        """
+        Hash a prompt for finding the interactions that used it.
+
+        Args:
+            prompt (str): Prompt text.
+
+        Returns:
+            str: Hex SHA-256 digest of the prompt.
+        """
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def log_interaction(
+        self,
+        prompt: str,
+        response: Optional[str],
+        interaction_type: str,
+        table_name: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Queue an interaction for writing.
+
+        Inside an event loop this returns at once and the entry is written by
+        the background writer; outside one it is written directly.
+
+        Args:
+            prompt (str): Prompt sent to the model.
+            response (Optional[str]): Reply of the model.
+            interaction_type (str): Kind of interaction, e.g. 'structure_analysis'.
+            table_name (Optional[str]): Table the interaction was about.
+            model (Optional[str]): Model that replied.
+
+        Returns:
+            Optional[str]: Identifier of the entry, or None if it was dropped.
+        """
+        self._sequence += 1
+        entry = {
+            'id': f"{self.run_id}-{self._sequence}",
+            'run_id': self.run_id,
+            'created_at': time.time(),
+            'table_name': table_name,
+            'interaction_type': interaction_type,
+            'prompt_hash': self.prompt_hash(prompt),
+            'model': model,
+            'prompt': prompt,
+            'response': response
         }
-        with open(os.path.join(self.log_dir, filename), 'w') as f:
-            json.dump(log_entry, f, indent=2)
-        return filename
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write([entry])
+            return entry['id']
+
+        if self._writer is None or self._writer.done():
+            self._queue = asyncio.Queue(self.max_pending)
+            self._writer = asyncio.create_task(self._write_batches())
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            logger.warning(f"LLM log is {self.max_pending} entries behind; dropping {interaction_type} entry")
+            return None
+        return entry['id']
+
+    async def flush(self):
+        """Wait until every queued entry has been written."""
+        if self._queue is not None and self._writer is not None and not self._writer.done():
+            await self._queue.join()
+
+    async def close(self):
+        """Write the queued entries and stop the background writer."""
+        await self.flush()
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+
+    async def _write_batches(self):
+        """Background task writing queued entries, a batch per transaction."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} LLM log entries: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        """Insert entries in one transaction."""
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO interactions ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [tuple(entry[column] for column in _COLUMNS) for entry in entries]
+            )
+
+    def find(
+        self,
+        run_id: Optional[str] = None,
+        table_name: Optional[str] = None,
+        interaction_type: Optional[str] = None,
+        prompt_hash: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: Optional[int] = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Look up logged interactions, newest first.
+
+        Args:
+            run_id (Optional[str]): Only entries of this run.
+            table_name (Optional[str]): Only entries about this table.
+            interaction_type (Optional[str]): Only entries of this kind.
+            prompt_hash (Optional[str]): Only entries with this prompt.
+            since (Optional[float]): Only entries logged at or after this Unix time.
+            limit (Optional[int]): Most entries returned; all when None.
+
+        Returns:
+            List[Dict[str, Any]]: Matching entries.
+        """
+        return list(self._select(run_id, table_name, interaction_type, prompt_hash, since, limit))
+
+    def read_log(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read one logged interaction.
+
+        Args:
+            entry_id (str): Identifier returned by log_interaction.
+
+        Returns:
+            Optional[Dict[str, Any]]: The entry, or None if there is none.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM interactions WHERE id = ?", (entry_id,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        List the most recent runs.
+
+        Args:
+            limit (int): Most runs returned.
+
+        Returns:
+            List[Dict[str, Any]]: Run id, start and end time, number of
+                interactions and tables of every run, newest first.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT run_id, MIN(created_at), MAX(created_at), COUNT(*), COUNT(DISTINCT table_name)
+                FROM interactions
+                GROUP BY run_id
+                ORDER BY MIN(created_at) DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
+        return [
+            {'run_id': run_id, 'started': started, 'ended': ended, 'interactions': count, 'tables': tables}
+            for run_id, started, ended, count, tables in rows
+        ]
+
+    def export(self, path: str, **filters: Any) -> int:
+        """
+        Write logged interactions to a JSON-lines file.
+
+        Args:
+            path (str): File to write.
+            **filters (Any): Filters as accepted by find(); everything when none.
+
+        Returns:
+            int: Number of entries written.
+        """
+        filters.setdefault('limit', None)
+        written = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for entry in self._select(**filters):
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                written += 1
+        logger.info(f"Exported {written} LLM interactions to {path}")
+        return written
+
+    def import_files(self, paths: Iterable[Path]) -> int:
+        """
+        Move interactions logged as separate files by earlier versions into the store.
+
+        Reads '<type>_<time>.log' files with 'User Message:' and 'AI Response:'
+        sections and '<type>_<time>.json' files with prompt and response
+        fields. Each file becomes one entry of a run named after its
+        directory; files that cannot be read are skipped.
+
+        Args:
+            paths (Iterable[Path]): Files to import.
+
+        Returns:
+            int: Number of entries imported.
+        """
+        entries = []
+        for path in map(Path, paths):
+            match = _LEGACY_NAME.match(path.name)
+            if match is None:
+                continue
+            try:
+                text = path.read_text(encoding='utf-8')
+                if path.suffix == '.json':
+                    data = json.loads(text)
+                    prompt, response = data.get('prompt'), data.get('response')
+                    created_at = time.mktime(time.strptime(data['timestamp'], "%Y%m%d_%H%M%S"))
+                else:
+                    prompt, _, response = text.removeprefix("User Message:\n").partition("\n\nAI Response:\n")
+                    created_at = float(match.group('time'))
+                    if created_at < 1e9:
+                        # Some versions named files after a monotonic clock
+                        created_at = path.stat().st_mtime
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping {path}: {e}")
+                continue
+            prompt = prompt if isinstance(prompt, str) else json.dumps(prompt)
+            entries.append({
+                'id': f"import-{self.prompt_hash(str(path.resolve()))[:16]}",
+                'run_id': f"import-{path.parent.resolve().name}",
+                'created_at': created_at,
+                'table_name': None,
+                'interaction_type': match.group('type'),
+                'prompt_hash': self.prompt_hash(prompt),
+                'model': None,
+                'prompt': prompt,
+                'response': response if isinstance(response, str) or response is None else json.dumps(response)
+            })
+        if entries:
+            self._write(entries)
+        logger.info(f"Imported {len(entries)} LLM interaction files")
+        return len(entries)
+
+    def _select(
+        self,
+        run_id: Optional[str] = None,
+        table_name: Optional[str] = None,
+        interaction_type: Optional[str] = None,
+        prompt_hash: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: Optional[int] = 100
+    ) -> Iterator[Dict[str, Any]]:
+        """Entries matching the filters, newest first, read as they are consumed."""
+        conditions, params = [], []
+        for column, value in (
+            ('run_id', run_id), ('table_name', table_name),
+            ('interaction_type', interaction_type), ('prompt_hash', prompt_hash)
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        query = f"SELECT {', '.join(_COLUMNS)} FROM interactions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            for row in conn.execute(query, params):
+                yield dict(zip(_COLUMNS, row))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a connection to the log.
 
-    def read_log(self, filename):
-        with open(os.path.join(self.log_dir, filename), 'r') as f:
-            return json.load(f)
\ No newline at end of file
+        Yields:
+            sqlite3.Connection: Connection, committed and closed on exit.
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
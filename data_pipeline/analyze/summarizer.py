@@ -0,0 +1,197 @@
+"""
+Module for summarizing data profiles into compact LLM prompts.
+
+A full profile holds more than a prompt needs: every statistic of every
+column, examples and top values. The summarizer ranks columns by how much
+they tell the model, writes one line per column and lowers the level of
+detail, least useful details first, until the summary fits a token budget.
+If even the shortest lines do not fit, the least informative columns are
+left out and only counted.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+# Statistics shown per detail level, most detailed first
+_FULL_STATS = ("min", "max", "mean", "std", "p1", "median", "p99")
+_SHORT_STATS = ("min", "max", "mean")
+
+# Top values and examples shown per detail level (index = level)
+_TOP_VALUES_BY_LEVEL = (0, 0, 3, None)
+_EXAMPLES_BY_LEVEL = (0, 0, 0, 3)
+
+class ProfileSummarizer:
+    """Class for fitting a data profile into a token budget."""
+
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        top_k: int = 5,
+        max_value_length: int = 40,
+        chars_per_token: float = 3.5
+    ):
+        """
+        Initialize the ProfileSummarizer.
+
+        Args:
+            token_budget (int): Maximum estimated tokens of a summary.
+            top_k (int): Most frequent values shown per column at full detail.
+            max_value_length (int): Values longer than this are truncated.
+            chars_per_token (float): Characters per token used for estimates.
+        """
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.max_value_length = max_value_length
+        self.chars_per_token = chars_per_token
+
+    def estimate_tokens(self, text: str) -> int:
+        """
+        Estimate the number of tokens of a text without calling the API.
+
+        Args:
+            text (str): Text to measure.
+
+        Returns:
+            int: Estimated token count.
+        """
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def summarize(self, profile: Dict[str, Any], token_budget: Optional[int] = None) -> str:
+        """
+        Summarize a profile within a token budget.
+
+        Args:
+            profile (Dict[str, Any]): Profile from DataProfiler.
+            token_budget (Optional[int]): Budget for this summary; the
+                summarizer's default when not set.
+
+        Returns:
+            str: Summary with one line per column, most informative first.
+        """
+        budget = token_budget or self.token_budget
+        full_profile = profile.get("full_profile", {})
+        if not full_profile:
+            return "No column information available."
+
+        rows = max(info["total_count"] for info in full_profile.values())
+        header = f"{rows} rows, {len(full_profile)} columns (most informative first):"
+        ranked = self.rank_columns(full_profile)
+
+        for level in range(len(_TOP_VALUES_BY_LEVEL) - 1, -1, -1):
+            lines = [self._column_line(column, full_profile[column], level) for column in ranked]
+            summary = "\n".join([header, *lines])
+            if self.estimate_tokens(summary) <= budget:
+                return summary
+
+        # Even the shortest lines do not fit: keep the best-ranked columns
+        kept = [header]
+        used = self.estimate_tokens(header)
+        omitted_note_tokens = self.estimate_tokens(f"... {len(ranked)} less informative columns omitted.") + 1
+        for line in lines:
+            cost = self.estimate_tokens(line) + 1
+            if used + cost + omitted_note_tokens > budget:
+                break
+            kept.append(line)
+            used += cost
+        omitted = len(ranked) - (len(kept) - 1)
+        kept.append(f"... {omitted} less informative columns omitted.")
+        return "\n".join(kept)
+
+    def rank_columns(self, full_profile: Dict[str, Any]) -> List[str]:
+        """
+        Order columns by how informative they are for an analysis.
+
+        Partially null columns, numeric distributions (more so with outliers)
+        and dates rank higher; identifiers, free text, constant and empty
+        columns rank lower, since one line says all there is about them.
+
+        Args:
+            full_profile (Dict[str, Any]): Finalized profile by column.
+
+        Returns:
+            List[str]: Column names, most informative first.
+        """
+        scores = {column: self._column_score(info) for column, info in full_profile.items()}
+        return sorted(full_profile, key=lambda column: -scores[column])
+
+    @staticmethod
+    def _column_score(info: Dict[str, Any]) -> float:
+        """Informativeness score of one column, see rank_columns."""
+        score = 1.0
+        null_fraction = info["null_percentage"] / 100
+        non_null = info["total_count"] - info["null_count"]
+        unique = info.get("unique_count", 0)
+        if 0 < null_fraction < 1:
+            score += null_fraction
+        if non_null == 0 or unique <= 1:
+            score -= 0.75
+        if info["numeric"]:
+            score += 0.5
+            std, mean = info.get("std"), info.get("mean")
+            if std and std > 0 and not math.isnan(std):
+                if (info["max"] - mean) / std > 4 or (mean - info["min"]) / std > 4:
+                    score += 0.5
+        elif info.get("date_detected"):
+            score += 0.25
+        elif non_null and unique / non_null > 0.9:
+            score -= 0.5
+        return score
+
+    def _column_line(self, column: str, info: Dict[str, Any], level: int) -> str:
+        """
+        Write one column as a single line at a level of detail.
+
+        Args:
+            column (str): Name of the column.
+            info (Dict[str, Any]): Finalized profile of the column.
+            level (int): 3 for everything down to 0 for kind, nulls and
+                distinct count only.
+
+        Returns:
+            str: Line describing the column.
+        """
+        parts = [f"nulls {info['null_percentage']:.1f}%", f"~{info.get('unique_count', 0)} distinct"]
+        if info["numeric"] and level >= 1:
+            stats = _FULL_STATS if level >= 2 else _SHORT_STATS
+            values = [
+                f"{stat}={self._format_value(info[stat])}" for stat in stats
+                if info.get(stat) is not None and not (isinstance(info[stat], float) and math.isnan(info[stat]))
+            ]
+            if values:
+                parts.append(" ".join(values))
+
+        top_count = _TOP_VALUES_BY_LEVEL[level]
+        top_values = info.get("top_values", [])[:self.top_k if top_count is None else top_count]
+        # Values seen only once are not "top" values, just examples
+        if top_values and top_values[0][1] > 1:
+            parts.append("top: " + ", ".join(
+                f"{self._format_value(value)} ({count})" for value, count in top_values
+            ))
+
+        examples = info.get("examples", [])[:_EXAMPLES_BY_LEVEL[level]]
+        if examples:
+            parts.append("e.g. " + ", ".join(self._format_value(value) for value in examples))
+
+        return f"- {column} [{self._kind(info)}]: " + "; ".join(parts)
+
+    @staticmethod
+    def _kind(info: Dict[str, Any]) -> str:
+        """Short description of the kind of values in a column."""
+        if info["total_count"] == info["null_count"]:
+            return "empty"
+        if info.get("boolean"):
+            return "boolean"
+        if info["numeric"]:
+            return "integer" if info["integral"] else "decimal"
+        if info.get("date_detected"):
+            return "datetime" if info.get("has_time") else "date"
+        return "text"
+
+    def _format_value(self, value: Any) -> str:
+        """Format a value compactly, truncating long text."""
+        if isinstance(value, float):
+            return f"{value:.6g}"
+        text = str(value).replace("\r", "\\r").replace("\n", "\\n")
+        if len(text) > self.max_value_length:
+            text = text[:self.max_value_length - 3] + "..."
+        return text
@@ -3,87 +3,208 @@ Module for cleaning and transforming data.
 """
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from data_pipeline.cleaning.sql_types import infer_sql_types
+from data_pipeline.executor import StageExecutor, run_stage
+
 logger = logging.getLogger(__name__)
 
 class DataCleaner:
     """Class for cleaning and transforming data."""
 
-    async def clean_data(self, df: pd.DataFrame, profile: Dict[str, Any]) -> pd.DataFrame:
+    def __init__(
+        self,
+        executor: Optional[StageExecutor] = None,
+        compact: bool = True,
+        category_max_ratio: float = 0.5,
+        exact_decimals: bool = False
+    ):
+        """
+        Initialize the DataCleaner.
+
+        Args:
+            executor (Optional[StageExecutor]): Runs the column transforms off
+                the event loop; inline when not set.
+            compact (bool): Whether clean_data picks memory-compact types:
+                category for text with few distinct values, pandas strings
+                for other text (Arrow-backed with pyarrow installed), and the
+                narrowest integer and float widths that hold every value.
+            category_max_ratio (float): Text columns with at most this share
+                of distinct values become categories.
+            exact_decimals (bool): Whether get_sql_data_types stores decimals
+                with few decimal places as NUMERIC(p,s) instead of floats.
+        """
+        self.executor = executor
+        self.compact = compact
+        self.category_max_ratio = category_max_ratio
+        self.exact_decimals = exact_decimals
+
+    @property
+    def cache_key(self) -> str:
+        """Settings that change what clean_data returns, for keying cached results."""
+        return f"compact={self.compact}:category_max_ratio={self.category_max_ratio}"
+
+    async def clean_data(
+        self,
+        df: pd.DataFrame,
+        profile: Dict[str, Any],
+        table_name: Optional[str] = None
+    ) -> pd.DataFrame:
         """
         Clean and transform the dataframe based on profiling results.
 
+        The input is left unchanged without being copied: the result shares
+        the columns that need no conversion and replaces the others.
+
         Args:
             df (pd.DataFrame): Input DataFrame to clean.
             profile (Dict[str, Any]): Profile data for the DataFrame.
+            table_name (Optional[str]): Name used when reporting memory use.
 
         Returns:
             pd.DataFrame: Cleaned DataFrame.
         """
-        cleaned_df = df.copy()
-        
         for column, info in profile['full_profile'].items():
-            if column not in cleaned_df.columns:
-                continue
+            if column in df.columns:
+                self._check_column(column, info)
 
-            cleaned_df[column] = await self._clean_column(cleaned_df[column], info)
+        before = df.memory_usage(deep=True).sum()
+        cleaned = await run_stage(
+            self.executor, 'clean', self._transform_frame, df, profile['full_profile'],
+            copy=True, compact=self.compact
+        )
+        after = cleaned.memory_usage(deep=True).sum()
+        logger.info(
+            f"Cleaned {table_name or 'data'}: {before / 1024 ** 2:.1f} MB parsed, "
+            f"{after / 1024 ** 2:.1f} MB cleaned{' (compact types)' if self.compact else ''}"
+        )
+        return cleaned
 
-        return cleaned_df
-
-    async def _clean_column(self, series: pd.Series, info: Dict[str, Any]) -> pd.Series:
+    async def clean_chunk(self, chunk: pd.DataFrame, profile: Dict[str, Any]) -> pd.DataFrame:
         """
-        Clean a single column based on its profile information.
+        Clean one chunk of a streamed file based on the current profile.
+
+        Unlike clean_data, this transforms the chunk in place and skips the
+        per-column warnings, which would otherwise repeat for every chunk.
+        Use the returned frame: in a process pool the chunk is transformed
+        in the worker's copy.
 
         Args:
-            series (pd.Series): Column data to clean.
-            info (Dict[str, Any]): Profile information for the column.
+            chunk (pd.DataFrame): Chunk of the input data.
+            profile (Dict[str, Any]): Profile data accumulated so far.
 
         Returns:
-            pd.Series: Cleaned column data.
+            pd.DataFrame: Cleaned chunk.
+        """
+        return await run_stage(self.executor, 'clean', self._transform_frame, chunk, profile['full_profile'])
+
+    def _check_column(self, column: str, info: Dict[str, Any]):
+        """
+        Warn about a column whose profile suggests it needs attention.
+
+        Args:
+            column (str): Name of the column.
+            info (Dict[str, Any]): Profile information for the column.
         """
         if info['null_percentage'] > 50:
             logger.warning(
-                f"Column {series.name} has {info['null_percentage']:.2f}% null values. "
+                f"Column {column} has {info['null_percentage']:.2f}% null values. "
                 "Consider dropping this column."
             )
-        
+
+    def _transform_frame(
+        self,
+        df: pd.DataFrame,
+        full_profile: Dict[str, Any],
+        copy: bool = False,
+        compact: bool = False
+    ) -> pd.DataFrame:
+        """
+        Convert every profiled column of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): Data to convert.
+            full_profile (Dict[str, Any]): Profile information by column.
+            copy (bool): Whether to leave df unchanged; converted columns then
+                go into a shallow copy, which shares the data of the others.
+            compact (bool): Whether to convert to memory-compact types.
+
+        Returns:
+            pd.DataFrame: The converted DataFrame.
+        """
+        if copy:
+            df = df.copy(deep=False)
+        for column, info in full_profile.items():
+            if column in df.columns:
+                converted = self._transform_column(df[column], info)
+                df[column] = self._compact_column(converted, info) if compact else converted
+        return df
+
+    def _transform_column(self, series: pd.Series, info: Dict[str, Any]) -> pd.Series:
+        """
+        Convert a column to the representation implied by its profile.
+
+        Args:
+            series (pd.Series): Column data to convert.
+            info (Dict[str, Any]): Profile information for the column.
+
+        Returns:
+            pd.Series: Converted column data.
+        """
         if info['numeric']:
             return pd.to_numeric(series, errors='coerce')
         elif info.get('date_detected', False):
-            return pd.to_datetime(series, errors='coerce')
+            return pd.to_datetime(series, format=info.get('date_format'), errors='coerce')
         else:
             return series.astype(str).replace('nan', '')
 
+    def _compact_column(self, series: pd.Series, info: Dict[str, Any]) -> pd.Series:
+        """
+        Convert a cleaned column to a smaller representation of the same values.
+
+        Floats are only narrowed when no value changes, so the data that
+        reaches the database is the same as without compaction.
+
+        Args:
+            series (pd.Series): Cleaned column data.
+            info (Dict[str, Any]): Profile information for the column.
+
+        Returns:
+            pd.Series: Column data in its compact type.
+        """
+        if pd.api.types.is_integer_dtype(series.dtype):
+            return pd.to_numeric(series, downcast='integer')
+        if pd.api.types.is_float_dtype(series.dtype):
+            values = series.to_numpy()
+            narrowed = values.astype(np.float32)
+            if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+                return pd.Series(narrowed, index=series.index, name=series.name)
+            return series
+        if series.dtype == object:
+            if info['total_count'] and info['unique_count'] <= self.category_max_ratio * info['total_count']:
+                return series.astype('category')
+            return series.astype('string[pyarrow]' if pyarrow is not None else 'string[python]')
+        return series
+
     def get_sql_data_types(self, profile: Dict[str, Any]) -> Dict[str, str]:
         """
         Generate SQL data types based on the profile data.
 
+        Each column gets the narrowest Postgres type that holds all of its
+        values, see infer_sql_types.
+
         Args:
             profile (Dict[str, Any]): Profile data for the DataFrame.
 
         Returns:
             Dict[str, str]: Mapping of column names to SQL data types.
         """
-        sql_types = {}
-        for column, info in profile['full_profile'].items():
-            if info['numeric']:
-                if all(
-                    float(x).is_integer()
-                    for x in info['unique_values']
-                    if x is not None and not pd.isna(x)
-                ):
-                    sql_types[column] = 'INTEGER'
-                else:
-                    sql_types[column] = 'FLOAT'
-            elif info.get('date_detected', False):
-                sql_types[column] = 'DATE'
-            else:
-                max_length = max(
-                    len(str(x))
-                    for x in info['unique_values']
-                    if x is not None and not pd.isna(x)
-                )
-                sql_types[column] = f'VARCHAR({max_length})'
-        return sql_types
\ No newline at end of file
+        return infer_sql_types(profile['full_profile'], exact_decimals=self.exact_decimals)
@@ -0,0 +1,162 @@
+"""
+Module for inferring Postgres column types from profile statistics.
+
+Types are decided from the aggregates the profiler already keeps (counts,
+range bounds, decimal scale, text length and the boolean/date flags), so
+no column values are revisited. The checks run as NumPy masks over all
+columns at once, and each column gets the narrowest type that holds every
+value seen so far.
+
+Decimals become REAL or DOUBLE PRECISION by default. With exact decimals,
+those with at most a few decimal places (amounts, rates) become
+NUMERIC(p,s) instead, which stores them exactly but rounds anything later
+written to the column, such as the result of a division, to that scale.
+"""
+
+import math
+from typing import Any, Dict
+
+import numpy as np
+
+# Integer types by exclusive upper bound; the lower bound is the negated bound
+_INTEGER_BOUNDS = (('SMALLINT', 2 ** 15), ('INTEGER', 2 ** 31), ('BIGINT', 2 ** 63))
+
+# Decimal digits a REAL (float4) round-trips exactly (FLT_DIG)
+_MAX_REAL_DIGITS = 6
+
+# Most decimal places of a column stored as NUMERIC(p,s) with exact decimals
+_MAX_EXACT_SCALE = 4
+
+# Limits Postgres puts on NUMERIC precision and VARCHAR length
+_MAX_NUMERIC_PRECISION = 1000
+_MAX_VARCHAR_LENGTH = 10485760
+
+_NUMERIC_FAMILY = {'SMALLINT', 'INTEGER', 'BIGINT', 'REAL', 'FLOAT', 'DOUBLE PRECISION', 'NUMERIC', 'DECIMAL'}
+_TEMPORAL_FAMILY = {'DATE', 'TIMESTAMP'}
+_TEXT_FAMILY = {'VARCHAR', 'TEXT'}
+
+def infer_sql_types(column_stats: Dict[str, Dict[str, Any]], exact_decimals: bool = False) -> Dict[str, str]:
+    """
+    Pick the narrowest safe SQL data type for every column.
+
+    Works on finalized profiles as well as running ones, since only the
+    counts, bounds and flags are read.
+
+    Args:
+        column_stats (Dict[str, Dict[str, Any]]): Profile statistics by column.
+        exact_decimals (bool): Whether decimals with at most _MAX_EXACT_SCALE
+            decimal places get NUMERIC(p,s) instead of a float type.
+
+    Returns:
+        Dict[str, str]: Mapping of column names to SQL data types.
+    """
+    columns = list(column_stats)
+    if not columns:
+        return {}
+    stats = [column_stats[column] for column in columns]
+
+    non_null = np.array([info['total_count'] - info['null_count'] for info in stats])
+    numeric = np.array([bool(info['numeric']) for info in stats])
+    integral = np.array([bool(info['numeric'] and info['integral']) for info in stats])
+    boolean = np.array([bool(info.get('boolean', False)) for info in stats])
+    temporal = np.array([_is_temporal(info) for info in stats])
+    has_time = np.array([bool(info.get('has_time', False)) for info in stats])
+    max_length = np.array([info['max_length'] for info in stats])
+    low = np.array([_bound(info, 'min') for info in stats])
+    high = np.array([_bound(info, 'max') for info in stats])
+    scale = np.array([_scale(info) for info in stats])
+
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        magnitude = np.fmax(np.abs(low), np.abs(high))
+        integer_digits = np.where(magnitude >= 1, np.floor(np.log10(magnitude)) + 1, 0)
+        precision = integer_digits + scale
+
+    exact = np.array([
+        f'NUMERIC({max(int(digits), 1)},0)' if np.isfinite(digits) else ''
+        for digits in precision
+    ], dtype=object)
+    decimal = np.array([
+        f'NUMERIC({max(int(digits), 1)},{int(places)})' if np.isfinite(digits) else ''
+        for digits, places in zip(precision, scale)
+    ], dtype=object)
+    varchar = np.array([f'VARCHAR({max(int(length), 1)})' for length in max_length], dtype=object)
+
+    conditions = [non_null == 0, boolean]
+    choices = ['TEXT', 'BOOLEAN']
+    for sql_type, bound in _INTEGER_BOUNDS:
+        conditions.append(integral & (low >= -bound) & (high < bound))
+        choices.append(sql_type)
+    conditions += [
+        numeric & ~integral & exact_decimals & (scale <= _MAX_EXACT_SCALE) & (precision <= _MAX_NUMERIC_PRECISION),
+        numeric & ~integral & (precision <= _MAX_REAL_DIGITS),
+        integral & (precision <= _MAX_NUMERIC_PRECISION),
+        numeric,
+        temporal & has_time,
+        temporal,
+        max_length > _MAX_VARCHAR_LENGTH
+    ]
+    choices += [decimal, 'REAL', exact, 'DOUBLE PRECISION', 'TIMESTAMP', 'DATE', 'TEXT']
+
+    return dict(zip(columns, np.select(conditions, choices, default=varchar).tolist()))
+
+def widen_sql_type(current: str, required: str) -> str:
+    """
+    Combine a column's current type with the type its values now require.
+
+    The required type must come from statistics that cover every row
+    already stored, so within the numeric and date families it holds the
+    old values as well. Moving between families falls back to TEXT.
+
+    Args:
+        current (str): Type the column has now.
+        required (str): Type inferred from the statistics so far.
+
+    Returns:
+        str: Type to give the column; equal to current when nothing changes.
+    """
+    if current == required or current == 'TEXT':
+        return current
+    current_family, required_family = _family(current), _family(required)
+    if current_family != required_family:
+        return 'TEXT'
+    if current_family == 'text':
+        if required == 'TEXT':
+            return required
+        return current if _varchar_length(current) >= _varchar_length(required) else required
+    if current_family in ('numeric', 'temporal'):
+        return required
+    return 'TEXT'
+
+def _family(sql_type: str) -> str:
+    """Group a SQL type into numeric, temporal, text or boolean."""
+    base_type = sql_type.split('(')[0].strip().upper()
+    if base_type in _NUMERIC_FAMILY:
+        return 'numeric'
+    if base_type in _TEMPORAL_FAMILY:
+        return 'temporal'
+    if base_type in _TEXT_FAMILY:
+        return 'text'
+    return base_type.lower()
+
+def _varchar_length(sql_type: str) -> int:
+    """Declared length of a VARCHAR(n) type."""
+    return int(sql_type[len('VARCHAR('):-1])
+
+def _is_temporal(info: Dict[str, Any]) -> bool:
+    """Whether every value of a column parsed with one date format."""
+    return bool(info.get('temporal', False) and info.get('date_format'))
+
+def _bound(info: Dict[str, Any], key: str) -> float:
+    """Range bound of a numeric column as a float, NaN when unknown."""
+    value = info.get(key) if info['numeric'] else None
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except OverflowError:  # integers beyond the float range
+        return math.inf if value > 0 else -math.inf
+
+def _scale(info: Dict[str, Any]) -> float:
+    """Decimal places of a numeric column, NaN when unknown or unbounded."""
+    scale = info.get('scale') if info['numeric'] else None
+    return math.nan if scale is None else float(scale)
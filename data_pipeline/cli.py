@@ -0,0 +1,230 @@
+"""
+Command line interface of the data pipeline.
+
+Each command runs some of the pipeline's stages over all CSV files of the
+data directory, or over those named by file or glob patterns:
+
+    python -m data_pipeline.cli profile
+    python -m data_pipeline.cli load 'sales_*.csv'
+    python -m data_pipeline.cli analyze dataset/players.csv
+    python -m data_pipeline.cli visualize
+    python -m data_pipeline.cli run
+
+Without a command, the whole pipeline runs over every file. Only the
+modules of the chosen stages are imported; `imports` measures how long
+each command takes to import them and which heavy libraries they load, and
+can fail above a budget or when a command loads a library of another stage.
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from data_pipeline.config import Config
+from data_pipeline.pipeline import STAGE_LIBRARIES, STAGES, run_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Stages each command runs
+COMMANDS = {
+    'profile': ('profile',),
+    'load': ('profile', 'load'),
+    'analyze': ('profile', 'llm'),
+    'visualize': ('profile', 'visualize'),
+    'run': STAGES
+}
+
+COMMAND_HELP = {
+    'profile': "profile the files",
+    'load': "profile the files and load them into the database",
+    'analyze': "profile the files and have the LLM analyze them",
+    'visualize': "profile the files and chart them",
+    'run': "run every stage"
+}
+
+# Imports a command makes before its first file, timed in a fresh interpreter,
+# and the heavy libraries they load
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from data_pipeline.cli import COMMANDS
+from data_pipeline.pipeline import STAGE_LIBRARIES, import_stages
+import_stages(COMMANDS[sys.argv[1]])
+seconds = time.perf_counter() - started
+libraries = sorted({name for names in STAGE_LIBRARIES.values() for name in names} & set(sys.modules))
+print(json.dumps([seconds, libraries]))
+"""
+
+def select_files(data_dir: Path, patterns: List[str]) -> List[str]:
+    """
+    Select the CSV files of the data directory named by the patterns.
+
+    A pattern is a path to a file of the data directory, or a glob matched
+    against the names of its CSV files.
+
+    Args:
+        data_dir (Path): Data directory.
+        patterns (List[str]): File paths or glob patterns.
+
+    Returns:
+        List[str]: Names of the selected files, in directory order.
+
+    Raises:
+        ValueError: If a pattern names a file outside the data directory
+            or matches no file.
+    """
+    available = [path.name for path in data_dir.glob('*.csv')]
+    selected = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_file():
+            if path.resolve().parent != data_dir.resolve():
+                raise ValueError(f"{pattern} is not in the data directory {data_dir}")
+            matches = [path.name] if path.name in available else []
+        else:
+            matches = fnmatch.filter(available, pattern)
+        if not matches:
+            raise ValueError(f"No CSV file in {data_dir} matches {pattern}")
+        selected.update(matches)
+    return [filename for filename in available if filename in selected]
+
+def measure_imports(commands: List[str], repeat: int = 3) -> Dict[str, Tuple[float, List[str]]]:
+    """
+    Time the imports of commands, each in a fresh interpreter.
+
+    Args:
+        commands (List[str]): Commands to time.
+        repeat (int): Runs per command; the fastest counts.
+
+    Returns:
+        Dict[str, Tuple[float, List[str]]]: Seconds each command spends
+            importing, and the heavy libraries of STAGE_LIBRARIES it loads.
+    """
+    timings = {}
+    for command in commands:
+        runs = []
+        libraries = set()
+        for _ in range(repeat):
+            result = subprocess.run(
+                [sys.executable, '-c', IMPORT_PROBE, command],
+                cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True
+            )
+            seconds, loaded = json.loads(result.stdout)
+            runs.append(seconds)
+            libraries.update(loaded)
+        timings[command] = (min(runs), sorted(libraries))
+    return timings
+
+def unneeded_libraries(command: str, libraries: List[str]) -> List[str]:
+    """
+    Find the heavy libraries a command loads although none of its stages needs them.
+
+    Args:
+        command (str): Command that loaded the libraries.
+        libraries (List[str]): Heavy libraries it loaded.
+
+    Returns:
+        List[str]: Libraries that belong only to stages the command does not run.
+    """
+    needed = {name for stage in COMMANDS[command] for name in STAGE_LIBRARIES[stage]}
+    return [name for name in libraries if name not in needed]
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser of the command line."""
+    parser = argparse.ArgumentParser(description="Profile, load, analyze and chart CSV datasets.")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-v', '--verbose', action='store_true', help="log debug messages")
+    verbosity.add_argument('-q', '--quiet', action='store_true', help="log only warnings and errors")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    for command in COMMANDS:
+        subparser = commands.add_parser(command, help=COMMAND_HELP[command])
+        subparser.add_argument(
+            'files', nargs='*', metavar='file',
+            help="CSV file or glob pattern in the data directory (default: every CSV file)"
+        )
+        subparser.add_argument('--data-dir', type=Path, help="directory of the CSV files (default: dataset)")
+
+    imports = commands.add_parser('imports', help="measure the time each command spends importing")
+    imports.add_argument('commands', nargs='*', metavar='command', help="commands to time (default: all)")
+    imports.add_argument('--repeat', type=int, default=3, help="runs per command; the fastest counts")
+    imports.add_argument(
+        '--budget', type=float,
+        help="fail when a command takes longer, in seconds, or loads a library of another stage"
+    )
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the command line.
+
+    Args:
+        argv (Optional[List[str]]): Arguments; those of the process when None.
+
+    Returns:
+        int: Exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'imports':
+        unknown = [command for command in args.commands if command not in COMMANDS]
+        if unknown:
+            parser.error(f"unknown commands: {', '.join(unknown)}")
+        if args.repeat <= 0:
+            parser.error("--repeat must be positive")
+        timings = measure_imports(args.commands or list(COMMANDS), args.repeat)
+        over = []
+        unneeded = []
+        for command, (seconds, libraries) in timings.items():
+            flags = ''
+            if args.budget is not None and seconds > args.budget:
+                over.append(command)
+                flags += '  OVER BUDGET'
+            extra = unneeded_libraries(command, libraries)
+            if args.budget is not None and extra:
+                unneeded.append(command)
+                flags += f"  UNNEEDED {', '.join(extra)}"
+            print(f"{command:<10} {seconds:>7.3f}s  {', '.join(libraries) or '-'}{flags}")
+        if over:
+            print(f"{len(over)} commands import for longer than {args.budget}s")
+        if unneeded:
+            print(f"{len(unneeded)} commands load libraries of stages they do not run")
+        return 1 if over or unneeded else 0
+
+    config = Config()
+    stages = COMMANDS[args.command or 'run']
+    files = None
+    if args.command is not None:
+        if args.data_dir is not None:
+            config.data_dir = args.data_dir
+        if args.files:
+            try:
+                files = select_files(config.data_dir, args.files)
+            except ValueError as e:
+                parser.error(str(e))
+
+    try:
+        config.validate(
+            require_llm='llm' in stages,
+            require_db='load' in stages,
+            require_output='visualize' in stages
+        )
+    except ValueError as e:
+        logger.error(f"Invalid configuration: {e}")
+        return 1
+
+    asyncio.run(run_pipeline(config, files, stages))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
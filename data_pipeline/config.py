@@ -8,6 +8,9 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from data_pipeline.executor import POOL_KINDS
+from data_pipeline.metrics import PROFILERS
+
 load_dotenv()
 
 class Config:
@@ -23,20 +26,164 @@ class Config:
             'port': os.getenv('DB_PORT', '5432')
         }
         self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
+        # 'streaming' profiles, cleans and loads each file in one scan;
+        # 'classic' reads the file separately for each stage.
+        self.ingest_mode = os.getenv('INGEST_MODE', 'streaming')
+        self.chunk_rows = int(os.getenv('CHUNK_ROWS', '10000'))
+        self.lookahead_rows = int(os.getenv('LOOKAHEAD_ROWS', '50000'))
+        # Size chunks in bytes instead of rows when set (0 = use CHUNK_ROWS)
+        self.chunk_bytes = int(os.getenv('CHUNK_BYTES', '0')) or None
+        # Workers large files are split across for profiling in the classic
+        # ingest mode; their ranges run in the shared process pool
+        self.profile_workers = int(os.getenv('PROFILE_WORKERS', '1'))
+        # Rows sent per COPY command when loading tables
+        self.copy_batch_size = int(os.getenv('COPY_BATCH_SIZE', '50000'))
+        # Arrow cache of parsed and cleaned datasets (empty path = no cache; needs
+        # pyarrow, from the arrow extra: poetry install --extras arrow)
+        self.dataset_cache_dir = os.getenv('DATASET_CACHE_DIR', 'cache/datasets')
+        self.dataset_cache_max_bytes = int(float(os.getenv('DATASET_CACHE_MAX_MB', '1024')) * 1024 * 1024)
+        self.dataset_cache_clear = os.getenv('DATASET_CACHE_CLEAR', '').lower() in ('1', 'true', 'yes')
+        # Keep cleaned frames in compact types: categories for repetitive text,
+        # pandas strings for other text (Arrow-backed with the arrow extra),
+        # narrowest numeric widths
+        self.clean_compact = os.getenv('CLEAN_COMPACT', '1').lower() in ('1', 'true', 'yes')
+        self.clean_category_ratio = float(os.getenv('CLEAN_CATEGORY_RATIO', '0.5'))
+        # Store decimals with up to 4 places as NUMERIC(p,s) instead of floats;
+        # transformations that divide such columns are rounded to their scale
+        self.sql_exact_decimals = os.getenv('SQL_EXACT_DECIMALS', '').lower() in ('1', 'true', 'yes')
+        # Skip unchanged files and load only the new rows of appended ones
+        self.ingest_manifest = os.getenv('INGEST_MANIFEST', '1').lower() in ('1', 'true', 'yes')
+        # Connection pool shared by all database work
+        self.db_pool_min = int(os.getenv('DB_POOL_MIN', '1'))
+        self.db_pool_max = int(os.getenv('DB_POOL_MAX', '10'))
+        self.db_statement_cache_size = int(os.getenv('DB_STATEMENT_CACHE', '100'))
+        # Pools for CPU-bound stages, e.g. 'profile=process,clean=thread'
+        self.stage_pools = self._parse_stage_settings(os.getenv('STAGE_POOLS', ''))
+        # Pool sizes (0 = Python's default / number of CPUs)
+        self.thread_workers = int(os.getenv('THREAD_WORKERS', '0')) or None
+        self.process_workers = int(os.getenv('PROCESS_WORKERS', '0')) or None
+        # Files allowed in each stage at once, e.g. 'load=2,llm=4'
+        self.stage_limits = {
+            stage: int(limit)
+            for stage, limit in self._parse_stage_settings(os.getenv('STAGE_LIMITS', '')).items()
+        }
+        # Files are only started while their estimated memory (file size
+        # times MEMORY_FACTOR) fits in the budget
+        self.memory_budget = int(float(os.getenv('MEMORY_BUDGET_MB', '2048')) * 1024 * 1024)
+        self.memory_factor = float(os.getenv('MEMORY_FACTOR', '3'))
+        # Indexed log of LLM prompts and responses (empty path = not logged)
+        self.llm_log_path = os.getenv('LLM_LOG_PATH', 'llm_logs/interactions.sqlite')
+        # On-disk cache of LLM responses (empty path = no cache)
+        self.llm_cache_path = os.getenv('LLM_CACHE_PATH', 'llm_cache/responses.sqlite')
+        self.llm_cache_ttl_hours = float(os.getenv('LLM_CACHE_TTL_HOURS', '168'))
+        self.llm_cache_max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1000'))
+        self.llm_cache_max_mb = float(os.getenv('LLM_CACHE_MAX_MB', '50'))
+        self.llm_cache_bypass = os.getenv('LLM_CACHE_BYPASS', '').lower() in ('1', 'true', 'yes')
+        # Estimated tokens the profile summary in a prompt may take
+        self.llm_profile_tokens = int(os.getenv('LLM_PROFILE_TOKENS', '3000'))
+        # Rate limits of the LLM API (0 = unlimited) and retries of failed requests
+        self.llm_requests_per_minute = float(os.getenv('LLM_REQUESTS_PER_MINUTE', '50'))
+        self.llm_tokens_per_minute = float(os.getenv('LLM_TOKENS_PER_MINUTE', '40000'))
+        self.llm_max_concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+        self.llm_max_retries = int(os.getenv('LLM_MAX_RETRIES', '5'))
+        self.llm_timeout = float(os.getenv('LLM_TIMEOUT', '120'))
+        # Limits of the charts drawn per table
+        self.vis_max_charts = int(os.getenv('VIS_MAX_CHARTS', '20'))
+        self.vis_max_seconds = float(os.getenv('VIS_MAX_SECONDS', '120'))
+        self.vis_max_categories = int(os.getenv('VIS_MAX_CATEGORIES', '20'))
+        # Columns with a larger share of distinct values are identifiers and get no chart
+        self.vis_max_unique_ratio = float(os.getenv('VIS_MAX_UNIQUE_RATIO', '0.5'))
+        # Dry run of the generated SQL on a sample of the table, with the
+        # budgets a statement must stay within to be accepted
+        self.sql_dry_run = os.getenv('SQL_DRY_RUN', '1').lower() in ('1', 'true', 'yes')
+        self.sql_max_cost = float(os.getenv('SQL_MAX_COST', '10000000'))
+        self.sql_max_seconds = float(os.getenv('SQL_MAX_SECONDS', '60'))
+        self.sql_sample_percent = float(os.getenv('SQL_SAMPLE_PERCENT', '1'))
+        # Apply the generated SQL to the table when every statement passed
+        self.sql_apply = os.getenv('SQL_APPLY', '').lower() in ('1', 'true', 'yes')
+        # Per-stage metrics as JSON lines (empty path = not written) and as a
+        # Prometheus textfile-collector file (written only when set)
+        self.metrics_path = os.getenv('METRICS_PATH', 'metrics/stages.jsonl')
+        self.metrics_textfile = os.getenv('METRICS_TEXTFILE', '')
+        # Opt-in profiling of every stage with 'cprofile' or 'pyinstrument'
+        self.metrics_profile = os.getenv('METRICS_PROFILE', '').lower()
+        self.metrics_profile_dir = os.getenv('METRICS_PROFILE_DIR', 'metrics/profiles')
+        self.metrics_tracemalloc = os.getenv('METRICS_TRACEMALLOC', '').lower() in ('1', 'true', 'yes')
+
+    def validate(self, require_llm: bool = True, require_db: bool = True, require_output: bool = True):
+        """
+        Validate the configuration.
 
-    def validate(self):
-        """Validate the configuration."""
-        if not self.anthropic_api_key:
+        Args:
+            require_llm (bool): Whether the LLM API key must be set.
+            require_db (bool): Whether the database password must be set.
+            require_output (bool): Whether the output directory must exist.
+        """
+        if require_llm and not self.anthropic_api_key:
             raise ValueError("ANTHROPIC_API_KEY is not set in the environment.")
-        if not self.db_config['password']:
+        if require_db and not self.db_config['password']:
             raise ValueError("DB_PASS is not set in the environment.")
 
         # Validate database configuration
         self._validate_db_config()
 
+        if self.ingest_mode not in ('streaming', 'classic'):
+            raise ValueError(f"Invalid ingest mode: {self.ingest_mode}")
+        if self.chunk_rows <= 0 or self.lookahead_rows <= 0:
+            raise ValueError("CHUNK_ROWS and LOOKAHEAD_ROWS must be positive")
+        if self.profile_workers <= 0:
+            raise ValueError("PROFILE_WORKERS must be positive")
+        if self.copy_batch_size <= 0:
+            raise ValueError("COPY_BATCH_SIZE must be positive")
+        if self.dataset_cache_max_bytes <= 0:
+            raise ValueError("DATASET_CACHE_MAX_MB must be positive")
+        if not 0 <= self.clean_category_ratio <= 1:
+            raise ValueError("CLEAN_CATEGORY_RATIO must be between 0 and 1")
+        if self.db_pool_min < 0 or self.db_pool_max <= 0 or self.db_pool_min > self.db_pool_max:
+            raise ValueError("DB_POOL_MIN and DB_POOL_MAX must satisfy 0 <= DB_POOL_MIN <= DB_POOL_MAX")
+        if self.db_statement_cache_size < 0:
+            raise ValueError("DB_STATEMENT_CACHE must not be negative")
+        for stage, kind in self.stage_pools.items():
+            if kind not in POOL_KINDS:
+                raise ValueError(f"Invalid pool for stage {stage}: {kind}")
+        if (self.thread_workers or 1) < 0 or (self.process_workers or 1) < 0:
+            raise ValueError("THREAD_WORKERS and PROCESS_WORKERS must not be negative")
+        if any(limit <= 0 for limit in self.stage_limits.values()):
+            raise ValueError("STAGE_LIMITS must be positive")
+        if self.memory_budget <= 0 or self.memory_factor <= 0:
+            raise ValueError("MEMORY_BUDGET_MB and MEMORY_FACTOR must be positive")
+        if self.llm_cache_ttl_hours <= 0 or self.llm_cache_max_entries <= 0 or self.llm_cache_max_mb <= 0:
+            raise ValueError("LLM_CACHE_TTL_HOURS, LLM_CACHE_MAX_ENTRIES and LLM_CACHE_MAX_MB must be positive")
+        if self.llm_profile_tokens <= 0:
+            raise ValueError("LLM_PROFILE_TOKENS must be positive")
+        if self.llm_requests_per_minute < 0 or self.llm_tokens_per_minute < 0:
+            raise ValueError("LLM_REQUESTS_PER_MINUTE and LLM_TOKENS_PER_MINUTE must not be negative")
+        if self.llm_max_concurrency <= 0 or self.llm_max_retries < 0 or self.llm_timeout <= 0:
+            raise ValueError("LLM_MAX_CONCURRENCY and LLM_TIMEOUT must be positive, LLM_MAX_RETRIES not negative")
+        if self.vis_max_charts <= 0 or self.vis_max_seconds <= 0 or self.vis_max_categories <= 0:
+            raise ValueError("VIS_MAX_CHARTS, VIS_MAX_SECONDS and VIS_MAX_CATEGORIES must be positive")
+        if not 0 < self.vis_max_unique_ratio <= 1:
+            raise ValueError("VIS_MAX_UNIQUE_RATIO must be between 0 and 1")
+        if self.sql_max_cost <= 0 or self.sql_max_seconds <= 0:
+            raise ValueError("SQL_MAX_COST and SQL_MAX_SECONDS must be positive")
+        if not 0 < self.sql_sample_percent <= 100:
+            raise ValueError("SQL_SAMPLE_PERCENT must be between 0 and 100")
+        if self.metrics_profile and self.metrics_profile not in PROFILERS:
+            raise ValueError(f"Invalid METRICS_PROFILE: {self.metrics_profile}")
+
         # Validate directory paths
         self._validate_directory(self.data_dir, "Data directory")
-        self._validate_directory(self.output_dir, "Output directory")
+        if require_output:
+            self._validate_directory(self.output_dir, "Output directory")
+
+    @staticmethod
+    def _parse_stage_settings(value: str) -> dict:
+        """Parse 'stage=kind' pairs separated by commas."""
+        stage_pools = {}
+        for item in filter(None, (part.strip() for part in value.split(','))):
+            stage, _, kind = item.partition('=')
+            stage_pools[stage.strip()] = kind.strip()
+        return stage_pools
 
     def _validate_db_config(self):
         """Validate database configuration parameters."""
@@ -0,0 +1,189 @@
+"""
+Module for running CPU-bound pipeline stages off the event loop.
+
+Parsing, profiling, cleaning and plotting are plain synchronous pandas and
+matplotlib work. Running them directly in a coroutine blocks the loop, so
+one file's parsing would stall every other file's database and LLM I/O.
+StageExecutor sends each stage to a thread pool, a process pool or runs it
+inline, as configured per stage, while network I/O stays on the loop.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+POOL_KINDS = ('thread', 'process', 'inline')
+
+# Pandas parsing and cleaning release the GIL for much of their work and
+# return large frames, so threads avoid pickling them; so does reducing a
+# frame to the small aggregates charts are drawn from. Profiling returns
+# small sketches and matplotlib is not thread-safe, so those use processes.
+DEFAULT_STAGE_POOLS = {
+    'parse': 'thread',
+    'profile': 'process',
+    'clean': 'thread',
+    'aggregate': 'thread',
+    'visualize': 'process'
+}
+
+class StageExecutor:
+    """Class that runs pipeline stages in the pool configured for each of them."""
+
+    def __init__(
+        self,
+        stage_pools: Optional[Dict[str, str]] = None,
+        thread_workers: Optional[int] = None,
+        process_workers: Optional[int] = None
+    ):
+        """
+        Initialize the StageExecutor.
+
+        Args:
+            stage_pools (Optional[Dict[str, str]]): Pool kind ('thread',
+                'process' or 'inline') by stage name, on top of the defaults.
+            thread_workers (Optional[int]): Size of the thread pool; Python's
+                default when not set.
+            process_workers (Optional[int]): Size of the process pool; the
+                number of CPUs when not set.
+        """
+        self.stage_pools = {**DEFAULT_STAGE_POOLS, **(stage_pools or {})}
+        for stage, kind in self.stage_pools.items():
+            if kind not in POOL_KINDS:
+                raise ValueError(f"Invalid pool kind for stage {stage}: {kind}")
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pipeline objects holding an executor are pickled into worker
+        # processes; there, any stage they submit simply runs inline.
+        return {
+            'stage_pools': {stage: 'inline' for stage in self.stage_pools},
+            'thread_workers': self.thread_workers,
+            'process_workers': self.process_workers,
+            '_threads': None,
+            '_processes': None
+        }
+
+    def pool_for(self, stage: str) -> Optional[Executor]:
+        """
+        Return the pool a stage runs in, creating it on first use.
+
+        Args:
+            stage (str): Name of the stage.
+
+        Returns:
+            Optional[Executor]: Pool for the stage, or None to run inline.
+        """
+        kind = self.stage_pools.get(stage, 'inline')
+        if kind == 'thread':
+            return self._thread_pool()
+        if kind == 'process':
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.process_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"Started process pool with {self.process_workers or os.cpu_count()} workers")
+            return self._processes
+        return None
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        """Return the thread pool, creating it on first use."""
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix='pipeline-stage')
+        return self._threads
+
+    async def run(self, stage: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a function in the pool of a stage and wait for its result.
+
+        Functions for process stages, and their arguments, must be picklable;
+        changes they make to their arguments are not seen by the caller.
+
+        Args:
+            stage (str): Name of the stage.
+            func (Callable[..., Any]): Function to run.
+            *args (Any): Positional arguments for the function.
+            **kwargs (Any): Keyword arguments for the function.
+
+        Returns:
+            Any: Return value of the function.
+        """
+        pool = self.pool_for(stage)
+        if pool is None:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+
+    async def iterate(self, stage: str, iterable: Iterable[Any]) -> AsyncIterator[Any]:
+        """
+        Pull the items of a blocking iterator without blocking the loop.
+
+        Iterators cannot move between processes, so a process stage is
+        iterated in the thread pool instead.
+
+        Args:
+            stage (str): Name of the stage.
+            iterable (Iterable[Any]): Iterable whose items are costly to produce.
+
+        Yields:
+            Any: Items of the iterable.
+        """
+        iterator = iter(iterable)
+        if self.stage_pools.get(stage, 'inline') == 'inline':
+            for item in iterator:
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        pool = self._thread_pool()
+        done = object()
+        while True:
+            item = await loop.run_in_executor(pool, next, iterator, done)
+            if item is done:
+                return
+            yield item
+
+    def shutdown(self, wait: bool = True):
+        """
+        Shut down the pools that were started.
+
+        Args:
+            wait (bool): Whether to wait for running work to finish.
+        """
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+        self._threads = None
+        self._processes = None
+
+async def run_stage(
+    executor: Optional[StageExecutor],
+    stage: str,
+    func: Callable[..., Any],
+    *args: Any,
+    **kwargs: Any
+) -> Any:
+    """
+    Run a stage in an executor, or inline when there is none.
+
+    Args:
+        executor (Optional[StageExecutor]): Executor to use, if any.
+        stage (str): Name of the stage.
+        func (Callable[..., Any]): Function to run.
+        *args (Any): Positional arguments for the function.
+        **kwargs (Any): Keyword arguments for the function.
+
+    Returns:
+        Any: Return value of the function.
+    """
+    if executor is None:
+        return func(*args, **kwargs)
+    return await executor.run(stage, func, *args, **kwargs)
@@ -0,0 +1,143 @@
+"""
+Module for bulk loading DataFrames with Postgres COPY.
+
+Rows are sent with asyncpg's binary ``COPY ... FROM STDIN`` in batches.
+Each batch is converted column by column into Python values that match the
+target SQL types, and rows are zipped lazily, so no list of tuples for the
+whole frame is ever built.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import asyncpg
+import numpy as np
+import pandas as pd
+
+from data_pipeline import metrics
+
+logger = logging.getLogger(__name__)
+
+# Called after every batch with (table_name, rows_done, rows_total)
+ProgressCallback = Callable[[str, int, int], None]
+
+_INTEGER_TYPES = {'SMALLINT', 'INTEGER', 'INT', 'BIGINT', 'SERIAL', 'BIGSERIAL'}
+_FLOAT_TYPES = {'FLOAT', 'REAL', 'DOUBLE PRECISION'}
+_DECIMAL_TYPES = {'NUMERIC', 'DECIMAL'}
+
+async def copy_frame(
+    conn: asyncpg.Connection,
+    table_name: str,
+    df: pd.DataFrame,
+    sql_data_types: Dict[str, str],
+    batch_size: int = 50000,
+    progress: Optional[ProgressCallback] = None
+) -> int:
+    """
+    Copy the rows of a DataFrame into a table in batches.
+
+    Args:
+        conn (asyncpg.Connection): Open database connection.
+        table_name (str): Name of the table to copy into.
+        df (pd.DataFrame): Cleaned data to copy.
+        sql_data_types (Dict[str, str]): Mapping of column names to SQL data types.
+        batch_size (int): Number of rows sent per COPY command.
+        progress (Optional[ProgressCallback]): Called after every batch.
+
+    Returns:
+        int: Number of rows copied.
+    """
+    columns = [col for col in df.columns if col.lower() != 'id']
+    total = len(df)
+    done = 0
+    started = time.perf_counter()
+    for start in range(0, total, batch_size):
+        batch = df.iloc[start:start + batch_size]
+        await conn.copy_records_to_table(
+            table_name,
+            records=frame_records(batch, columns, sql_data_types),
+            columns=columns
+        )
+        metrics.count('db_round_trips')
+        done += len(batch)
+        elapsed = time.perf_counter() - started
+        logger.debug(f"Copied {done}/{total} rows into {table_name} ({done / max(elapsed, 1e-9):.0f} rows/s)")
+        if progress is not None:
+            progress(table_name, done, total)
+    return done
+
+def frame_records(df: pd.DataFrame, columns: List[str], sql_data_types: Dict[str, str]) -> Iterator[tuple]:
+    """
+    Convert a DataFrame into row tuples of values the binary COPY codecs accept.
+
+    Args:
+        df (pd.DataFrame): Data to convert.
+        columns (List[str]): Columns to include, in table order.
+        sql_data_types (Dict[str, str]): Mapping of column names to SQL data types.
+
+    Returns:
+        Iterator[tuple]: Lazily zipped rows.
+    """
+    return zip(*(
+        column_values(df[column], sql_data_types.get(column, 'TEXT'))
+        for column in columns
+    ))
+
+def column_values(series: pd.Series, sql_type: str) -> List[Any]:
+    """
+    Convert one column into Python values for a SQL type, with None for nulls.
+
+    Args:
+        series (pd.Series): Column data.
+        sql_type (str): Target SQL data type, e.g. 'INTEGER' or 'VARCHAR(12)'.
+
+    Returns:
+        List[Any]: Converted values.
+    """
+    base_type = sql_type.split('(')[0].strip().upper()
+    mask = series.notna().to_numpy()
+
+    if base_type in _INTEGER_TYPES:
+        if pd.api.types.is_integer_dtype(series.dtype):
+            return series.tolist()
+        numeric = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+        mask &= ~np.isnan(numeric)
+        values = np.where(mask, numeric, 0).astype(np.int64).tolist()
+    elif base_type in _DECIMAL_TYPES and pd.api.types.is_integer_dtype(series.dtype):
+        # Keep integers exact, they may be beyond the range of a float
+        return series.tolist()
+    elif base_type in _FLOAT_TYPES or base_type in _DECIMAL_TYPES:
+        numeric = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+        mask &= ~np.isnan(numeric)
+        values = numeric.tolist()
+    elif base_type == 'BOOLEAN':
+        values = series.astype(object).map(_to_bool).tolist()
+    elif base_type == 'DATE':
+        values = pd.to_datetime(series, errors='coerce').dt.date.tolist()
+        mask &= pd.notna(values)
+    elif base_type == 'TIMESTAMP':
+        timestamps = pd.to_datetime(series, errors='coerce')
+        mask &= timestamps.notna().to_numpy()
+        values = list(timestamps.dt.to_pydatetime())
+    else:
+        if pd.api.types.infer_dtype(series, skipna=True) == 'string':
+            values = series.tolist()
+        else:
+            values = series.astype(str).tolist()
+
+    if not mask.all():
+        for position in np.flatnonzero(~mask):
+            values[position] = None
+    return values
+
+def _to_bool(value: Any) -> Optional[bool]:
+    """Interpret common true/false spellings; None when unknown."""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in ('true', 't', 'yes', 'y', '1'):
+        return True
+    if text in ('false', 'f', 'no', 'n', '0'):
+        return False
+    return None
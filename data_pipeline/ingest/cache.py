@@ -0,0 +1,188 @@
+"""
+Module for caching parsed and cleaned datasets as Arrow files.
+
+Parsing CSV text is the most expensive step of reading a dataset, and every
+rerun repeats it. The cache keeps each parsed or cleaned dataset in the
+Arrow IPC (Feather v2) format, keyed by the source file's fingerprint and
+the settings it was produced with, so it is parsed only once.
+
+Files are written uncompressed and read through a memory map. Numeric
+columns without missing values come back without being copied, and
+reading only some of the columns touches only their pages. The cache is
+kept under a size limit by evicting the least recently used files.
+
+pyarrow is optional (the `arrow` extra): without it the cache is disabled
+and datasets are parsed every time.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the parser or cleaner changes what a cached dataset holds
+CACHE_VERSION = 2
+
+CACHE_SUFFIX = '.arrow'
+
+class DatasetCache:
+    """Class for storing datasets as memory-mapped Arrow files."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Initialize the DatasetCache.
+
+        Args:
+            cache_dir (Path): Directory holding the cached files.
+            max_bytes (int): Size the cache is kept under by evicting the
+                least recently used files.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = pa is not None
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            logger.warning("pyarrow is not installed (poetry install --extras arrow); datasets will not be cached")
+
+    def read(
+        self,
+        file_path: Path,
+        kind: str,
+        columns: Optional[List[str]] = None,
+        variant: str = ''
+    ) -> Optional[pd.DataFrame]:
+        """
+        Read a cached dataset.
+
+        Args:
+            file_path (Path): Source file of the dataset.
+            kind (str): Kind of dataset, e.g. 'parsed' or 'cleaned'.
+            columns (Optional[List[str]]): Columns to read; all when not set.
+            variant (str): Settings the dataset was produced with.
+
+        Returns:
+            Optional[pd.DataFrame]: The dataset, or None if it is not cached
+                for the current version of the file and these settings.
+
+        Raises:
+            KeyError: If one of the columns is not in the dataset.
+        """
+        if not self.enabled:
+            return None
+        entry = self._entry_path(file_path, kind, variant)
+        if entry is None or not entry.exists():
+            return None
+        try:
+            # Uncompressed and memory-mapped, so nothing is read until used
+            table = feather.read_table(entry, memory_map=True)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(f"Discarding unreadable cache entry {entry.name}: {e}")
+            entry.unlink(missing_ok=True)
+            return None
+        if columns is not None:
+            table = table.select(columns)
+        df = table.to_pandas(split_blocks=True)
+        # Mark as recently used for eviction
+        os.utime(entry)
+        logger.info(f"Read {kind} {Path(file_path).name} from the dataset cache")
+        return df
+
+    def write(self, file_path: Path, kind: str, df: pd.DataFrame, variant: str = '') -> bool:
+        """
+        Cache a dataset, replacing those of older versions of the file or
+        other settings.
+
+        Args:
+            file_path (Path): Source file of the dataset.
+            kind (str): Kind of dataset, e.g. 'parsed' or 'cleaned'.
+            df (pd.DataFrame): The dataset.
+            variant (str): Settings the dataset was produced with.
+
+        Returns:
+            bool: Whether the dataset was cached.
+        """
+        if not self.enabled:
+            return False
+        entry = self._entry_path(file_path, kind, variant)
+        if entry is None:
+            return False
+        temporary = entry.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            feather.write_feather(table, temporary, compression='uncompressed')
+            os.replace(temporary, entry)
+        except (OSError, pa.ArrowException, TypeError, ValueError) as e:
+            logger.warning(f"Could not cache {kind} {Path(file_path).name}: {e}")
+            temporary.unlink(missing_ok=True)
+            return False
+
+        for stale in self.cache_dir.glob(f"{self._source_key(file_path)}-{kind}-*{CACHE_SUFFIX}"):
+            if stale != entry:
+                stale.unlink(missing_ok=True)
+        self.evict()
+        return True
+
+    def invalidate(self, file_path: Optional[Path] = None) -> int:
+        """
+        Remove cached datasets.
+
+        Args:
+            file_path (Optional[Path]): Source file whose datasets to remove;
+                the whole cache when not set.
+
+        Returns:
+            int: Number of files removed.
+        """
+        if not self.enabled:
+            return 0
+        pattern = f"{self._source_key(file_path)}-*" if file_path is not None else "*"
+        removed = 0
+        for entry in self.cache_dir.glob(pattern + CACHE_SUFFIX):
+            entry.unlink(missing_ok=True)
+            removed += 1
+        logger.info(f"Removed {removed} files from the dataset cache")
+        return removed
+
+    def evict(self):
+        """Remove the least recently used files until the cache fits its size limit."""
+        entries = []
+        for entry in self.cache_dir.glob('*' + CACHE_SUFFIX):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            logger.info(f"Evicted {entry.name} from the dataset cache")
+
+    def _entry_path(self, file_path: Path, kind: str, variant: str = '') -> Optional[Path]:
+        """Cache file of a dataset for the current version of its source file and settings."""
+        try:
+            stat = Path(file_path).stat()
+        except OSError:
+            return None
+        fingerprint = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}:{CACHE_VERSION}:{variant}".encode()).hexdigest()[:16]
+        return self.cache_dir / f"{self._source_key(file_path)}-{kind}-{fingerprint}{CACHE_SUFFIX}"
+
+    @staticmethod
+    def _source_key(file_path: Path) -> str:
+        """Key of a source file, stable across its versions."""
+        return hashlib.sha256(str(Path(file_path).resolve()).encode()).hexdigest()[:16]
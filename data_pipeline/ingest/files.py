@@ -0,0 +1,171 @@
+"""
+Module for loading CSV files into DataFrames.
+
+Reading files needs no database, so this module is kept apart from the
+database loaders and does not import asyncpg.
+"""
+
+import logging
+import re
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+from data_pipeline.executor import StageExecutor, run_stage
+from data_pipeline.ingest.cache import DatasetCache
+from data_pipeline.ingest.reader import CSVChunkReader
+
+logger = logging.getLogger(__name__)
+
+class CSVLoader:
+    """Class for loading and processing CSV files."""
+
+    def __init__(
+        self,
+        data_dir: Path,
+        chunk_bytes: int = 64 * 1024 * 1024,
+        executor: Optional[StageExecutor] = None,
+        cache: Optional[DatasetCache] = None
+    ):
+        """
+        Initialize the CSVLoader.
+
+        Args:
+            data_dir (Path): Directory containing CSV files.
+            chunk_bytes (int): Size of the blocks the file is parsed in.
+            executor (Optional[StageExecutor]): Runs the parsing off the event
+                loop; inline when not set.
+            cache (Optional[DatasetCache]): Cache of parsed and cleaned
+                datasets; every load parses the file when not set.
+        """
+        self.data_dir = data_dir
+        self.chunk_bytes = chunk_bytes
+        self.executor = executor
+        self.cache = cache
+
+    def get_csv_files(self) -> List[str]:
+        """
+        Get a list of CSV files in the data directory.
+
+        Returns:
+            List[str]: List of CSV filenames.
+        """
+        return [f.name for f in self.data_dir.glob('*.csv')]
+
+    async def load_csv(self, filename: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Load a CSV file asynchronously.
+
+        The parsed file is read from the cache when it holds the current
+        version of the file, and stored there otherwise.
+
+        Args:
+            filename (str): Name of the CSV file to load.
+            columns (Optional[List[str]]): Columns to load; all when not set.
+
+        Returns:
+            Optional[pd.DataFrame]: Loaded DataFrame or None if loading fails.
+
+        Raises:
+            KeyError: If one of the columns is not in the file.
+        """
+        file_path = self.data_dir / filename
+        df = await self._read_cached(file_path, 'parsed', columns)
+        if df is not None:
+            return df
+        try:
+            df = await run_stage(self.executor, 'parse', self._read_file, file_path)
+            logger.info(f"Successfully loaded {filename}")
+        except (IOError, pd.errors.EmptyDataError) as e:
+            logger.error(f"Error loading {filename}: {str(e)}")
+            return None
+        await self._write_cached(file_path, 'parsed', df)
+        return df[columns] if columns is not None else df
+
+    async def load_cleaned(
+        self,
+        filename: str,
+        columns: Optional[List[str]] = None,
+        settings: str = ''
+    ) -> Optional[pd.DataFrame]:
+        """
+        Load the cleaned data of a CSV file from the cache.
+
+        Args:
+            filename (str): Name of the CSV file.
+            columns (Optional[List[str]]): Columns to load; all when not set.
+            settings (str): Settings of the cleaner, see DataCleaner.cache_key.
+
+        Returns:
+            Optional[pd.DataFrame]: Cleaned DataFrame, or None if it is not
+                cached for the current version of the file and these settings.
+        """
+        return await self._read_cached(self.data_dir / filename, 'cleaned', columns, settings)
+
+    async def save_cleaned(self, filename: str, df: pd.DataFrame, settings: str = '') -> bool:
+        """
+        Store the cleaned data of a CSV file in the cache.
+
+        Args:
+            filename (str): Name of the CSV file.
+            df (pd.DataFrame): Cleaned DataFrame.
+            settings (str): Settings of the cleaner, see DataCleaner.cache_key.
+
+        Returns:
+            bool: Whether the data was cached.
+        """
+        return await self._write_cached(self.data_dir / filename, 'cleaned', df, settings)
+
+    async def _read_cached(
+        self,
+        file_path: Path,
+        kind: str,
+        columns: Optional[List[str]],
+        variant: str = ''
+    ) -> Optional[pd.DataFrame]:
+        """Read a dataset from the cache off the event loop, if there is a cache."""
+        if self.cache is None:
+            return None
+        return await run_stage(self.executor, 'parse', self.cache.read, file_path, kind, columns, variant)
+
+    async def _write_cached(self, file_path: Path, kind: str, df: pd.DataFrame, variant: str = '') -> bool:
+        """Write a dataset to the cache off the event loop, if there is a cache."""
+        if self.cache is None:
+            return False
+        return await run_stage(self.executor, 'parse', self.cache.write, file_path, kind, df, variant)
+
+    def _read_file(self, file_path: Path) -> pd.DataFrame:
+        """
+        Parse a whole CSV file into one DataFrame.
+
+        Args:
+            file_path (Path): Path to the CSV file.
+
+        Returns:
+            pd.DataFrame: Contents of the file.
+        """
+        reader = CSVChunkReader(file_path, chunk_bytes=self.chunk_bytes)
+        chunks = list(reader)
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=reader.columns)
+
+    def get_valid_table_name(self, filename: str) -> str:
+        """
+        Generate a valid PostgreSQL table name from a filename.
+
+        Args:
+            filename (str): Original filename.
+
+        Returns:
+            str: Valid PostgreSQL table name.
+        """
+        # Remove file extension and convert to lowercase
+        table_name = Path(filename).stem.lower()
+        # Replace hyphens and spaces with underscores
+        table_name = re.sub(r'[-\s]', '_', table_name)
+        # Remove any characters that are not alphanumeric or underscore
+        table_name = re.sub(r'[^\w]', '', table_name)
+        # Ensure the table name doesn't start with a number
+        if table_name[0].isdigit():
+            table_name = f"t_{table_name}"
+        return table_name
@@ -1,92 +1,51 @@
 """
-Module for loading CSV files and managing database operations.
+Module for managing database operations.
 """
 
 import logging
-from typing import List, Optional, Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional, Dict
 from pathlib import Path
-import io
 import pandas as pd
-import aiofiles
 import asyncpg
 import re
 
-logger = logging.getLogger(__name__)
-
-class CSVLoader:
-    """Class for loading and processing CSV files."""
-
-    def __init__(self, data_dir: Path):
-        """
-        Initialize the CSVLoader.
-
-        Args:
-            data_dir (Path): Directory containing CSV files.
-        """
-        self.data_dir = data_dir
-
-    def get_csv_files(self) -> List[str]:
-        """
-        Get a list of CSV files in the data directory.
-
-        Returns:
-            List[str]: List of CSV filenames.
-        """
-        return [f.name for f in self.data_dir.glob('*.csv')]
-
-    async def load_csv(self, filename: str) -> Optional[pd.DataFrame]:
-        """
-        Load a CSV file asynchronously.
-
-        Args:
-            filename (str): Name of the CSV file to load.
-
-        Returns:
-            Optional[pd.DataFrame]: Loaded DataFrame or None if loading fails.
-        """
-        file_path = self.data_dir / filename
-        try:
-            async with aiofiles.open(file_path, mode='r') as f:
-                content = await f.read()
-            df = pd.read_csv(io.StringIO(content))
-            logger.info(f"Successfully loaded {filename}")
-            return df
-        except (IOError, pd.errors.EmptyDataError) as e:
-            logger.error(f"Error loading {filename}: {str(e)}")
-            return None
+from data_pipeline.ingest.bulk import ProgressCallback, copy_frame
+from data_pipeline.ingest.pool import PoolManager
+from data_pipeline.transform.transformer import MLB_BAT_TRACKING_TRANSFORMATIONS, TransformationEngine
+from data_pipeline.transform.validator import MLB_BAT_TRACKING_RULES, TableValidator
 
-    def get_valid_table_name(self, filename: str) -> str:
-        """
-        Generate a valid PostgreSQL table name from a filename.
-
-        Args:
-            filename (str): Original filename.
-
-        Returns:
-            str: Valid PostgreSQL table name.
-        """
-        # Remove file extension and convert to lowercase
-        table_name = Path(filename).stem.lower()
-        # Replace hyphens and spaces with underscores
-        table_name = re.sub(r'[-\s]', '_', table_name)
-        # Remove any characters that are not alphanumeric or underscore
-        table_name = re.sub(r'[^\w]', '', table_name)
-        # Ensure the table name doesn't start with a number
-        if table_name[0].isdigit():
-            table_name = f"t_{table_name}"
-        return table_name
+logger = logging.getLogger(__name__)
 
 class DBLoader:
     """Class for database operations."""
 
-    def __init__(self, db_config: dict):
+    def __init__(
+        self,
+        db_config: dict,
+        batch_size: int = 50000,
+        progress: Optional[ProgressCallback] = None,
+        pools: Optional[PoolManager] = None
+    ):
         """
         Initialize the DBLoader.
 
         Args:
             db_config (dict): Database configuration parameters.
+            batch_size (int): Number of rows sent per COPY command.
+            progress (Optional[ProgressCallback]): Called after every copied
+                batch with (table_name, rows_done, rows_total).
+            pools (Optional[PoolManager]): Shared connection pools; one is
+                created from db_config when not given.
         """
         self.db_config = db_config
+        self.batch_size = batch_size
+        self.progress = progress
+        self.pools = pools or PoolManager(db_config)
+
+    async def close(self):
+        """Close the connection pools."""
+        await self.pools.close()
 
     async def get_or_create_database(self, csv_files: List[str]) -> Optional[str]:
         """
@@ -99,8 +58,7 @@ class DBLoader:
             Optional[str]: Database name or None if operation fails.
         """
         try:
-            conn = await asyncpg.connect(**self.db_config, database='postgres')
-            try:
+            async with self.pools.acquire('postgres') as conn:
                 for csv_file in csv_files:
                     db_name = Path(csv_file).stem.lower()
                     db_name = re.sub(r'[-\s]', '_', db_name)  # Replace hyphens and spaces with underscores
@@ -117,8 +75,6 @@ class DBLoader:
                 await conn.execute(f'CREATE DATABASE "{db_name}"')
                 logger.info(f"Database {db_name} created successfully.")
                 return db_name
-            finally:
-                await conn.close()
         except asyncpg.PostgresError as e:
             logger.error(f"Error checking/creating database: {e}")
             return None
@@ -134,8 +90,7 @@ class DBLoader:
             sql_data_types (Dict[str, str]): Mapping of column names to SQL data types.
         """
         try:
-            conn = await asyncpg.connect(**self.db_config, database=db_name)
-            try:
+            async with self.pools.acquire(db_name) as conn:
                 columns = [f'"{col}" {sql_data_types[col]}' for col in df.columns if col.lower() != 'id']
                 
                 create_table_query = f"""
@@ -146,12 +101,24 @@ class DBLoader:
                 """
                 await conn.execute(create_table_query)
                 logger.info(f"Table {table_name} created successfully in database {db_name}.")
-            finally:
-                await conn.close()
         except asyncpg.PostgresError as e:
             logger.error(f"Error creating table: {e}")
 
-    async def insert_data(self, db_name: str, table_name: str, df: pd.DataFrame, sql_data_types: Dict[str, str]):
+    async def drop_table(self, db_name: str, table_name: str):
+        """
+        Drop a table if it exists.
+
+        Args:
+            db_name (str): Name of the database.
+            table_name (str): Name of the table to drop.
+        """
+        try:
+            async with self.pools.acquire(db_name) as conn:
+                await conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        except asyncpg.PostgresError as e:
+            logger.error(f"Error dropping table: {e}")
+
+    async def insert_data(self, db_name: str, table_name: str, df: pd.DataFrame, sql_data_types: Dict[str, str]) -> bool:
         """
         Insert data into the database table.
 
@@ -160,10 +127,12 @@ class DBLoader:
             table_name (str): Name of the table to insert data into.
             df (pd.DataFrame): DataFrame containing the data to insert.
             sql_data_types (Dict[str, str]): Mapping of column names to SQL data types.
+
+        Returns:
+            bool: Whether the data was inserted.
         """
         try:
-            conn = await asyncpg.connect(**self.db_config, database=db_name)
-            try:
+            async with self.pools.acquire(db_name) as conn:
                 # Check if table exists
                 table_exists = await conn.fetchval(
                     "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = $1)",
@@ -171,117 +140,186 @@ class DBLoader:
                 )
                 if not table_exists:
                     logger.error(f"Table {table_name} does not exist. Cannot insert data.")
-                    return
+                    return False
 
                 # Check if table is empty
                 count = await conn.fetchval(f'SELECT COUNT(*) FROM "{table_name}"')
                 if count > 0:
                     logger.info(f"Table {table_name} already contains data. Skipping insertion.")
-                    return
+                    return False
 
-                # Prepare data for insertion
-                columns = [col for col in df.columns if col.lower() != 'id']
-                values = [tuple(row) for _, row in df[columns].iterrows()]
-                
-                # Construct the INSERT query
-                insert_query = f"""
-                INSERT INTO "{table_name}" ({', '.join(f'"{col}"' for col in columns)})
-                VALUES ({', '.join(['$' + str(i+1) for i in range(len(columns))])})
-                """
-                
-                # Execute the INSERT query for all rows
-                await conn.executemany(insert_query, values)
+                # The table may have been swapped for a new one since this
+                # connection cached its column types for COPY
+                await conn.reload_schema_state()
+                await copy_frame(conn, table_name, df, sql_data_types, self.batch_size, self.progress)
                 logger.info(f"Data inserted into {table_name} in database {db_name} successfully.")
-            finally:
-                await conn.close()
+                return True
         except asyncpg.PostgresError as e:
             logger.error(f"Error inserting data: {e}")
+            return False
 
-    async def apply_transformations(self, db_name: str, table_name: str):
+    @asynccontextmanager
+    async def open_writer(
+        self,
+        db_name: str,
+        table_name: str,
+        sql_data_types: Dict[str, str],
+        append: bool = False
+    ) -> AsyncIterator[Optional["TableWriter"]]:
+        """
+        Open a writer that streams cleaned chunks into an existing table.
+
+        The same skip rules as insert_data apply: if the table is missing or
+        already contains data, None is yielded and nothing is written.
+
+        Args:
+            db_name (str): Name of the database.
+            table_name (str): Name of the table to write to.
+            sql_data_types (Dict[str, str]): Mapping of column names to SQL data types.
+            append (bool): Add rows to a table that already has data. The
+                writes then form one transaction, committed when the writer
+                is closed without an error.
+
+        Yields:
+            Optional[TableWriter]: Writer bound to one connection, or None.
+        """
+        async with self.pools.acquire(db_name) as conn:
+            table_exists = await conn.fetchval(
+                "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = $1)",
+                table_name
+            )
+            if not table_exists:
+                logger.error(f"Table {table_name} does not exist. Cannot insert data.")
+                yield None
+                return
+
+            # The table may have been swapped for a new one since this
+            # connection cached its column types for COPY
+            await conn.reload_schema_state()
+            if append:
+                async with conn.transaction():
+                    yield TableWriter(conn, table_name, dict(sql_data_types), self.batch_size, self.progress)
+                return
+
+            count = await conn.fetchval(f'SELECT COUNT(*) FROM "{table_name}"')
+            if count > 0:
+                logger.info(f"Table {table_name} already contains data. Skipping insertion.")
+                yield None
+                return
+
+            yield TableWriter(conn, table_name, dict(sql_data_types), self.batch_size, self.progress)
+
+    async def apply_transformations(
+        self,
+        db_name: str,
+        table_name: str,
+        profile: Optional[Dict[str, Any]] = None,
+        transformations: Optional[List[Dict[str, Any]]] = None
+    ) -> bool:
         """
         Apply data transformations to the table.
 
         Args:
             db_name (str): Name of the database.
             table_name (str): Name of the table to transform.
+            profile (Optional[Dict[str, Any]]): Profile of the loaded file. When it
+                has streaming statistics for a column, they replace the
+                aggregates that would otherwise be recomputed over the table.
+            transformations (Optional[List[Dict[str, Any]]]): Transformation
+                spec (see TransformationEngine); the MLB bat tracking
+                transformations when not given.
+
+        Returns:
+            bool: Whether the transformations were applied.
         """
-        try:
-            conn = await asyncpg.connect(**self.db_config, database=db_name)
-            try:
-                # Apply transformations
-                transformations = [
-                    f"""
-                    -- Standardize scales (convert percentages to 0-1 scale)
-                    UPDATE "{table_name}"
-                    SET percent_swings_competitive = percent_swings_competitive / 100;
-                    """,
-                    f"""
-                    -- Handle outliers (using a capping method for batter_run_value)
-                    UPDATE "{table_name}"
-                    SET batter_run_value = 
-                        CASE 
-                            WHEN batter_run_value > (SELECT AVG(batter_run_value) + 3 * STDDEV(batter_run_value) FROM "{table_name}")
-                            THEN (SELECT AVG(batter_run_value) + 3 * STDDEV(batter_run_value) FROM "{table_name}")
-                            WHEN batter_run_value < (SELECT AVG(batter_run_value) - 3 * STDDEV(batter_run_value) FROM "{table_name}")
-                            THEN (SELECT AVG(batter_run_value) - 3 * STDDEV(batter_run_value) FROM "{table_name}")
-                            ELSE batter_run_value
-                        END;
-                    """,
-                    f"""
-                    -- Consistent naming conventions
-                    ALTER TABLE "{table_name}"
-                    RENAME COLUMN avg_bat_speed TO average_bat_speed;
-                    """,
-                    f"""
-                    -- Feature engineering: Create contact_rate
-                    ALTER TABLE "{table_name}"
-                    ADD COLUMN contact_rate FLOAT;
-
-                    UPDATE "{table_name}"
-                    SET contact_rate = CAST(contact AS FLOAT) / NULLIF(swings_competitive, 0);
-                    """,
-                    f"""
-                    -- Data validation: Ensure whiff_per_swing is consistent
-                    UPDATE "{table_name}"
-                    SET whiff_per_swing = CAST(whiffs AS FLOAT) / NULLIF(swings_competitive, 0)
-                    WHERE ABS(whiff_per_swing - (CAST(whiffs AS FLOAT) / NULLIF(swings_competitive, 0))) > 0.0001;
-                    """
-                ]
-                
-                for transformation in transformations:
-                    await conn.execute(transformation)
-                
-                logger.info(f"Transformations applied successfully to table {table_name}.")
-            finally:
-                await conn.close()
-        except asyncpg.PostgresError as e:
-            logger.error(f"Error applying transformations: {e}")
+        if transformations is None:
+            transformations = MLB_BAT_TRACKING_TRANSFORMATIONS
+        return await TransformationEngine(self.pools).apply(db_name, table_name, transformations, profile)
 
-    async def validate_data(self, db_name: str, table_name: str):
+    async def validate_data(
+        self,
+        db_name: str,
+        table_name: str,
+        rules: Optional[List[Dict[str, Any]]] = None,
+        sample_percent: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Validate the data in the table after transformations.
 
         Args:
             db_name (str): Name of the database.
             table_name (str): Name of the table to validate.
+            rules (Optional[List[Dict[str, Any]]]): Validation rules (see
+                TableValidator); the MLB bat tracking rules when not given.
+            sample_percent (Optional[float]): Check only this percentage of
+                the table, for a fast approximate result.
+
+        Returns:
+            Optional[Dict[str, Any]]: Pass/fail counts per rule, or None if
+                validation could not run.
         """
-        try:
-            conn = await asyncpg.connect(**self.db_config, database=db_name)
-            try:
-                # Perform validation queries
-                validation_queries = [
-                    f'SELECT COUNT(*) FROM "{table_name}" WHERE percent_swings_competitive > 1',
-                    f'SELECT COUNT(*) FROM "{table_name}" WHERE contact_rate IS NULL OR contact_rate < 0 OR contact_rate > 1',
-                    f'SELECT COUNT(*) FROM "{table_name}" WHERE ABS(whiff_per_swing - (CAST(whiffs AS FLOAT) / NULLIF(swings_competitive, 0))) > 0.0001'
-                ]
-                
-                for query in validation_queries:
-                    result = await conn.fetchval(query)
-                    if result > 0:
-                        logger.warning(f"Validation failed: {query} returned {result} rows.")
-                    else:
-                        logger.info(f"Validation passed: {query}")
-            finally:
-                await conn.close()
-        except asyncpg.PostgresError as e:
-            logger.error(f"Error during data validation: {e}")
\ No newline at end of file
+        if rules is None:
+            rules = MLB_BAT_TRACKING_RULES
+        result = await TableValidator(self.pools).validate(db_name, table_name, rules, sample_percent)
+        if result is not None:
+            for rule in result['rules']:
+                if rule['passed']:
+                    logger.info(f"Validation passed: {rule['name']}")
+                else:
+                    logger.warning(f"Validation failed: {rule['name']} on {rule['failures']} of {result['rows_checked']} rows.")
+        return result
+
+class TableWriter:
+    """Writes a stream of cleaned chunks into one table over a single connection."""
+
+    def __init__(
+        self,
+        conn: asyncpg.Connection,
+        table_name: str,
+        sql_data_types: Dict[str, str],
+        batch_size: int = 50000,
+        progress: Optional[ProgressCallback] = None
+    ):
+        """
+        Initialize the TableWriter.
+
+        Args:
+            conn (asyncpg.Connection): Open database connection.
+            table_name (str): Name of the table to write to.
+            sql_data_types (Dict[str, str]): Mapping of column names to SQL data types.
+            batch_size (int): Number of rows sent per COPY command.
+            progress (Optional[ProgressCallback]): Called after every copied batch.
+        """
+        self.conn = conn
+        self.table_name = table_name
+        self.sql_data_types = sql_data_types
+        self.batch_size = batch_size
+        self.progress = progress
+        self.rows_written = 0
+
+    async def write(self, df: pd.DataFrame):
+        """
+        Copy a cleaned chunk into the table.
+
+        Args:
+            df (pd.DataFrame): Cleaned chunk to insert.
+        """
+        self.rows_written += await copy_frame(
+            self.conn, self.table_name, df, self.sql_data_types, self.batch_size, self.progress
+        )
+
+    async def widen_columns(self, column_types: Dict[str, str]):
+        """
+        Change column types when later chunks no longer fit the settled types.
+
+        Args:
+            column_types (Dict[str, str]): Mapping of column names to new SQL data types.
+        """
+        for column, sql_type in column_types.items():
+            await self.conn.execute(
+                f'ALTER TABLE "{self.table_name}" ALTER COLUMN "{column}" TYPE {sql_type} USING "{column}"::{sql_type}'
+            )
+            self.sql_data_types[column] = sql_type
+            logger.info(f"Widened column {column} of {self.table_name} to {sql_type}.")
+        # COPY encodes rows with the cached column types, which are now stale
+        await self.conn.reload_schema_state()
@@ -0,0 +1,312 @@
+"""
+Module for tracking which source files have been loaded, and how far.
+
+A manifest table in each database records, per CSV file, its size and
+modification time, a hash of the bytes that were loaded, the byte offset
+and row count loaded so far, the column types of its table and the running
+profile of the loaded rows, as versioned JSON. From this, each run decides
+per file:
+
+- skip: the file is unchanged, so it is not even parsed;
+- append: the file only grew, so just the new tail is loaded, provided its
+  stored profile was written in the current layout;
+- replace: the file changed, so it is reloaded into a staging table that
+  is swapped in atomically;
+- load: the file was never loaded, which also goes through staging.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+import asyncpg
+
+from data_pipeline.ingest.pool import PoolManager
+from data_pipeline.profiling.profiler import profile_state_from_dict, profile_state_to_dict
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_TABLE = '_ingest_manifest'
+
+class IngestManifest:
+    """Class that decides how to ingest each file and records what was loaded."""
+
+    def __init__(self, pools: PoolManager, block_size: int = 8 * 1024 * 1024):
+        """
+        Initialize the IngestManifest.
+
+        Args:
+            pools (PoolManager): Shared connection pools.
+            block_size (int): Bytes read at a time while hashing files.
+        """
+        self.pools = pools
+        self.block_size = block_size
+        self._ready: Set[str] = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def staging_table_name(table_name: str) -> str:
+        """
+        Name of the table a full load is written to before it is swapped in.
+
+        Args:
+            table_name (str): Name of the target table.
+
+        Returns:
+            str: Name of the staging table.
+        """
+        return f"{table_name}__staging"
+
+    async def plan(self, db_name: str, file_path: Path, table_name: str) -> Dict[str, Any]:
+        """
+        Decide how a file has to be ingested.
+
+        A file whose size and modification time match the manifest is skipped
+        without reading it. Otherwise it is hashed once, which tells an
+        unchanged file that was merely touched, a file that only had rows
+        appended and a file that changed apart.
+
+        Args:
+            db_name (str): Name of the database.
+            file_path (Path): Path to the CSV file.
+            table_name (str): Name of the file's table.
+
+        Returns:
+            Dict[str, Any]: Plan with the action ('skip', 'append', 'replace'
+                or 'load'), the file's size, mtime_ns and content_hash, for
+                appends the start offset, the rows already loaded and the
+                stored column types, and for appends and skips the stored
+                profile state (None for a skip if none was stored).
+        """
+        file_path = Path(file_path)
+        stat = file_path.stat()
+        plan = {
+            'action': 'load',
+            'file_name': file_path.name,
+            'table_name': table_name,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_hash': None,
+            'start': None,
+            'row_count': 0,
+            'column_types': None,
+            'profile_state': None
+        }
+
+        async with self.pools.acquire(db_name) as conn:
+            await self._ensure_table(conn, db_name)
+            entry = await conn.fetchrow(f'SELECT * FROM "{MANIFEST_TABLE}" WHERE file_name = $1', file_path.name)
+            table_exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", f'"{table_name}"')
+
+        if entry is None or not table_exists or entry['table_name'] != table_name:
+            plan['content_hash'], _, _ = await asyncio.to_thread(self._hash_file, file_path, stat.st_size, 0)
+            return plan
+
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            plan.update(action='skip', profile_state=self._load_profile_state(entry))
+            return plan
+
+        loaded_bytes = entry['loaded_bytes']
+        content_hash, prefix_hash, ends_row = await asyncio.to_thread(
+            self._hash_file, file_path, stat.st_size, loaded_bytes
+        )
+        plan['content_hash'] = content_hash
+        if stat.st_size == loaded_bytes and content_hash == entry['content_hash']:
+            plan.update(action='skip', profile_state=self._load_profile_state(entry))
+            await self._touch(db_name, plan)
+        elif stat.st_size > loaded_bytes and prefix_hash == entry['content_hash'] and ends_row:
+            profile_state = self._load_profile_state(entry)
+            if profile_state is None:
+                plan['action'] = 'replace'
+                return plan
+            plan.update(
+                action='append',
+                start=loaded_bytes,
+                row_count=entry['row_count'],
+                column_types=json.loads(entry['column_types']),
+                profile_state=profile_state
+            )
+        else:
+            plan['action'] = 'replace'
+        return plan
+
+    @staticmethod
+    def _load_profile_state(entry: asyncpg.Record) -> Optional[Dict[str, Any]]:
+        """
+        Restore the running profile stored with a manifest entry.
+
+        Args:
+            entry (asyncpg.Record): Manifest entry of the file.
+
+        Returns:
+            Optional[Dict[str, Any]]: Running profile, or None if none is
+                stored or it was written by a version that cannot be resumed.
+        """
+        if entry['profile_state'] is None:
+            return None
+        try:
+            return profile_state_from_dict(json.loads(entry['profile_state']))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.info(f"Stored profile of {entry['file_name']} cannot be used ({e}).")
+            return None
+
+    async def swap_in(
+        self,
+        db_name: str,
+        plan: Dict[str, Any],
+        row_count: int,
+        column_types: Dict[str, str],
+        profile_state: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Replace a table by its staging table and record the load, atomically.
+
+        Readers see either the old table or the complete new one; if anything
+        fails, the old table and manifest entry are left as they were.
+
+        Args:
+            db_name (str): Name of the database.
+            plan (Dict[str, Any]): Plan from plan() that was carried out.
+            row_count (int): Rows loaded into the staging table.
+            column_types (Dict[str, str]): SQL data types of the new table.
+            profile_state (Optional[Dict[str, Any]]): Running profile of the
+                loaded rows, which allows later appends.
+
+        Returns:
+            bool: Whether the table was swapped in.
+        """
+        table_name = plan['table_name']
+        staging = self.staging_table_name(table_name)
+        try:
+            async with self.pools.acquire(db_name) as conn:
+                async with conn.transaction():
+                    await conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                    await conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table_name}"')
+                    await conn.execute(f'ALTER INDEX IF EXISTS "{staging}_pkey" RENAME TO "{table_name}_pkey"')
+                    sequence = await conn.fetchval("SELECT pg_get_serial_sequence($1, 'id')", f'"{table_name}"')
+                    if sequence:
+                        await conn.execute(f'ALTER SEQUENCE {sequence} RENAME TO "{table_name}_id_seq"')
+                    await self.record(conn, plan, row_count, column_types, profile_state)
+            logger.info(f"Swapped {staging} in as {table_name} ({row_count} rows).")
+            return True
+        except asyncpg.PostgresError as e:
+            logger.error(f"Error swapping in {staging}: {e}")
+            return False
+
+    async def record(
+        self,
+        conn: asyncpg.Connection,
+        plan: Dict[str, Any],
+        row_count: int,
+        column_types: Dict[str, str],
+        profile_state: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Store what has been loaded from a file.
+
+        Call it on the connection, and inside the transaction, that loaded
+        the rows, so the manifest never gets ahead of the table.
+
+        Args:
+            conn (asyncpg.Connection): Connection of the load.
+            plan (Dict[str, Any]): Plan from plan() that was carried out.
+            row_count (int): Rows of the file now in its table.
+            column_types (Dict[str, str]): SQL data types of the table.
+            profile_state (Optional[Dict[str, Any]]): Running profile of all
+                loaded rows; without it, growth of the file means a reload.
+        """
+        await conn.execute(
+            f"""
+            INSERT INTO "{MANIFEST_TABLE}" (
+                file_name, table_name, size, mtime_ns, content_hash,
+                loaded_bytes, row_count, column_types, profile_state, loaded_at
+            ) VALUES ($1, $2, $3, $4, $5, $3, $6, $7, $8::jsonb, now())
+            ON CONFLICT (file_name) DO UPDATE SET
+                table_name = EXCLUDED.table_name,
+                size = EXCLUDED.size,
+                mtime_ns = EXCLUDED.mtime_ns,
+                content_hash = EXCLUDED.content_hash,
+                loaded_bytes = EXCLUDED.loaded_bytes,
+                row_count = EXCLUDED.row_count,
+                column_types = EXCLUDED.column_types,
+                profile_state = EXCLUDED.profile_state,
+                loaded_at = EXCLUDED.loaded_at
+            """,
+            plan['file_name'], plan['table_name'], plan['size'], plan['mtime_ns'], plan['content_hash'],
+            row_count, json.dumps(column_types),
+            None if profile_state is None else json.dumps(profile_state_to_dict(profile_state))
+        )
+
+    async def _ensure_table(self, conn: asyncpg.Connection, db_name: str):
+        """Create the manifest table of a database if it does not exist yet."""
+        if db_name in self._ready:
+            return
+        # Concurrent CREATE TABLE IF NOT EXISTS can still collide in Postgres
+        async with self._locks.setdefault(db_name, asyncio.Lock()):
+            if db_name not in self._ready:
+                await self._create_table(conn)
+                self._ready.add(db_name)
+
+    @staticmethod
+    async def _create_table(conn: asyncpg.Connection):
+        """Create the manifest table if it does not exist."""
+        await conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{MANIFEST_TABLE}" (
+                file_name TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                size BIGINT NOT NULL,
+                mtime_ns BIGINT NOT NULL,
+                content_hash TEXT NOT NULL,
+                loaded_bytes BIGINT NOT NULL,
+                row_count BIGINT NOT NULL,
+                column_types TEXT NOT NULL,
+                profile_state JSONB,
+                loaded_at TIMESTAMPTZ NOT NULL
+            )
+        """)
+
+    async def _touch(self, db_name: str, plan: Dict[str, Any]):
+        """Record the new mtime of an unchanged file, so later runs skip it without hashing."""
+        async with self.pools.acquire(db_name) as conn:
+            await conn.execute(
+                f'UPDATE "{MANIFEST_TABLE}" SET mtime_ns = $2 WHERE file_name = $1',
+                plan['file_name'], plan['mtime_ns']
+            )
+
+    def _hash_file(self, file_path: Path, size: int, prefix: int) -> Tuple[str, Optional[str], bool]:
+        """
+        Hash a file up to a size in one read, noting the hash of a prefix.
+
+        Args:
+            file_path (Path): Path to the file.
+            size (int): Bytes to hash; the file may have grown since.
+            prefix (int): Length of the prefix to hash as well.
+
+        Returns:
+            Tuple[str, Optional[str], bool]: Hash of the first size bytes,
+                hash of the prefix (None if the file is shorter) and whether
+                the prefix ends with a newline, i.e. at a row boundary.
+        """
+        digest = hashlib.sha256()
+        prefix_hash = None
+        ends_row = False
+        done = 0
+        with open(file_path, 'rb') as f:
+            while done < size:
+                if done < prefix <= size:
+                    block = f.read(min(self.block_size, prefix - done))
+                else:
+                    block = f.read(min(self.block_size, size - done))
+                if not block:
+                    break
+                digest.update(block)
+                done += len(block)
+                if done == prefix:
+                    prefix_hash = digest.hexdigest()
+                    ends_row = block.endswith(b'\n')
+        if prefix == 0:
+            prefix_hash = hashlib.sha256().hexdigest()
+        return digest.hexdigest(), prefix_hash, ends_row
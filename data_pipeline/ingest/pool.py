@@ -0,0 +1,123 @@
+"""
+Module for shared asyncpg connection pools.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+import asyncpg
+
+from data_pipeline.metrics import count_query
+
+logger = logging.getLogger(__name__)
+
+class PoolManager:
+    """Class that owns one lazily created connection pool per database."""
+
+    def __init__(
+        self,
+        db_config: dict,
+        min_size: int = 1,
+        max_size: int = 10,
+        statement_cache_size: int = 100,
+        max_inactive_connection_lifetime: float = 300.0,
+        close_timeout: float = 10.0
+    ):
+        """
+        Initialize the PoolManager.
+
+        Args:
+            db_config (dict): Database configuration parameters.
+            min_size (int): Connections each pool keeps open.
+            max_size (int): Maximum connections per pool.
+            statement_cache_size (int): Prepared statements cached per connection.
+            max_inactive_connection_lifetime (float): Seconds after which idle
+                connections are closed.
+            close_timeout (float): Seconds to wait for a graceful shutdown
+                before connections are terminated.
+        """
+        self.db_config = db_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.max_inactive_connection_lifetime = max_inactive_connection_lifetime
+        self.close_timeout = close_timeout
+        self._pools: Dict[str, asyncpg.Pool] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get_pool(self, database: str) -> asyncpg.Pool:
+        """
+        Return the pool for a database, creating it on first use.
+
+        Args:
+            database (str): Name of the database.
+
+        Returns:
+            asyncpg.Pool: Connection pool for the database.
+        """
+        pool = self._pools.get(database)
+        if pool is not None:
+            return pool
+        lock = self._locks.setdefault(database, asyncio.Lock())
+        async with lock:
+            if database not in self._pools:
+                self._pools[database] = await asyncpg.create_pool(
+                    **self.db_config,
+                    database=database,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    statement_cache_size=self.statement_cache_size,
+                    max_inactive_connection_lifetime=self.max_inactive_connection_lifetime
+                )
+                logger.info(f"Created connection pool for database {database} ({self.min_size}-{self.max_size} connections)")
+            return self._pools[database]
+
+    @asynccontextmanager
+    async def acquire(self, database: str) -> AsyncIterator[asyncpg.Connection]:
+        """
+        Borrow a connection from the pool of a database.
+
+        Args:
+            database (str): Name of the database.
+
+        Yields:
+            asyncpg.Connection: Pooled connection, returned when the block exits.
+        """
+        pool = await self.get_pool(database)
+        async with pool.acquire() as conn:
+            # Queries count towards the metrics of the stage that borrowed the connection
+            with conn.query_logger(count_query):
+                yield conn
+
+    async def health_check(self) -> Dict[str, bool]:
+        """
+        Ping every pool and replace the ones that no longer answer.
+
+        Returns:
+            Dict[str, bool]: Whether each database answered.
+        """
+        results = {}
+        for database in list(self._pools):
+            try:
+                async with self.acquire(database) as conn:
+                    await conn.fetchval('SELECT 1')
+                results[database] = True
+            except (asyncpg.PostgresError, OSError, asyncpg.InterfaceError) as e:
+                logger.warning(f"Connection pool for database {database} failed its health check: {e}")
+                pool = self._pools.pop(database)
+                pool.terminate()
+                results[database] = False
+        return results
+
+    async def close(self):
+        """Close every pool, terminating connections that do not close in time."""
+        pools: List[asyncpg.Pool] = list(self._pools.values())
+        self._pools.clear()
+        for pool in pools:
+            try:
+                await asyncio.wait_for(pool.close(), timeout=self.close_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out closing a connection pool; terminating its connections.")
+                pool.terminate()
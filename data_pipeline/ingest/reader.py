@@ -0,0 +1,251 @@
+"""
+Module for reading CSV files in record-aligned chunks.
+"""
+
+import io
+import logging
+import mmap
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_BOM = b'\xef\xbb\xbf'
+
+def find_row_start(buf, start: int, target: int, end: int) -> int:
+    """
+    Find the first row boundary at or after a target offset.
+
+    Quote parity is tracked from ``start``, which must itself be a row
+    boundary, so newlines inside quoted fields are never treated as row ends.
+    Escaped quotes (``""``) leave the parity unchanged.
+
+    Args:
+        buf: Buffer supporting ``find`` and slicing, e.g. an mmap.
+        start (int): Offset of a known row boundary.
+        target (int): Offset from which to look for the next boundary.
+        end (int): Offset where the search stops.
+
+    Returns:
+        int: Offset just past the row-ending newline, or ``end``.
+    """
+    if target >= end:
+        return end
+    in_quotes = buf[start:target].count(b'"') % 2 == 1
+    pos = target
+    while True:
+        newline = buf.find(b'\n', pos, end)
+        if newline == -1:
+            return end
+        if buf[pos:newline].count(b'"') % 2 == 1:
+            in_quotes = not in_quotes
+        if not in_quotes:
+            return newline + 1
+        pos = newline + 1
+
+class CSVChunkReader:
+    """Class for memory-mapped, record-aligned chunked reading of a CSV file."""
+
+    def __init__(
+        self,
+        file_path: Union[str, Path],
+        chunk_rows: Optional[int] = 10000,
+        chunk_bytes: Optional[int] = None,
+        dtypes: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initialize the CSVChunkReader.
+
+        Args:
+            file_path (Union[str, Path]): Path to the CSV file.
+            chunk_rows (Optional[int]): Number of rows in each chunk.
+            chunk_bytes (Optional[int]): Approximate size of each chunk in bytes.
+                Takes precedence over chunk_rows when set.
+            dtypes (Optional[Dict[str, Any]]): Dtypes to parse every chunk
+                with; inferred from the first chunk read when not set.
+        """
+        if not chunk_bytes and not chunk_rows:
+            raise ValueError("Either chunk_rows or chunk_bytes must be set")
+        self.file_path = Path(file_path)
+        self.chunk_rows = chunk_rows
+        self.chunk_bytes = chunk_bytes
+        self.columns: List[str] = []
+        self.dtypes = dtypes
+        self.data_start = 0
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        """
+        Read the file chunk by chunk.
+
+        Yields:
+            pd.DataFrame: Chunk of the CSV file with the header's column names.
+        """
+        return self.iter_range()
+
+    def iter_range(self, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Read the rows between two row boundaries chunk by chunk.
+
+        Args:
+            start (Optional[int]): Byte offset of the first row; defaults to
+                the first data row.
+            end (Optional[int]): Byte offset where reading stops; defaults to
+                the end of the file.
+
+        Yields:
+            pd.DataFrame: Chunk of the CSV file with the header's column names.
+        """
+        with open(self.file_path, 'rb') as f:
+            if f.seek(0, io.SEEK_END) == 0:
+                raise pd.errors.EmptyDataError(f"No columns to parse from file {self.file_path}")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self._read_header(mm)
+                start = self.data_start if start is None else start
+                end = len(mm) if end is None else end
+                if self.chunk_bytes:
+                    yield from self._iter_blocks(mm, start, end, self.chunk_bytes)
+                else:
+                    yield from self._iter_rows(mm, start, end)
+
+    def read_dtypes(self) -> Optional[Dict[str, Any]]:
+        """
+        Infer the dtypes from the first block, as a read of the whole file would.
+
+        Readers of parts of the file that are given these dtypes parse their
+        rows the same way as one reader going through the whole file.
+
+        Returns:
+            Optional[Dict[str, Any]]: Dtypes by column, or None if the file
+                has no data rows.
+        """
+        if self.dtypes is None:
+            for _ in self:
+                break
+        return self.dtypes
+
+    def split_ranges(self, parts: int) -> List[Tuple[int, int]]:
+        """
+        Split the data rows into roughly equal, row-aligned byte ranges.
+
+        Args:
+            parts (int): Number of ranges wanted.
+
+        Returns:
+            List[Tuple[int, int]]: Non-empty (start, end) byte ranges covering
+                every data row exactly once, in file order.
+        """
+        with open(self.file_path, 'rb') as f:
+            if f.seek(0, io.SEEK_END) == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self._read_header(mm)
+                size = len(mm)
+                step = max((size - self.data_start) // max(parts, 1), 1)
+                boundaries = [self.data_start]
+                while boundaries[-1] < size:
+                    boundaries.append(find_row_start(mm, boundaries[-1], boundaries[-1] + step, size))
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    def _read_header(self, mm: mmap.mmap):
+        """
+        Parse the header row and remember where the data starts.
+
+        Args:
+            mm (mmap.mmap): Memory-mapped file.
+        """
+        header_start = len(_BOM) if mm[:len(_BOM)] == _BOM else 0
+        self.data_start = find_row_start(mm, header_start, header_start, len(mm))
+        header = pd.read_csv(io.BytesIO(mm[header_start:self.data_start]), nrows=0)
+        self.columns = header.columns.tolist()
+
+    def _iter_blocks(self, mm: mmap.mmap, start: int, end: int, block_bytes: int) -> Iterator[pd.DataFrame]:
+        """
+        Parse row-aligned blocks of roughly block_bytes between two row boundaries.
+
+        Args:
+            mm (mmap.mmap): Memory-mapped file.
+            start (int): Offset of the first row.
+            end (int): Offset where reading stops.
+            block_bytes (int): Target size of each block.
+
+        Yields:
+            pd.DataFrame: Parsed block.
+        """
+        row_offset = 0
+        while start < end:
+            stop = find_row_start(mm, start, start + block_bytes, end)
+            block = self._parse(mm[start:stop])
+            block.index = pd.RangeIndex(row_offset, row_offset + len(block))
+            row_offset += len(block)
+            start = stop
+            if not block.empty:
+                yield block
+
+    def _iter_rows(self, mm: mmap.mmap, start: int, end: int) -> Iterator[pd.DataFrame]:
+        """
+        Re-slice byte blocks into chunks of exactly chunk_rows rows.
+
+        The block size is estimated from the bytes per row seen so far.
+
+        Args:
+            mm (mmap.mmap): Memory-mapped file.
+            start (int): Offset of the first row.
+            end (int): Offset where reading stops.
+
+        Yields:
+            pd.DataFrame: Chunk of chunk_rows rows (the last one may be shorter).
+        """
+        row_bytes = max(self.data_start, 1)
+        pending: List[pd.DataFrame] = []
+        pending_rows = 0
+        row_offset = 0
+
+        while start < end or pending_rows:
+            if start < end and pending_rows < self.chunk_rows:
+                wanted = (self.chunk_rows - pending_rows) * row_bytes
+                stop = find_row_start(mm, start, start + max(wanted, 1), end)
+                block = self._parse(mm[start:stop])
+                if len(block):
+                    row_bytes = max((stop - start) // len(block), 1)
+                    pending.append(block)
+                    pending_rows += len(block)
+                start = stop
+                continue
+
+            buffered = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            if len(buffered) <= self.chunk_rows:
+                chunk, pending, pending_rows = buffered, [], 0
+            else:
+                chunk = buffered.iloc[:self.chunk_rows].copy()
+                pending = [buffered.iloc[self.chunk_rows:].copy()]
+                pending_rows = len(pending[0])
+
+            chunk.index = pd.RangeIndex(row_offset, row_offset + len(chunk))
+            row_offset += len(chunk)
+            yield chunk
+
+    def _parse(self, data: bytes) -> pd.DataFrame:
+        """
+        Parse a row-aligned block with the reader's dtypes, or those of its first block.
+
+        Blocks whose values no longer fit those dtypes (e.g. a null in an
+        integer column) fall back to pandas' own inference.
+
+        Args:
+            data (bytes): Raw bytes of complete rows.
+
+        Returns:
+            pd.DataFrame: Parsed rows.
+        """
+        if self.dtypes is None:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=self.columns)
+            if len(df):
+                self.dtypes = df.dtypes.to_dict()
+            return df
+        try:
+            return pd.read_csv(io.BytesIO(data), header=None, names=self.columns, dtype=self.dtypes)
+        except (ValueError, TypeError, OverflowError) as e:
+            logger.debug(f"Chunk of {self.file_path} does not fit the header dtypes ({e}); inferring.")
+            return pd.read_csv(io.BytesIO(data), header=None, names=self.columns)
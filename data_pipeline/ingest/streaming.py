@@ -0,0 +1,316 @@
+"""
+Module for single-pass ingestion of CSV files.
+
+One chunked scan of the file feeds the profiler, the cleaner and the database
+writer together. Column types are settled from a bounded look-ahead buffer and
+widened in place if later chunks no longer fit them.
+"""
+
+import logging
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from data_pipeline.cleaning.cleaner import DataCleaner
+from data_pipeline.cleaning.sql_types import infer_sql_types, widen_sql_type
+from data_pipeline.executor import StageExecutor
+from data_pipeline.ingest.loader import DBLoader, TableWriter
+from data_pipeline.ingest.manifest import IngestManifest
+from data_pipeline.ingest.reader import CSVChunkReader
+from data_pipeline.profiling.profiler import DataProfiler
+from data_pipeline.visualize.aggregates import ChartAggregates, aggregate_chunk
+
+logger = logging.getLogger(__name__)
+
+class StreamingIngestor:
+    """Class for profiling, cleaning and loading a CSV file in one pass."""
+
+    def __init__(
+        self,
+        profiler: DataProfiler,
+        cleaner: DataCleaner,
+        db_loader: DBLoader,
+        chunk_rows: int = 10000,
+        lookahead_rows: int = 50000,
+        chunk_bytes: Optional[int] = None,
+        executor: Optional[StageExecutor] = None,
+        manifest: Optional[IngestManifest] = None
+    ):
+        """
+        Initialize the StreamingIngestor.
+
+        Args:
+            profiler (DataProfiler): Profiler that accumulates the statistics.
+            cleaner (DataCleaner): Cleaner applied to every chunk.
+            db_loader (DBLoader): Loader used to create and fill the table.
+            chunk_rows (int): Number of rows in each chunk.
+            lookahead_rows (int): Rows buffered before column types are settled.
+            chunk_bytes (Optional[int]): Size of each chunk in bytes; chunks are
+                sized in rows when not set.
+            executor (Optional[StageExecutor]): Runs parsing and profiling of
+                the chunks off the event loop; inline when not set.
+            manifest (Optional[IngestManifest]): Records what was loaded from
+                each file; needed to carry out ingest plans.
+        """
+        self.profiler = profiler
+        self.cleaner = cleaner
+        self.db_loader = db_loader
+        self.chunk_rows = chunk_rows
+        self.lookahead_rows = lookahead_rows
+        self.chunk_bytes = chunk_bytes
+        self.executor = executor
+        self.manifest = manifest
+
+    async def ingest(
+        self,
+        file_path: str,
+        db_name: str,
+        table_name: str,
+        keep_frame: bool = True,
+        plan: Optional[Dict[str, Any]] = None,
+        charts: Optional[ChartAggregates] = None
+    ) -> Tuple[Dict[str, Any], Optional[pd.DataFrame], Dict[str, str]]:
+        """
+        Profile, clean and load a CSV file from a single scan.
+
+        With a plan from the manifest, a full load goes to a staging table
+        that replaces the table once complete, and an append reads only the
+        new tail of the file, adding its rows and statistics to those stored
+        in the manifest within one transaction.
+
+        Args:
+            file_path (str): Path to the CSV file.
+            db_name (str): Name of the database.
+            table_name (str): Name of the table to create and fill.
+            keep_frame (bool): Whether to return the cleaned data as one DataFrame.
+            plan (Optional[Dict[str, Any]]): Plan from IngestManifest.plan()
+                whose action is 'load', 'replace' or 'append'.
+            charts (Optional[ChartAggregates]): Aggregates the cleaned chunks
+                are added to, so charts can be drawn without keeping the frame.
+
+        Returns:
+            Tuple[Dict[str, Any], Optional[pd.DataFrame], Dict[str, str]]:
+                Profile of the file, cleaned DataFrame (or None) and SQL data
+                types. For an append, the profile covers the whole file but
+                the DataFrame only the new rows.
+        """
+        append = plan is not None and plan['action'] == 'append'
+        target = table_name
+        if plan is not None and not append:
+            target = self.manifest.staging_table_name(table_name)
+            await self.db_loader.drop_table(db_name, target)
+
+        running_profile: Dict[str, Any] = plan['profile_state'] if append else {}
+        df_sample: Optional[pd.DataFrame] = None
+        lookahead: List[pd.DataFrame] = []
+        lookahead_size = 0
+        cleaned_chunks: List[pd.DataFrame] = []
+        sql_data_types: Dict[str, str] = dict(plan['column_types']) if append else {}
+        writer: Optional[TableWriter] = None
+        settled = False
+
+        async with AsyncExitStack() as stack:
+            reader = CSVChunkReader(file_path, chunk_rows=self.chunk_rows, chunk_bytes=self.chunk_bytes)
+            chunks = reader if plan is None else reader.iter_range(plan['start'], plan['size'])
+            if append:
+                writer = await stack.enter_async_context(
+                    self.db_loader.open_writer(db_name, table_name, sql_data_types, append=True)
+                )
+                settled = True
+            async for chunk in self._read_chunks(chunks):
+                if df_sample is None:
+                    df_sample = chunk.head(self.profiler.sample_size)
+                await self._update_profile(running_profile, chunk)
+
+                if not settled:
+                    lookahead.append(chunk)
+                    lookahead_size += len(chunk)
+                    if lookahead_size < self.lookahead_rows:
+                        continue
+                    sql_data_types, writer = await self._settle_types(
+                        stack, running_profile, lookahead[0], db_name, target
+                    )
+                    settled = True
+                    pending, lookahead = lookahead, []
+                else:
+                    pending = [chunk]
+                    if writer is not None:
+                        changes = self._widened_types(sql_data_types, running_profile, chunk)
+                        if changes:
+                            await writer.widen_columns(changes)
+                            sql_data_types.update(changes)
+
+                await self._flush(pending, running_profile, writer, cleaned_chunks, keep_frame, charts)
+
+            if append and writer is not None:
+                # Committed together with the new rows when the writer closes
+                await self.manifest.record(
+                    writer.conn, plan, plan['row_count'] + writer.rows_written, sql_data_types, running_profile
+                )
+
+            if df_sample is None:
+                logger.error(f"No rows found in {file_path}")
+                return {}, None, {}
+
+            if not settled:
+                sql_data_types, writer = await self._settle_types(
+                    stack, running_profile, lookahead[0], db_name, target
+                )
+                await self._flush(lookahead, running_profile, writer, cleaned_chunks, keep_frame, charts)
+
+            if writer is not None:
+                logger.info(f"Streamed {writer.rows_written} rows into {target} in database {db_name}.")
+
+        if plan is not None and not append:
+            if writer is None or not await self.manifest.swap_in(
+                db_name, plan, writer.rows_written, sql_data_types, running_profile
+            ):
+                return {}, None, {}
+
+        profile = self.profiler.assemble_profile(
+            df_sample, self.profiler.finalize_profile(running_profile)
+        )
+        cleaned_df = pd.concat(cleaned_chunks, ignore_index=True) if keep_frame else None
+        return profile, cleaned_df, sql_data_types
+
+    async def _read_chunks(self, reader: Iterable[pd.DataFrame]) -> AsyncIterator[pd.DataFrame]:
+        """
+        Yield the chunks of a reader, parsing them off the event loop if possible.
+
+        Args:
+            reader (Iterable[pd.DataFrame]): Reader of the file, or of a range of it.
+
+        Yields:
+            pd.DataFrame: Next chunk of the file.
+        """
+        if self.executor is None:
+            for chunk in reader:
+                yield chunk
+        else:
+            async for chunk in self.executor.iterate('parse', reader):
+                yield chunk
+
+    async def _update_profile(self, running_profile: Dict[str, Any], chunk: pd.DataFrame):
+        """
+        Add the statistics of a chunk to the running profile.
+
+        With an executor the chunk is profiled on its own, possibly in another
+        process, and the partial profile is merged back on the event loop.
+
+        Args:
+            running_profile (Dict[str, Any]): Profile accumulated so far.
+            chunk (pd.DataFrame): Newly read chunk.
+        """
+        if self.executor is None:
+            self.profiler.update_profile(running_profile, chunk)
+        else:
+            partial = await self.executor.run('profile', self.profiler.profile_chunk, chunk)
+            self.profiler.merge_profiles(running_profile, partial)
+
+    async def _update_charts(self, charts: ChartAggregates, chunk: pd.DataFrame):
+        """
+        Add a cleaned chunk to the chart aggregates.
+
+        Like profiling, with an executor the chunk is aggregated on its own
+        and the result merged back on the event loop.
+
+        Args:
+            charts (ChartAggregates): Aggregates accumulated so far.
+            chunk (pd.DataFrame): Cleaned chunk.
+        """
+        if self.executor is None:
+            charts.update(chunk)
+        else:
+            charts.merge(await self.executor.run('aggregate', aggregate_chunk, chunk, charts.top_k, charts.quantile_k))
+
+    async def _settle_types(
+        self,
+        stack: AsyncExitStack,
+        running_profile: Dict[str, Any],
+        first_chunk: pd.DataFrame,
+        db_name: str,
+        table_name: str
+    ) -> Tuple[Dict[str, str], Optional[TableWriter]]:
+        """
+        Decide column types from the look-ahead buffer and open the table writer.
+
+        Args:
+            stack (AsyncExitStack): Stack that owns the writer's connection.
+            running_profile (Dict[str, Any]): Profile accumulated so far.
+            first_chunk (pd.DataFrame): First chunk, used for the column order.
+            db_name (str): Name of the database.
+            table_name (str): Name of the table to create.
+
+        Returns:
+            Tuple[Dict[str, str], Optional[TableWriter]]: SQL data types and writer.
+        """
+        lookahead_profile = {"full_profile": self.profiler.finalize_profile(running_profile)}
+        sql_data_types = self.cleaner.get_sql_data_types(lookahead_profile)
+
+        logger.info(f"Creating table {table_name} in database {db_name}")
+        await self.db_loader.create_table(db_name, table_name, first_chunk, sql_data_types)
+        writer = await stack.enter_async_context(self.db_loader.open_writer(db_name, table_name, sql_data_types))
+        return sql_data_types, writer
+
+    async def _flush(
+        self,
+        chunks: List[pd.DataFrame],
+        running_profile: Dict[str, Any],
+        writer: Optional[TableWriter],
+        cleaned_chunks: List[pd.DataFrame],
+        keep_frame: bool,
+        charts: Optional[ChartAggregates] = None
+    ):
+        """
+        Clean chunks with the current profile and hand them to the writer.
+
+        Args:
+            chunks (List[pd.DataFrame]): Raw chunks to clean and write.
+            running_profile (Dict[str, Any]): Profile accumulated so far.
+            writer (Optional[TableWriter]): Table writer, or None to skip loading.
+            cleaned_chunks (List[pd.DataFrame]): Collected cleaned chunks.
+            keep_frame (bool): Whether to collect the cleaned chunks.
+            charts (Optional[ChartAggregates]): Aggregates to add the cleaned
+                chunks to.
+        """
+        current_profile = {"full_profile": self.profiler.finalize_profile(running_profile)}
+        for chunk in chunks:
+            cleaned = await self.cleaner.clean_chunk(chunk, current_profile)
+            if writer is not None:
+                await writer.write(cleaned)
+            if keep_frame:
+                cleaned_chunks.append(cleaned)
+            if charts is not None:
+                await self._update_charts(charts, cleaned)
+
+    @staticmethod
+    def _widened_types(
+        sql_data_types: Dict[str, str],
+        running_profile: Dict[str, Any],
+        chunk: pd.DataFrame
+    ) -> Dict[str, str]:
+        """
+        Find columns whose settled type no longer fits the values of a chunk.
+
+        Args:
+            sql_data_types (Dict[str, str]): Current SQL data types.
+            running_profile (Dict[str, Any]): Profile including the chunk.
+            chunk (pd.DataFrame): Newly read chunk.
+
+        Returns:
+            Dict[str, str]: Mapping of column names to wider SQL data types.
+        """
+        touched = [
+            column for column in sql_data_types
+            if column in chunk.columns and chunk[column].notna().any()
+        ]
+        required_types = infer_sql_types(
+            {column: running_profile[column] for column in touched}, exact_decimals=self.cleaner.exact_decimals
+        )
+        changes = {}
+        for column, required in required_types.items():
+            widened = widen_sql_type(sql_data_types[column], required)
+            if widened != sql_data_types[column]:
+                changes[column] = widened
+        return changes
@@ -0,0 +1,326 @@
+"""
+Module for measuring the stages of the pipeline and exporting the results.
+
+Every stage a file goes through (profile, load, LLM, SQL, visualize) is
+measured by MetricsRecorder.measure(), which the scheduler wraps around
+its stages. A measurement records:
+
+- wall time and CPU time of the main process
+- rows and bytes processed, set by the stage, and the throughput they give
+- peak RSS of the process and how much the stage raised it
+- with tracemalloc enabled, the peak of traced allocations during the stage
+- database round-trips and time, and LLM requests, tokens and latency,
+  counted with count() by the code that makes them
+
+The stage being measured is kept in a context variable, so counts made
+anywhere in the task running a stage, or in tasks it starts, are added to
+that stage and concurrent files do not mix. CPU time and memory are those
+of the whole process, so they include the other stages running at the
+same time; work done in the process pool is not included.
+
+Measurements are appended to a JSON-lines file and summed by file and
+stage into a Prometheus textfile-collector file. Stages can also be
+profiled with cProfile or pyinstrument, one at a time.
+"""
+
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+# Measurement of the stage running in the current task, if any
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar('stage_metrics', default=None)
+
+# Counters exported to Prometheus, with their help text
+_COUNTERS = {
+    'wall_seconds': "Wall time spent in the stage.",
+    'cpu_seconds': "CPU time of the process while in the stage.",
+    'rows': "Rows processed by the stage.",
+    'bytes': "Bytes processed by the stage.",
+    'db_round_trips': "Database queries and COPY batches sent by the stage.",
+    'db_seconds': "Time spent waiting on database queries.",
+    'llm_requests': "LLM requests sent by the stage.",
+    'llm_input_tokens': "LLM input tokens used by the stage.",
+    'llm_output_tokens': "LLM output tokens used by the stage.",
+    'llm_seconds': "Latency of the LLM requests, including retries.",
+    'runs': "Times the stage ran."
+}
+
+def count(name: str, value: float = 1):
+    """
+    Add to a counter of the stage being measured in the current task.
+
+    Does nothing outside a measured stage.
+
+    Args:
+        name (str): Name of the counter, e.g. 'db_round_trips'.
+        value (float): Amount to add.
+    """
+    record = _current.get()
+    if record is not None:
+        record[name] = record.get(name, 0) + value
+
+def count_query(query: Any):
+    """
+    Count a database query; an asyncpg query logger.
+
+    Args:
+        query (Any): asyncpg LoggedQuery of the query.
+    """
+    count('db_round_trips')
+    count('db_seconds', query.elapsed)
+
+class MetricsRecorder:
+    """Class for recording measurements of pipeline stages."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        textfile_path: Optional[Path] = None,
+        profiler: Optional[str] = None,
+        profile_dir: Optional[Path] = None,
+        trace_memory: bool = False
+    ):
+        """
+        Initialize the MetricsRecorder.
+
+        Args:
+            path (Optional[Path]): JSON-lines file measurements are appended
+                to; not written when not set.
+            textfile_path (Optional[Path]): Prometheus textfile-collector file
+                rewritten after every stage; not written when not set.
+            profiler (Optional[str]): 'cprofile' or 'pyinstrument' to profile
+                every stage; no profiling when not set.
+            profile_dir (Optional[Path]): Directory the profiles are written to.
+            trace_memory (bool): Whether to trace allocations with tracemalloc,
+                which slows allocation-heavy code down considerably.
+        """
+        self.path = Path(path) if path else None
+        self.textfile_path = Path(textfile_path) if textfile_path else None
+        self.profiler = profiler
+        self.profile_dir = Path(profile_dir or 'metrics/profiles')
+        self.trace_memory = trace_memory
+        self.totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.peak_rss = 0
+        self._write_lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+
+        if self.profiler == 'pyinstrument' and pyinstrument is None:
+            logger.warning("pyinstrument is not installed; stages will not be profiled")
+            self.profiler = None
+        for target in (self.path, self.textfile_path):
+            if target is not None:
+                target.parent.mkdir(parents=True, exist_ok=True)
+        if self.profiler:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def measure(self, name: str, stage: str) -> Iterator[Dict[str, Any]]:
+        """
+        Measure a stage of a file.
+
+        Args:
+            name (str): Name of the file.
+            stage (str): Name of the stage.
+
+        Yields:
+            Dict[str, Any]: Measurement of the stage; set 'rows' and 'bytes'
+                on it to get the throughput.
+        """
+        record: Dict[str, Any] = {'file': name, 'stage': stage, 'started': time.time()}
+        token = _current.set(record)
+        profile = self._start_profile()
+        rss_before = _peak_rss()
+        traced_before = 0
+        if self.trace_memory:
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.process_time() - cpu
+            rss_after = _peak_rss()
+            if rss_after is not None:
+                record['peak_rss_bytes'] = rss_after
+                record['rss_growth_bytes'] = rss_after - rss_before
+            if self.trace_memory:
+                record['traced_peak_bytes'] = max(tracemalloc.get_traced_memory()[1] - traced_before, 0)
+            if profile is not None:
+                record['profile'] = self._stop_profile(profile, name, stage)
+            _current.reset(token)
+            self._finish(record)
+
+    def _finish(self, record: Dict[str, Any]):
+        """
+        Add throughput to a measurement, then write it and the updated totals.
+
+        Args:
+            record (Dict[str, Any]): Finished measurement.
+        """
+        seconds = max(record['wall_seconds'], 1e-9)
+        for unit in ('rows', 'bytes'):
+            if record.get(unit) is not None:
+                record[f'{unit}_per_second'] = record[unit] / seconds
+
+        totals = self.totals.setdefault((record['file'], record['stage']), {})
+        totals['runs'] = totals.get('runs', 0) + 1
+        for counter in _COUNTERS:
+            if isinstance(record.get(counter), (int, float)):
+                totals[counter] = totals.get(counter, 0) + record[counter]
+        self.peak_rss = max(self.peak_rss, record.get('peak_rss_bytes', 0))
+
+        with self._write_lock:
+            try:
+                if self.path is not None:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record, default=str) + '\n')
+                if self.textfile_path is not None:
+                    self.write_textfile()
+            except OSError as e:
+                logger.warning(f"Could not write metrics of {record['stage']} for {record['file']}: {e}")
+
+    def write_textfile(self):
+        """Write the totals by file and stage in the Prometheus text format."""
+        lines = []
+        for counter, help_text in _COUNTERS.items():
+            metric = f"data_pipeline_stage_{counter}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (name, stage), totals in sorted(self.totals.items()):
+                if counter in totals:
+                    lines.append(f'{metric}{{file="{_label(name)}",stage="{_label(stage)}"}} {_number(totals[counter])}')
+        lines.append("# HELP data_pipeline_peak_rss_bytes Peak resident set size of the pipeline process.")
+        lines.append("# TYPE data_pipeline_peak_rss_bytes gauge")
+        lines.append(f"data_pipeline_peak_rss_bytes {self.peak_rss}")
+        lines.append("# HELP data_pipeline_last_update_timestamp_seconds Time the metrics were last written.")
+        lines.append("# TYPE data_pipeline_last_update_timestamp_seconds gauge")
+        lines.append(f"data_pipeline_last_update_timestamp_seconds {time.time():.3f}")
+
+        # The collector may read at any time, so the file is replaced whole
+        temporary = self.textfile_path.with_name(f".{self.textfile_path.name}.{os.getpid()}.tmp")
+        temporary.write_text("\n".join(lines) + "\n", encoding='utf-8')
+        os.replace(temporary, self.textfile_path)
+
+    def _start_profile(self) -> Optional[Any]:
+        """Start profiling a stage, unless profiling is off or another stage holds the profiler."""
+        if not self.profiler or not self._profile_lock.acquire(blocking=False):
+            return None
+        try:
+            if self.profiler == 'pyinstrument':
+                profile = pyinstrument.Profiler(async_mode='enabled')
+                profile.start()
+            else:
+                profile = cProfile.Profile()
+                profile.enable()
+            return profile
+        except Exception as e:
+            self._profile_lock.release()
+            logger.warning(f"Could not start the {self.profiler} profiler: {e}")
+            return None
+
+    def _stop_profile(self, profile: Any, name: str, stage: str) -> Optional[str]:
+        """
+        Stop profiling a stage and write the profile.
+
+        cProfile profiles are written in the pstats format, pyinstrument ones
+        as HTML.
+
+        Returns:
+            Optional[str]: Path of the profile written, or None on failure.
+        """
+        try:
+            stem = f"{_file_part(name)}-{stage}-{time.strftime('%Y%m%d-%H%M%S')}"
+            if self.profiler == 'pyinstrument':
+                profile.stop()
+                target = self.profile_dir / f"{stem}.html"
+                target.write_text(profile.output_html(), encoding='utf-8')
+            else:
+                profile.disable()
+                target = self.profile_dir / f"{stem}.prof"
+                profile.dump_stats(target)
+            return str(target)
+        except Exception as e:
+            logger.warning(f"Could not write the profile of {stage} for {name}: {e}")
+            return None
+        finally:
+            self._profile_lock.release()
+
+    def summary(self) -> str:
+        """
+        Generate a human-readable summary of the totals by stage.
+
+        Returns:
+            str: One line per stage with its totals over all files.
+        """
+        by_stage: Dict[str, Dict[str, float]] = {}
+        for (_, stage), totals in self.totals.items():
+            stage_totals = by_stage.setdefault(stage, {})
+            for counter, value in totals.items():
+                stage_totals[counter] = stage_totals.get(counter, 0) + value
+        summary = "Stage metrics:\n"
+        for stage, totals in by_stage.items():
+            summary += f"  {stage}: {totals['wall_seconds']:.1f}s wall, {totals['cpu_seconds']:.1f}s CPU"
+            if totals.get('rows'):
+                summary += f", {totals['rows']:.0f} rows ({totals['rows'] / max(totals['wall_seconds'], 1e-9):.0f}/s)"
+            if totals.get('db_round_trips'):
+                summary += f", {totals['db_round_trips']:.0f} DB round-trips"
+            if totals.get('llm_requests'):
+                summary += (
+                    f", {totals['llm_requests']:.0f} LLM requests"
+                    f" ({totals.get('llm_input_tokens', 0):.0f} in / {totals.get('llm_output_tokens', 0):.0f} out tokens)"
+                )
+            summary += "\n"
+        if self.peak_rss:
+            summary += f"  peak RSS: {self.peak_rss / 1024 / 1024:.1f} MB\n"
+        return summary
+
+def _peak_rss() -> Optional[int]:
+    """Peak resident set size of the process in bytes, where the platform reports it."""
+    if resource is None:
+        return None
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _number(value: float) -> str:
+    """Format a sample value without losing precision."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _file_part(value: str) -> str:
+    """Make a file name safe to use in a path."""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', value)
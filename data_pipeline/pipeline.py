@@ -0,0 +1,498 @@
+"""
+Module for running the stages of the pipeline over CSV files.
+
+A run can be limited to some of the stages: profiling alone, loading into
+the database, LLM analysis or visualization. The modules behind a stage,
+and the heavy libraries they use (asyncpg, anthropic, matplotlib and
+seaborn), are only imported when the stage runs, so a run that needs few
+stages also starts quickly. STAGE_MODULES lists what each stage imports,
+and STAGE_LIBRARIES the heavy libraries that only its own stage may load.
+"""
+
+import importlib
+import logging
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Collection, Dict, List, Optional, Tuple
+
+from data_pipeline.config import Config
+from data_pipeline.executor import StageExecutor
+from data_pipeline.metrics import MetricsRecorder
+from data_pipeline.scheduler import PipelineScheduler
+
+if TYPE_CHECKING:
+    from data_pipeline.analyze.analyzer import LLMAnalyzer
+    from data_pipeline.cleaning.cleaner import DataCleaner
+    from data_pipeline.ingest.files import CSVLoader
+    from data_pipeline.ingest.loader import DBLoader
+    from data_pipeline.ingest.manifest import IngestManifest
+    from data_pipeline.ingest.streaming import StreamingIngestor
+    from data_pipeline.profiling.profiler import DataProfiler
+    from data_pipeline.transform.dry_run import SQLDryRunner
+    from data_pipeline.visualize.visualizer import Visualizer
+
+logger = logging.getLogger(__name__)
+
+# Stages in the order a file goes through them; every run profiles
+STAGES = ('profile', 'load', 'llm', 'visualize')
+
+# Modules each stage imports when it runs
+STAGE_MODULES: Dict[str, List[str]] = {
+    'profile': [
+        'data_pipeline.profiling.profiler',
+        'data_pipeline.ingest.cache',
+        'data_pipeline.ingest.files'
+    ],
+    'load': [
+        'data_pipeline.cleaning.cleaner',
+        'data_pipeline.ingest.loader',
+        'data_pipeline.ingest.manifest',
+        'data_pipeline.ingest.pool',
+        'data_pipeline.ingest.streaming',
+        'data_pipeline.transform.dry_run'
+    ],
+    'llm': [
+        'anthropic',
+        'data_pipeline.analyze.analyzer',
+        'data_pipeline.analyze.cache',
+        'data_pipeline.analyze.dispatcher',
+        'data_pipeline.analyze.llm_logger',
+        'data_pipeline.analyze.summarizer'
+    ],
+    'visualize': [
+        'data_pipeline.cleaning.cleaner',
+        'data_pipeline.visualize.aggregates',
+        'data_pipeline.visualize.visualizer'
+    ]
+}
+
+# Heavy libraries each stage needs; no other stage may import them
+STAGE_LIBRARIES: Dict[str, Tuple[str, ...]] = {
+    'profile': (),
+    'load': ('asyncpg',),
+    'llm': ('anthropic',),
+    'visualize': ('matplotlib', 'seaborn')
+}
+
+def import_stages(stages: Collection[str]) -> Dict[str, float]:
+    """
+    Import the modules the given stages need.
+
+    Args:
+        stages (Collection[str]): Stages that will run.
+
+    Returns:
+        Dict[str, float]: Seconds spent importing each module not imported yet.
+    """
+    timings = {}
+    for stage in STAGES:
+        if stage not in stages:
+            continue
+        for module in STAGE_MODULES[stage]:
+            if module in timings:
+                continue
+            started = time.perf_counter()
+            importlib.import_module(module)
+            timings[module] = time.perf_counter() - started
+    return timings
+
+async def process_csv(
+    csv_loader: "CSVLoader",
+    db_loader: Optional["DBLoader"],
+    llm_analyzer: Optional["LLMAnalyzer"],
+    visualizer: Optional["Visualizer"],
+    profiler: "DataProfiler",
+    cleaner: Optional["DataCleaner"],
+    db_name: Optional[str],
+    filename: str,
+    ingestor: Optional["StreamingIngestor"] = None,
+    scheduler: Optional[PipelineScheduler] = None,
+    manifest: Optional["IngestManifest"] = None,
+    dry_runner: Optional["SQLDryRunner"] = None,
+    apply_sql: bool = False,
+    stages: Collection[str] = STAGES
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Take one CSV file through the stages of the pipeline.
+
+    Args:
+        csv_loader (CSVLoader): Reads the file.
+        db_loader (Optional[DBLoader]): Loads the table; needed for 'load'.
+        llm_analyzer (Optional[LLMAnalyzer]): Analyzes the profile; needed for 'llm'.
+        visualizer (Optional[Visualizer]): Draws the charts; needed for 'visualize'.
+        profiler (DataProfiler): Profiles the file.
+        cleaner (Optional[DataCleaner]): Cleans the rows; needed for 'load'
+            and 'visualize'.
+        db_name (Optional[str]): Database the table is loaded into.
+        filename (str): Name of the file in the data directory.
+        ingestor (Optional[StreamingIngestor]): Loads the file in one
+            streaming pass instead of profiling, cleaning and loading it in turn.
+        scheduler (Optional[PipelineScheduler]): Limits the files in each stage.
+        manifest (Optional[IngestManifest]): Skips or appends to files loaded before.
+        dry_runner (Optional[SQLDryRunner]): Checks the generated SQL
+            against the loaded table.
+        apply_sql (bool): Apply the generated SQL when it passed the check.
+        stages (Collection[str]): Stages to run, out of STAGES.
+
+    Returns:
+        Tuple[Optional[str], Optional[str], Optional[str]]: Table name, LLM
+            analysis and SQL transformations; None for what was not produced.
+    """
+    # Without a shared scheduler, only this file is limited by its stages
+    scheduler = scheduler or PipelineScheduler()
+    load = 'load' in stages
+    visualize = 'visualize' in stages
+    try:
+        file_path = Path(csv_loader.data_dir) / filename
+        logger.info(f"Processing file: {file_path}")
+
+        table_name = csv_loader.get_valid_table_name(filename)
+        file_size = file_path.stat().st_size
+
+        plan = None
+        stored_profile = None
+        load_table = load
+        if manifest is not None and load:
+            plan = await manifest.plan(db_name, file_path, table_name)
+            if plan['action'] == 'skip':
+                logger.info(f"{filename} is unchanged since it was loaded into {table_name}, skipping the load")
+                if 'llm' not in stages and not visualize:
+                    return table_name, None, None
+                # The later stages still run, on the profile stored with the load
+                load_table = False
+                stored_profile = plan['profile_state']
+            else:
+                if ingestor is None and plan['action'] == 'append':
+                    # Appending needs the streaming ingestor's running profile
+                    plan['action'] = 'replace'
+                logger.info(f"Ingest plan for {filename}: {plan['action']}")
+        streaming = ingestor is not None and load_table
+
+        charts = None
+        if streaming:
+            from data_pipeline.visualize.aggregates import ChartAggregates
+
+            # Profile, clean, load and aggregate for the charts from a single
+            # scan of the file, without keeping the cleaned rows
+            if visualize and (plan is None or plan['action'] != 'append'):
+                charts = ChartAggregates()
+            async with scheduler.stage(filename, 'load') as stage_metrics:
+                profile, _, sql_data_types = await ingestor.ingest(
+                    str(file_path), db_name, table_name, keep_frame=False, plan=plan, charts=charts
+                )
+                stage_metrics.update(rows=_profile_rows(profile), bytes=file_size)
+            if not profile:
+                logger.error(f"Failed to load {filename}")
+                scheduler.fail(filename, "failed to load")
+                return None, None, None
+            report = profiler.generate_report(profile)
+            logger.info(f"Profiling report for {filename}:\n{report}")
+        else:
+            async with scheduler.stage(filename, 'profile') as stage_metrics:
+                if stored_profile is not None:
+                    profile = await profiler.profile_stored(str(file_path), stored_profile)
+                    stage_metrics['rows'] = _profile_rows(profile)
+                else:
+                    profile = await profiler.profile_csv(str(file_path))
+                    stage_metrics.update(rows=_profile_rows(profile), bytes=file_size)
+            if not profile:
+                logger.error(f"Failed to profile {filename}")
+                scheduler.fail(filename, "failed to profile")
+                return None, None, None
+            report = profiler.generate_report(profile)
+            logger.info(f"Profiling report for {filename}:\n{report}")
+
+        if (load_table or visualize) and not streaming:
+            async with scheduler.stage(filename, 'load') as stage_metrics:
+                stage_metrics['bytes'] = file_size
+                cleaned_df = await csv_loader.load_cleaned(filename, settings=cleaner.cache_key)
+                if cleaned_df is None:
+                    df = await csv_loader.load_csv(filename)
+                    if df is None:
+                        logger.error(f"Failed to load {filename}")
+                        scheduler.fail(filename, "failed to load")
+                        return None, None, None
+
+                    cleaned_df = await cleaner.clean_data(df, profile, table_name)
+                    del df
+                    await csv_loader.save_cleaned(filename, cleaned_df, settings=cleaner.cache_key)
+
+                if load_table:
+                    sql_data_types = cleaner.get_sql_data_types(profile)
+                    target = table_name if plan is None else manifest.staging_table_name(table_name)
+                    if plan is not None:
+                        await db_loader.drop_table(db_name, target)
+
+                    logger.info(f"Creating table {target} in database {db_name}")
+
+                    await db_loader.create_table(db_name, target, cleaned_df, sql_data_types)
+                    inserted = await db_loader.insert_data(db_name, target, cleaned_df, sql_data_types)
+                    if plan is not None and not (
+                        inserted and await manifest.swap_in(db_name, plan, len(cleaned_df), sql_data_types)
+                    ):
+                        logger.error(f"Failed to load {filename}")
+                        scheduler.fail(filename, "failed to load")
+                        return None, None, None
+                if visualize:
+                    charts = await visualizer.aggregate(cleaned_df)
+                stage_metrics['rows'] = len(cleaned_df)
+                del cleaned_df
+
+        llm_analysis = sql_transformations = None
+        if 'llm' in stages:
+            async with scheduler.stage(filename, 'llm'):
+                llm_analysis, analysis_log = await llm_analyzer.analyze_structure(profile, table_name)
+                logger.info(f"Analysis for {filename}:\n{llm_analysis}")
+                if analysis_log:
+                    logger.info(f"Analysis logged as {analysis_log}")
+
+                sql_transformations, sql_log = await llm_analyzer.generate_sql_transformations(llm_analysis, table_name)
+                logger.info(f"SQL Transformations for {filename}:\n{sql_transformations}")
+                if sql_log:
+                    logger.info(f"SQL transformations logged as {sql_log}")
+
+            statements = []
+            # Only a table rebuilt by this run is checked and changed: a skipped
+            # or appended table already holds the result of earlier statements,
+            # and running them again would transform its rows twice
+            rebuilt = load_table and (plan is None or plan['action'] in ('load', 'replace'))
+            if dry_runner is not None and rebuilt:
+                from data_pipeline.transform.dry_run import extract_statements
+
+                statements = extract_statements(sql_transformations)
+            if statements:
+                # Nothing reaches the table unless every statement stays within budget
+                async with scheduler.stage(filename, 'sql') as stage_metrics:
+                    stage_metrics['rows'] = len(statements)
+                    dry_run = await dry_runner.check(db_name, table_name, statements)
+                    logger.info(dry_runner.summary(dry_run))
+                    if apply_sql:
+                        await dry_runner.apply(db_name, table_name, dry_run)
+
+        if visualize and plan is not None and plan['action'] == 'append':
+            # Only the new rows are in memory; plots of them alone would mislead
+            logger.info(f"Appended to {table_name}; visualizations are kept from the last full load")
+        elif visualize:
+            async with scheduler.stage(filename, 'visualize') as stage_metrics:
+                vis_filenames = await visualizer.create_visualizations(
+                    charts, table_name, profile['full_profile']
+                )
+                stage_metrics['rows'] = charts.row_count
+            if vis_filenames:
+                logger.info(f"Visualizations saved to: {', '.join(vis_filenames)}")
+
+        return table_name, llm_analysis, sql_transformations
+
+    except Exception as e:
+        logger.exception(f"Error processing {filename}: {str(e)}")
+        scheduler.fail(filename, str(e))
+        return None, None, None
+
+def _profile_rows(profile: dict) -> Optional[int]:
+    """Rows of a profiled file, from the count of any of its columns."""
+    for info in (profile or {}).get('full_profile', {}).values():
+        return info['total_count']
+    return None
+
+async def run_pipeline(
+    config: Config,
+    files: Optional[List[str]] = None,
+    stages: Collection[str] = STAGES
+):
+    """
+    Run the given stages over CSV files of the data directory.
+
+    Args:
+        config (Config): Validated configuration.
+        files (Optional[List[str]]): Names of the files to process; all CSV
+            files of the data directory when None.
+        stages (Collection[str]): Stages to run, out of STAGES.
+    """
+    load = 'load' in stages
+    llm = 'llm' in stages
+    visualize = 'visualize' in stages
+    timings = import_stages(stages)
+    logger.debug(f"Imported the modules of stages {', '.join(stages)} in {sum(timings.values()):.3f}s")
+
+    from data_pipeline.ingest.cache import DatasetCache
+    from data_pipeline.ingest.files import CSVLoader
+    from data_pipeline.profiling.profiler import DataProfiler
+
+    db_loader = None
+    executor = None
+    interaction_log = None
+    dispatcher = None
+    try:
+        executor = StageExecutor(
+            config.stage_pools,
+            thread_workers=config.thread_workers,
+            process_workers=config.process_workers
+        )
+        dataset_cache = None
+        if config.dataset_cache_dir:
+            dataset_cache = DatasetCache(config.dataset_cache_dir, max_bytes=config.dataset_cache_max_bytes)
+            if config.dataset_cache_clear:
+                dataset_cache.invalidate()
+        csv_loader = CSVLoader(config.data_dir, executor=executor, cache=dataset_cache)
+        profiler = DataProfiler(
+            chunk_bytes=config.chunk_bytes,
+            workers=config.profile_workers,
+            executor=executor,
+            cache=dataset_cache
+        )
+        cleaner = None
+        if load or visualize:
+            from data_pipeline.cleaning.cleaner import DataCleaner
+
+            cleaner = DataCleaner(
+                executor=executor,
+                compact=config.clean_compact,
+                category_max_ratio=config.clean_category_ratio,
+                exact_decimals=config.sql_exact_decimals
+            )
+
+        manifest = dry_runner = ingestor = None
+        if load:
+            from data_pipeline.ingest.loader import DBLoader
+            from data_pipeline.ingest.manifest import IngestManifest
+            from data_pipeline.ingest.pool import PoolManager
+            from data_pipeline.ingest.streaming import StreamingIngestor
+            from data_pipeline.transform.dry_run import SQLDryRunner
+
+            pools = PoolManager(
+                config.db_config,
+                min_size=config.db_pool_min,
+                max_size=config.db_pool_max,
+                statement_cache_size=config.db_statement_cache_size
+            )
+            db_loader = DBLoader(config.db_config, batch_size=config.copy_batch_size, pools=pools)
+            manifest = IngestManifest(pools) if config.ingest_manifest else None
+            if config.sql_dry_run and llm:
+                dry_runner = SQLDryRunner(
+                    pools,
+                    max_cost=config.sql_max_cost,
+                    max_seconds=config.sql_max_seconds,
+                    sample_percent=config.sql_sample_percent
+                )
+            if config.ingest_mode == 'streaming':
+                ingestor = StreamingIngestor(
+                    profiler, cleaner, db_loader,
+                    chunk_rows=config.chunk_rows,
+                    lookahead_rows=config.lookahead_rows,
+                    chunk_bytes=config.chunk_bytes,
+                    executor=executor,
+                    manifest=manifest
+                )
+
+        llm_analyzer = None
+        if llm:
+            from anthropic import AsyncAnthropic
+
+            from data_pipeline.analyze.analyzer import LLMAnalyzer
+            from data_pipeline.analyze.cache import ResponseCache
+            from data_pipeline.analyze.dispatcher import LLMDispatcher
+            from data_pipeline.analyze.llm_logger import LLMLogger
+            from data_pipeline.analyze.summarizer import ProfileSummarizer
+
+            llm_cache = None
+            if config.llm_cache_path:
+                llm_cache = ResponseCache(
+                    config.llm_cache_path,
+                    ttl=config.llm_cache_ttl_hours * 3600,
+                    max_entries=config.llm_cache_max_entries,
+                    max_bytes=int(config.llm_cache_max_mb * 1024 * 1024)
+                )
+            if config.llm_log_path:
+                interaction_log = LLMLogger(config.llm_log_path)
+                logger.info(f"Logging LLM interactions of run {interaction_log.run_id} to {config.llm_log_path}")
+            llm_client = AsyncAnthropic(api_key=config.anthropic_api_key, max_retries=0)
+            dispatcher = LLMDispatcher(
+                llm_client,
+                requests_per_minute=config.llm_requests_per_minute or None,
+                tokens_per_minute=config.llm_tokens_per_minute or None,
+                max_concurrency=config.llm_max_concurrency,
+                max_retries=config.llm_max_retries,
+                timeout=config.llm_timeout
+            )
+            llm_analyzer = LLMAnalyzer(
+                config.anthropic_api_key,
+                client=llm_client,
+                cache=llm_cache,
+                bypass_cache=config.llm_cache_bypass,
+                summarizer=ProfileSummarizer(token_budget=config.llm_profile_tokens),
+                dispatcher=dispatcher,
+                interaction_log=interaction_log
+            )
+
+        visualizer = None
+        if visualize:
+            from data_pipeline.visualize.visualizer import Visualizer
+
+            visualizer = Visualizer(
+                config.output_dir,
+                executor=executor,
+                max_charts=config.vis_max_charts,
+                max_seconds=config.vis_max_seconds,
+                max_categories=config.vis_max_categories,
+                max_unique_ratio=config.vis_max_unique_ratio
+            )
+
+        all_files = csv_loader.get_csv_files()
+        csv_files = all_files if files is None else [filename for filename in all_files if filename in files]
+        if not csv_files:
+            logger.error("No CSV files found in the dataset directory.")
+            return
+
+        db_name = None
+        if load:
+            # The database is named after the directory's files, whichever are loaded
+            db_name = await db_loader.get_or_create_database(all_files)
+            if not db_name:
+                logger.error("Failed to create or get a database.")
+                return
+
+            logger.info(f"Using database: {db_name}")
+
+        metrics = MetricsRecorder(
+            config.metrics_path or None,
+            textfile_path=config.metrics_textfile or None,
+            profiler=config.metrics_profile or None,
+            profile_dir=config.metrics_profile_dir,
+            trace_memory=config.metrics_tracemalloc
+        )
+        scheduler = PipelineScheduler(
+            config.stage_limits,
+            memory_budget=config.memory_budget,
+            memory_factor=config.memory_factor,
+            metrics=metrics
+        )
+        file_sizes = {filename: (config.data_dir / filename).stat().st_size for filename in csv_files}
+        results = await scheduler.run(
+            file_sizes,
+            lambda filename: process_csv(
+                csv_loader, db_loader, llm_analyzer, visualizer, profiler, cleaner,
+                db_name, filename, ingestor, scheduler, manifest,
+                dry_runner, config.sql_apply, stages
+            )
+        )
+
+        for result in results.values():
+            table_name = result[0] if result else None
+            if table_name:
+                logger.info(f"Processed table: {table_name}")
+            else:
+                logger.warning("Failed to process a CSV file")
+        logger.info(scheduler.summary())
+        if dispatcher is not None:
+            logger.info(f"LLM requests: {dispatcher.summary()}")
+        logger.info(metrics.summary())
+
+    except Exception as e:
+        logger.exception(f"An error occurred while running the pipeline: {str(e)}")
+    finally:
+        if interaction_log is not None:
+            await interaction_log.close()
+        if db_loader is not None:
+            await db_loader.close()
+        if executor is not None:
+            executor.shutdown()
@@ -2,24 +2,91 @@
 Module for profiling CSV data.
 """
 
+import asyncio
+import functools
+import math
+import os
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import logging
-import aiofiles
-import io
+from pandas.tseries.api import guess_datetime_format
+
+from data_pipeline.executor import StageExecutor, run_stage
+from data_pipeline.ingest.cache import DatasetCache
+from data_pipeline.ingest.reader import CSVChunkReader
+from data_pipeline.profiling.sketches import (
+    ExactSum, HyperLogLog, KLLSketch, Reservoir, RunningMoments, SpaceSaving, decode_value, encode_value
+)
 
 logger = logging.getLogger(__name__)
 
+# Running-profile entries that only exist while a column is still numeric
+_NUMERIC_KEYS = ("min", "max", "scale", "sum", "moments", "quantile_sketch")
+
+# Sketch type of each running-profile entry that holds a sketch
+_SKETCH_KEYS = {
+    "distinct_sketch": HyperLogLog,
+    "top_k_sketch": SpaceSaving,
+    "example_reservoir": Reservoir,
+    "sum": ExactSum,
+    "moments": RunningMoments,
+    "quantile_sketch": KLLSketch
+}
+
+# Version of the running-profile layout written by profile_state_to_dict
+PROFILE_STATE_VERSION = 1
+
+# Longest repr of a float64, e.g. '-2.2250738585072014e-308'
+_MAX_FLOAT_REPR_LENGTH = 24
+
+# Most decimal places looked for before a column counts as unbounded floats
+_MAX_DECIMAL_SCALE = 15
+
+# Text values that mark a column as boolean (compared lowercased)
+_BOOLEAN_TEXT = frozenset({"true", "false", "t", "f", "yes", "no", "y", "n"})
+
+# First characters of text that pandas may read as a number
+_NUMBER_STARTS = tuple("0123456789+-. iI")
+
+# Spellings pandas reads as booleans, by the text a bool column is written as
+_BOOLEAN_SPELLINGS = {"TRUE": "True", "true": "True", "FALSE": "False", "false": "False"}
+
 class DataProfiler:
-    def __init__(self, sample_size: int = 10):
+    def __init__(
+        self,
+        sample_size: int = 10,
+        chunk_bytes: Optional[int] = None,
+        top_k: int = 10,
+        workers: int = 1,
+        parallel_min_bytes: int = 64 * 1024 * 1024,
+        executor: Optional[StageExecutor] = None,
+        cache: Optional[DatasetCache] = None
+    ):
         """
         Initialize the DataProfiler.
 
         Args:
             sample_size (int): Number of rows to sample for initial analysis.
+            chunk_bytes (Optional[int]): Size of each profiling chunk in bytes;
+                chunks are sized in rows when not set.
+            top_k (int): Number of most frequent values reported per column.
+            workers (int): Number of workers large files are split across;
+                their ranges run in the executor's profile pool.
+            parallel_min_bytes (int): Files smaller than this are always
+                profiled serially.
+            executor (Optional[StageExecutor]): Runs the profiling work off the
+                event loop; inline when not set.
+            cache (Optional[DatasetCache]): Cache of parsed datasets, profiled
+                instead of the CSV file when it holds the current version.
         """
         self.sample_size = sample_size
+        self.chunk_bytes = chunk_bytes
+        self.top_k = top_k
+        self.workers = workers
+        self.parallel_min_bytes = parallel_min_bytes
+        self.executor = executor
+        self.cache = cache
 
     async def profile_csv(self, file_path: str) -> Dict[str, Any]:
         """
@@ -38,11 +105,28 @@ class DataProfiler:
             # Profile the entire file in chunks
             full_profile = await self._profile_full_file(file_path)
             
-            return {
-                "columns": df_sample.columns.tolist(),
-                "sample_analysis": self._analyze_sample(df_sample),
-                "full_profile": full_profile
-            }
+            return self.assemble_profile(df_sample, full_profile)
+        except Exception as e:
+            logger.error(f"Error profiling CSV file: {str(e)}")
+            return {}
+
+    async def profile_stored(self, file_path: str, running_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the profile of a file from a running profile kept from an earlier scan.
+
+        Only the sample rows are read, so an unchanged file is not scanned again.
+
+        Args:
+            file_path (str): Path to the CSV file.
+            running_profile (Dict[str, Any]): Running profile of every row of
+                the file, e.g. restored from the ingest manifest.
+
+        Returns:
+            Dict[str, Any]: Profile of the CSV file.
+        """
+        try:
+            df_sample = await self._read_csv_sample(file_path)
+            return self.assemble_profile(df_sample, self.finalize_profile(running_profile))
         except Exception as e:
             logger.error(f"Error profiling CSV file: {str(e)}")
             return {}
@@ -57,9 +141,10 @@ class DataProfiler:
         Returns:
             pd.DataFrame: Sample of the CSV file.
         """
-        async with aiofiles.open(file_path, mode='r') as f:
-            content = await f.read(self.sample_size * 1024)  # Read a larger chunk to ensure we get enough rows
-        return pd.read_csv(io.StringIO(content), nrows=self.sample_size)
+        reader = CSVChunkReader(file_path, chunk_rows=self.sample_size)
+        for chunk in reader:
+            return chunk
+        return pd.DataFrame(columns=reader.columns)
 
     def _analyze_sample(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -95,36 +180,169 @@ class DataProfiler:
         Returns:
             Dict[str, Any]: Full profile of the CSV file.
         """
-        profile = {}
-        async for chunk in self._read_csv_chunks(file_path, chunk_size):
-            self._update_profile(profile, chunk)
+        profile = None
+        if self.cache is not None:
+            profile = await run_stage(self.executor, 'profile', _profile_cached, self.cache, file_path, chunk_size)
+        if profile is None and self.workers > 1 and os.path.getsize(file_path) >= self.parallel_min_bytes:
+            profile = await self._profile_parallel(file_path, chunk_size)
+        elif profile is None:
+            profile = await run_stage(
+                self.executor, 'profile', _profile_range, file_path, None, None, chunk_size, self.chunk_bytes
+            )
         
-        # Calculate final statistics
-        for column in profile:
-            profile[column]["null_percentage"] = (profile[column]["null_count"] / profile[column]["total_count"]) * 100
-            if profile[column]["numeric"]:
-                profile[column]["mean"] = profile[column]["sum"] / (profile[column]["total_count"] - profile[column]["null_count"])
-        
-        return profile
+        return self.finalize_profile(profile)
 
-    async def _read_csv_chunks(self, file_path: str, chunk_size: int):
+    async def _profile_parallel(self, file_path: str, chunk_size: int) -> Dict[str, Any]:
         """
-        Generator to read CSV file in chunks asynchronously.
+        Profile row-aligned byte ranges of the file in the executor's profile pool.
+
+        The ranges share the pipeline's pool (processes by default) with
+        every other stage instead of starting a pool for each file; without
+        an executor they run one after another. The file is split into more ranges than workers so that uneven row
+        widths do not leave workers idle. Every range is parsed with the
+        dtypes of the file's first block, as in a serial run, and partial
+        profiles are merged in file order. Counts, bounds, sums, lengths,
+        flags and the distinct count then match a serial run exactly; top
+        values do too for columns with fewer distinct values than the
+        top-k sketch holds.
 
         Args:
             file_path (str): Path to the CSV file.
-            chunk_size (int): Number of rows in each chunk.
+            chunk_size (int): Number of rows to process in each chunk.
 
-        Yields:
-            pd.DataFrame: Chunk of the CSV file.
+        Returns:
+            Dict[str, Any]: Running profile of the whole file.
         """
-        async with aiofiles.open(file_path, mode='r') as f:
-            chunk = await f.read(chunk_size * 1024)  # Read a chunk
-            while chunk:
-                yield pd.read_csv(io.StringIO(chunk))
-                chunk = await f.read(chunk_size * 1024)  # Read the next chunk
+        reader = CSVChunkReader(file_path, chunk_rows=chunk_size, chunk_bytes=self.chunk_bytes)
+        ranges = reader.split_ranges(self.workers * 4)
+        dtypes = reader.read_dtypes()
+        logger.info(f"Profiling {file_path} in {len(ranges)} ranges")
+        partials = await asyncio.gather(*(
+            run_stage(
+                self.executor, 'profile', _profile_range, file_path, start, end, chunk_size, self.chunk_bytes, dtypes
+            )
+            for start, end in ranges
+        ))
+        return functools.reduce(self.merge_profiles, partials, {})
 
-    def _update_profile(self, profile: Dict[str, Any], chunk: pd.DataFrame):
+    def merge_profiles(self, left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge a running profile into another one.
+
+        The merge is associative, so partial profiles of consecutive parts of
+        a file can be combined in any grouping.
+
+        Args:
+            left (Dict[str, Any]): Running profile, updated in place.
+            right (Dict[str, Any]): Running profile of later rows.
+
+        Returns:
+            Dict[str, Any]: The merged profile (left).
+        """
+        for column, stats in right.items():
+            if column not in left:
+                left[column] = stats
+                continue
+
+            merged = left[column]
+            merged["total_count"] += stats["total_count"]
+            merged["null_count"] += stats["null_count"]
+            merged["max_length"] = max(merged["max_length"], stats["max_length"])
+            merged["boolean"] = merged["boolean"] and stats["boolean"]
+            formats = {fmt for fmt in (merged["date_format"], stats["date_format"]) if fmt is not None}
+            if merged["temporal"] and stats["temporal"] and len(formats) <= 1:
+                merged["date_format"] = formats.pop() if formats else None
+                merged["has_time"] = merged["has_time"] or stats["has_time"]
+            else:
+                self._drop_temporal_stats(merged)
+            for key in ("distinct_sketch", "top_k_sketch", "example_reservoir"):
+                merged[key].merge(stats[key])
+
+            if merged["numeric"] and stats["numeric"]:
+                merged["integral"] = merged["integral"] and stats["integral"]
+                for key, pick in (("min", min), ("max", max)):
+                    candidates = [value for value in (merged[key], stats[key]) if value is not None]
+                    merged[key] = pick(candidates) if candidates else None
+                scales = (merged["scale"], stats["scale"])
+                merged["scale"] = None if None in scales else max(scales)
+                for key in ("sum", "moments", "quantile_sketch"):
+                    merged[key].merge(stats[key])
+            elif merged["numeric"]:
+                self._drop_numeric_stats(merged)
+        return left
+
+    def finalize_profile(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Derive the final statistics from a running profile.
+
+        The running profile is left untouched, so this can be called on a
+        partially accumulated profile while more chunks are still coming in.
+        Sketches are replaced by plain values: an approximate unique_count,
+        the top_values with their counts and a reservoir of examples, plus
+        the variance, std, median, p1, p25, p75, p99 and iqr of numeric
+        columns.
+
+        Args:
+            profile (Dict[str, Any]): Running profile built by update_profile.
+
+        Returns:
+            Dict[str, Any]: Full profile with null percentages and means.
+        """
+        finalized = {}
+        for column, stats in profile.items():
+            info = dict(stats)
+            info["unique_count"] = info.pop("distinct_sketch").estimate()
+            info["top_values"] = info.pop("top_k_sketch").top(self.top_k)
+            info["examples"] = list(info.pop("example_reservoir").items)
+            info["null_percentage"] = (info["null_count"] / info["total_count"]) * 100 if info["total_count"] else 0.0
+            info["date_detected"] = bool(info["temporal"] and info["date_format"])
+            if info["numeric"]:
+                non_null = info["total_count"] - info["null_count"]
+                exact_sum = info["sum"]
+                info["sum"] = int(exact_sum.total) if info["integral"] and not exact_sum.non_finite else exact_sum.value()
+                info["mean"] = exact_sum.mean(non_null)
+                info["variance"] = info.pop("moments").variance
+                info["std"] = math.sqrt(info["variance"]) if info["variance"] >= 0 else float("nan")
+                p1, p25, median, p75, p99 = info.pop("quantile_sketch").quantiles([0.01, 0.25, 0.5, 0.75, 0.99])
+                info.update({"p1": p1, "p25": p25, "median": median, "p75": p75, "p99": p99, "iqr": p75 - p25})
+            finalized[column] = info
+        return finalized
+
+    def assemble_profile(self, df_sample: pd.DataFrame, full_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine a sample and a finalized full profile into the profile structure.
+
+        Args:
+            df_sample (pd.DataFrame): First rows of the CSV file.
+            full_profile (Dict[str, Any]): Finalized full profile.
+
+        Returns:
+            Dict[str, Any]: Profile of the CSV file.
+        """
+        return {
+            "columns": df_sample.columns.tolist(),
+            "sample_analysis": self._analyze_sample(df_sample),
+            "full_profile": full_profile
+        }
+
+    def profile_chunk(self, chunk: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Build the running profile of a single chunk.
+
+        Unlike update_profile this returns a new profile, so it can run in
+        another process and be combined with merge_profiles afterwards.
+
+        Args:
+            chunk (pd.DataFrame): Chunk of data.
+
+        Returns:
+            Dict[str, Any]: Running profile of the chunk.
+        """
+        profile: Dict[str, Any] = {}
+        self.update_profile(profile, chunk)
+        return profile
+
+    def update_profile(self, profile: Dict[str, Any], chunk: pd.DataFrame):
         """
         Update the profile dictionary with statistics from a new chunk of data.
 
@@ -137,28 +355,244 @@ class DataProfiler:
                 profile[column] = {
                     "total_count": 0,
                     "null_count": 0,
-                    "unique_values": set(),
+                    "distinct_sketch": HyperLogLog(),
+                    "top_k_sketch": SpaceSaving(),
+                    "example_reservoir": Reservoir(),
+                    "max_length": 0,
+                    "boolean": True,
+                    "temporal": True,
+                    "date_format": None,
+                    "has_time": False,
                     "numeric": True,
+                    "integral": True,
                     "min": None,
                     "max": None,
-                    "sum": 0
+                    "scale": 0,
+                    "sum": ExactSum(),
+                    "moments": RunningMoments(),
+                    "quantile_sketch": KLLSketch()
                 }
             
+            values = chunk[column].dropna()
             profile[column]["total_count"] += len(chunk)
-            profile[column]["null_count"] += chunk[column].isnull().sum()
-            profile[column]["unique_values"].update(chunk[column].dropna().unique())
+            profile[column]["null_count"] += len(chunk) - len(values)
+            # Count values by a form that does not depend on the dtype pandas
+            # picked for this chunk, so 0 and '0' are one value
+            numbers, text = self._canonical_values(values)
+            for part in (numbers, text):
+                profile[column]["distinct_sketch"].update(part)
+                profile[column]["top_k_sketch"].update(part)
+                profile[column]["example_reservoir"].update(part)
+            if not values.empty:
+                profile[column]["max_length"] = max(
+                    profile[column]["max_length"], self._max_text_length(values, numbers, text)
+                )
+                if profile[column]["boolean"]:
+                    profile[column]["boolean"] = self._is_boolean(values)
+                if profile[column]["temporal"]:
+                    self._update_temporal_stats(profile[column], values)
             
             if profile[column]["numeric"]:
                 try:
-                    numeric_data = pd.to_numeric(chunk[column].dropna())
-                    profile[column]["min"] = min(profile[column]["min"] or numeric_data.min(), numeric_data.min())
-                    profile[column]["max"] = max(profile[column]["max"] or numeric_data.max(), numeric_data.max())
-                    profile[column]["sum"] += numeric_data.sum()
-                except:
-                    profile[column]["numeric"] = False
-                    del profile[column]["min"]
-                    del profile[column]["max"]
-                    del profile[column]["sum"]
+                    numeric_data = pd.to_numeric(values)
+                except (ValueError, TypeError):
+                    self._drop_numeric_stats(profile[column])
+                    continue
+
+                if not numeric_data.empty:
+                    chunk_min, chunk_max = numeric_data.min(), numeric_data.max()
+                    current_min, current_max = profile[column]["min"], profile[column]["max"]
+                    profile[column]["min"] = chunk_min if current_min is None else min(current_min, chunk_min)
+                    profile[column]["max"] = chunk_max if current_max is None else max(current_max, chunk_max)
+                profile[column]["sum"].update(numeric_data)
+                profile[column]["integral"] = profile[column]["integral"] and bool((numeric_data % 1 == 0).all())
+                if not profile[column]["integral"] and profile[column]["scale"] is not None and not numeric_data.empty:
+                    scale = self._decimal_scale(numeric_data)
+                    profile[column]["scale"] = None if scale is None else max(profile[column]["scale"], scale)
+                profile[column]["moments"].update(numeric_data)
+                profile[column]["quantile_sketch"].update(numeric_data)
+
+    @staticmethod
+    def _canonical_values(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """
+        Split a chunk's values into numbers and text, whatever their dtype.
+
+        The same CSV field can be parsed as an integer, a float or a string
+        depending on the rest of its chunk. Numbers become numeric values,
+        also when the chunk was parsed as text, and integral chunks are kept
+        as integers. Booleans become the text 'True' or 'False'.
+
+        Args:
+            values (pd.Series): Non-null values of a chunk.
+
+        Returns:
+            Tuple[pd.Series, pd.Series]: Numeric values and text values.
+        """
+        empty = values.iloc[:0]
+        if pd.api.types.is_bool_dtype(values.dtype):
+            return empty, values.map({True: "True", False: "False"}).astype(object)
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            return DataProfiler._integral_if_whole(values), empty
+
+        try:
+            first = values.str[:1]
+        except AttributeError:  # .str is only available when the values are strings
+            first = pd.Series(np.nan, index=values.index)
+        # Anything that is not a string could be a number
+        candidates = first.isin(_NUMBER_STARTS) | first.isna()
+        numbers = pd.to_numeric(values[candidates], errors="coerce").dropna() if candidates.any() else empty
+        text = values.drop(numbers.index) if len(numbers) else values
+        if first.isin(("t", "T", "f", "F")).any():
+            text = text.replace(_BOOLEAN_SPELLINGS)
+        return DataProfiler._integral_if_whole(numbers), text
+
+    @staticmethod
+    def _integral_if_whole(numbers: pd.Series) -> pd.Series:
+        """Numbers as int64 when every one of them is a whole number that fits."""
+        if pd.api.types.is_integer_dtype(numbers.dtype) or numbers.empty:
+            return numbers
+        array = numbers.to_numpy(dtype=np.float64)
+        if np.isfinite(array).all() and (array % 1 == 0).all() and np.abs(array).max() < 2 ** 63:
+            return pd.Series(array.astype(np.int64), index=numbers.index, name=numbers.name)
+        return pd.Series(array, index=numbers.index, name=numbers.name)
+
+    @staticmethod
+    def _max_text_length(values: pd.Series, numbers: pd.Series, text: pd.Series) -> int:
+        """
+        Length of the longest value when written as text.
+
+        Numbers are measured by what they are rather than by the dtype of
+        their chunk: whole numbers by their extremes plus room for the '.0'
+        a float column writes, others by the longest float repr. Numbers
+        read from text also count with their own text. Only text values
+        are measured value by value.
+
+        Args:
+            values (pd.Series): Non-null values of a chunk.
+            numbers (pd.Series): Numeric values, see _canonical_values.
+            text (pd.Series): Text values, see _canonical_values.
+
+        Returns:
+            int: Maximum text length.
+        """
+        length = 0
+        if not numbers.empty:
+            if pd.api.types.is_integer_dtype(numbers.dtype):
+                length = max(len(str(numbers.min())), len(str(numbers.max()))) + 2
+            else:
+                length = _MAX_FLOAT_REPR_LENGTH
+            if not pd.api.types.is_numeric_dtype(values.dtype):
+                length = max(length, int(values[numbers.index].astype(str).str.len().max()))
+        if not text.empty:
+            try:
+                lengths = text.str.len()
+            except AttributeError:  # .str is only available when the values are strings
+                lengths = None
+            if lengths is None or lengths.isna().any():
+                lengths = text.astype(str).str.len()
+            length = max(length, int(lengths.max()))
+        return length
+
+    @staticmethod
+    def _is_boolean(values: pd.Series) -> bool:
+        """
+        Whether all values are booleans or spell true/false, yes/no or t/f.
+
+        Args:
+            values (pd.Series): Non-null values of a chunk.
+
+        Returns:
+            bool: True when the chunk could be stored as BOOLEAN.
+        """
+        if pd.api.types.is_bool_dtype(values.dtype):
+            return True
+        if values.dtype != object:
+            return False
+        return bool(values.astype(str).str.lower().isin(_BOOLEAN_TEXT).all())
+
+    def _update_temporal_stats(self, stats: Dict[str, Any], values: pd.Series):
+        """
+        Check that a chunk parses as dates in the column's date format.
+
+        The format is guessed from the first value and every later value must
+        parse with it, so one vectorized to_datetime call covers the chunk.
+
+        Args:
+            stats (Dict[str, Any]): Running profile of one column.
+            values (pd.Series): Non-null values of a chunk.
+        """
+        if values.dtype != object:
+            self._drop_temporal_stats(stats)
+            return
+        if stats["date_format"] is None:
+            first = values.iloc[0]
+            date_format = guess_datetime_format(first) if isinstance(first, str) else None
+            # Time zones would be lost in a TIMESTAMP column
+            if date_format is None or "%z" in date_format or "%Z" in date_format:
+                self._drop_temporal_stats(stats)
+                return
+            stats["date_format"] = date_format
+
+        try:
+            parsed = pd.to_datetime(values, format=stats["date_format"], errors="coerce")
+        except (ValueError, TypeError):
+            parsed = None
+        if parsed is None or parsed.isna().any():
+            self._drop_temporal_stats(stats)
+            return
+        if not stats["has_time"]:
+            stats["has_time"] = bool((parsed != parsed.dt.normalize()).any())
+
+    @staticmethod
+    def _decimal_scale(values: pd.Series) -> Optional[int]:
+        """
+        Number of decimal places needed to write every value exactly.
+
+        Values are scaled by increasing powers of ten until they are whole
+        numbers, up to a few floating-point ulps of error.
+
+        Args:
+            values (pd.Series): Non-null numeric values of a chunk.
+
+        Returns:
+            Optional[int]: Decimal places, or None when the values are not
+                finite or need more than 15 places.
+        """
+        pending = np.abs(values.to_numpy(dtype=np.float64))
+        if not np.isfinite(pending).all():
+            return None
+        for scale in range(_MAX_DECIMAL_SCALE + 1):
+            scaled = pending * 10.0 ** scale
+            exact = np.abs(scaled - np.round(scaled)) <= 4 * np.spacing(scaled)
+            pending = pending[~exact]
+            if pending.size == 0:
+                return scale
+        return None
+
+    @staticmethod
+    def _drop_temporal_stats(stats: Dict[str, Any]):
+        """
+        Mark a column profile as not holding dates.
+
+        Args:
+            stats (Dict[str, Any]): Running profile of one column.
+        """
+        stats["temporal"] = False
+        stats["date_format"] = None
+        stats["has_time"] = False
+
+    @staticmethod
+    def _drop_numeric_stats(stats: Dict[str, Any]):
+        """
+        Mark a column profile as non-numeric and discard its numeric statistics.
+
+        Args:
+            stats (Dict[str, Any]): Running profile of one column.
+        """
+        stats["numeric"] = False
+        stats["integral"] = False
+        for key in _NUMERIC_KEYS:
+            del stats[key]
 
     def generate_report(self, profile: Dict[str, Any]) -> str:
         """
@@ -182,14 +616,121 @@ class DataProfiler:
             report += f"  Total Count: {full_profile[column]['total_count']}\n"
             report += f"  Null Count: {full_profile[column]['null_count']}\n"
             report += f"  Null Percentage: {full_profile[column]['null_percentage']:.2f}%\n"
-            report += f"  Unique Values: {len(full_profile[column]['unique_values'])}\n"
+            report += f"  Unique Values (approx.): {full_profile[column]['unique_count']}\n"
+            top_values = full_profile[column].get('top_values', [])[:5]
+            report += f"  Top Values: {', '.join(f'{value} ({count})' for value, count in top_values)}\n"
             
             if full_profile[column]["numeric"]:
                 report += f"  Minimum: {full_profile[column]['min']}\n"
                 report += f"  Maximum: {full_profile[column]['max']}\n"
                 report += f"  Mean: {full_profile[column]['mean']:.2f}\n"
+                report += f"  Std Dev: {full_profile[column]['std']:.2f}\n"
+                report += f"  Median: {full_profile[column]['median']}\n"
+                report += f"  P1 / P99: {full_profile[column]['p1']} / {full_profile[column]['p99']}\n"
+                report += f"  IQR: {full_profile[column]['iqr']}\n"
             
             report += f"  Sample Values: {', '.join(map(str, sample_analysis.get(column, {}).get('sample_values', [])))}\n"
             report += "\n"
 
-        return report
\ No newline at end of file
+        return report
+
+def profile_state_to_dict(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a running profile to a JSON-compatible dict.
+
+    Columns are kept as a list, since JSONB does not keep the order of keys.
+
+    Args:
+        profile (Dict[str, Any]): Running profile built by update_profile.
+
+    Returns:
+        Dict[str, Any]: Versioned state that profile_state_from_dict restores.
+    """
+    columns = []
+    for column, stats in profile.items():
+        columns.append([column, {
+            key: value.to_dict() if key in _SKETCH_KEYS else encode_value(value)
+            for key, value in stats.items()
+        }])
+    return {"version": PROFILE_STATE_VERSION, "columns": columns}
+
+def profile_state_from_dict(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Restore a running profile from profile_state_to_dict output.
+
+    Args:
+        state (Dict[str, Any]): Output of profile_state_to_dict.
+
+    Returns:
+        Dict[str, Any]: Running profile that update_profile can continue.
+
+    Raises:
+        ValueError: If the state, or a sketch in it, was written in another
+            layout and cannot be resumed.
+    """
+    version = state.get("version")
+    if version != PROFILE_STATE_VERSION:
+        raise ValueError(f"Profile state has version {version}, expected {PROFILE_STATE_VERSION}")
+    profile = {}
+    for column, stats in state["columns"]:
+        profile[column] = {
+            key: _SKETCH_KEYS[key].from_dict(value) if key in _SKETCH_KEYS else decode_value(value)
+            for key, value in stats.items()
+        }
+    return profile
+
+def _profile_range(
+    file_path: str,
+    start: Optional[int],
+    end: Optional[int],
+    chunk_size: int,
+    chunk_bytes: Optional[int],
+    dtypes: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Build the running profile of one byte range of a file in a worker.
+
+    Args:
+        file_path (str): Path to the CSV file.
+        start (Optional[int]): Byte offset of the first row in the range;
+            the first data row when None.
+        end (Optional[int]): Byte offset where the range ends; the end of
+            the file when None.
+        chunk_size (int): Number of rows to process in each chunk.
+        chunk_bytes (Optional[int]): Size of each chunk in bytes, if set.
+        dtypes (Optional[Dict[str, Any]]): Dtypes of the file's first block;
+            inferred from the range's first block when not set.
+
+    Returns:
+        Dict[str, Any]: Running profile of the range.
+    """
+    profiler = DataProfiler(chunk_bytes=chunk_bytes)
+    profile: Dict[str, Any] = {}
+    reader = CSVChunkReader(file_path, chunk_rows=chunk_size, chunk_bytes=chunk_bytes, dtypes=dtypes)
+    for chunk in reader.iter_range(start, end):
+        profiler.update_profile(profile, chunk)
+    return profile
+
+def _profile_cached(cache: DatasetCache, file_path: str, chunk_size: int) -> Optional[Dict[str, Any]]:
+    """
+    Build the running profile of a file from its cached parsed dataset in a worker.
+
+    The worker maps the cached file itself, so no data is sent to it.
+
+    Args:
+        cache (DatasetCache): Cache of parsed datasets.
+        file_path (str): Path to the CSV file.
+        chunk_size (int): Number of rows to process in each chunk.
+
+    Returns:
+        Optional[Dict[str, Any]]: Running profile of the file, or None if its
+            parsed dataset is not cached.
+    """
+    df = cache.read(file_path, 'parsed')
+    if df is None:
+        return None
+    profiler = DataProfiler()
+    profile: Dict[str, Any] = {}
+    for start in range(0, len(df), chunk_size):
+        profiler.update_profile(profile, df.iloc[start:start + chunk_size])
+    return profile
@@ -0,0 +1,814 @@
+"""
+Module with bounded-memory, mergeable sketches for column profiling.
+
+Every sketch has a fixed memory cost regardless of how many values it has
+seen, is updated a whole chunk (pd.Series) at a time, and can be merged with
+another sketch of the same kind built over a different part of the data.
+The sketches of a running profile convert to and from JSON-compatible
+dicts, tagged with SKETCH_STATE_VERSION, so they can be stored and resumed.
+"""
+
+import base64
+import math
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Version of the layout written by to_dict; from_dict refuses any other
+SKETCH_STATE_VERSION = 1
+
+class HyperLogLog:
+    """HyperLogLog estimator of the number of distinct values."""
+
+    def __init__(self, precision: int = 12):
+        """
+        Initialize the HyperLogLog sketch.
+
+        Args:
+            precision (int): Number of index bits; uses 2**precision one-byte
+                registers (4 KiB at the default, ~1.6% standard error).
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values: pd.Series):
+        """
+        Add the non-null values of a chunk to the sketch.
+
+        Args:
+            values (pd.Series): Non-null values to add.
+        """
+        if values.empty:
+            return
+        hashes = _hash_values(values)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        rank = np.minimum(65 - _bit_length(hashes << p), 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        Merge another sketch into this one.
+
+        Args:
+            other (HyperLogLog): Sketch with the same precision.
+
+        Returns:
+            HyperLogLog: This sketch, updated in place.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precisions")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> int:
+        """
+        Estimate the number of distinct values seen.
+
+        Returns:
+            int: Estimated distinct count.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the sketch to a JSON-compatible dict."""
+        return {
+            "version": SKETCH_STATE_VERSION,
+            "precision": self.precision,
+            "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        """
+        Rebuild a sketch from to_dict output.
+
+        Args:
+            state (Dict[str, Any]): Output of to_dict.
+
+        Returns:
+            HyperLogLog: The restored sketch.
+
+        Raises:
+            ValueError: If the state has another version or is malformed.
+        """
+        _check_version(state, cls)
+        sketch = cls(state["precision"])
+        registers = np.frombuffer(base64.b64decode(state["registers"]), dtype=np.uint8)
+        if len(registers) != len(sketch.registers):
+            raise ValueError("HyperLogLog state does not match its precision")
+        sketch.registers = registers.copy()
+        return sketch
+
+class SpaceSaving:
+    """Space-Saving summary of the most frequent values."""
+
+    def __init__(self, capacity: int = 128):
+        """
+        Initialize the Space-Saving summary.
+
+        Args:
+            capacity (int): Number of counters kept.
+        """
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+        self.errors: Dict[Any, int] = {}
+
+    def update(self, values: pd.Series):
+        """
+        Add the non-null values of a chunk to the summary.
+
+        The chunk is first summarized exactly with value_counts and then
+        merged, so the per-value Python work is bounded by the capacity.
+
+        Args:
+            values (pd.Series): Non-null values to add.
+        """
+        if values.empty:
+            return
+        value_counts = values.value_counts()
+        # Categorical values also count the categories that do not occur
+        value_counts = value_counts[value_counts > 0]
+        chunk = SpaceSaving(self.capacity)
+        top = value_counts.iloc[:self.capacity]
+        chunk.counts = dict(zip(top.index.tolist(), top.tolist()))
+        if len(value_counts) > self.capacity:
+            # Every dropped value is counted at most as often as the next one
+            floor = int(value_counts.iloc[self.capacity])
+            chunk.errors = {value: floor for value in chunk.counts}
+            chunk.counts = {value: count + floor for value, count in chunk.counts.items()}
+        else:
+            chunk.errors = {value: 0 for value in chunk.counts}
+        self.merge(chunk)
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Merge another summary into this one.
+
+        A value missing from a full summary may have been seen up to that
+        summary's smallest count, so that count is added as its error.
+
+        Args:
+            other (SpaceSaving): Summary to merge.
+
+        Returns:
+            SpaceSaving: This summary, updated in place.
+        """
+        own_floor = self._floor()
+        other_floor = other._floor()
+        counts, errors = {}, {}
+        for value in self.counts.keys() | other.counts.keys():
+            counts[value] = self.counts.get(value, own_floor) + other.counts.get(value, other_floor)
+            errors[value] = self.errors.get(value, own_floor) + other.errors.get(value, other_floor)
+        kept = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {value: counts[value] for value in kept}
+        self.errors = {value: errors[value] for value in kept}
+        return self
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[Any, int]]:
+        """
+        Return the most frequent values with their guaranteed counts.
+
+        Counts are lower bounds (counter minus error), so values that only
+        hold a counter because of evictions do not look like heavy hitters.
+
+        Args:
+            k (Optional[int]): Number of values to return; all counters if None.
+
+        Returns:
+            List[Tuple[Any, int]]: Values and counts, most frequent first.
+        """
+        guaranteed = [(value, count - self.errors[value]) for value, count in self.counts.items()]
+        ranked = sorted(guaranteed, key=lambda item: item[1], reverse=True)
+        return ranked[:k] if k is not None else ranked
+
+    def _floor(self) -> int:
+        """Smallest count of a full summary, or 0 if there is still room."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the summary to a JSON-compatible dict."""
+        return {
+            "version": SKETCH_STATE_VERSION,
+            "capacity": self.capacity,
+            "entries": [[encode_value(value), count, self.errors[value]] for value, count in self.counts.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "SpaceSaving":
+        """
+        Rebuild a summary from to_dict output.
+
+        Args:
+            state (Dict[str, Any]): Output of to_dict.
+
+        Returns:
+            SpaceSaving: The restored summary.
+
+        Raises:
+            ValueError: If the state has another version.
+        """
+        _check_version(state, cls)
+        summary = cls(state["capacity"])
+        for value, count, error in state["entries"]:
+            value = decode_value(value)
+            summary.counts[value] = count
+            summary.errors[value] = error
+        return summary
+
+class Reservoir:
+    """Uniform reservoir sample of example values."""
+
+    def __init__(self, size: int = 20, seed: int = 0):
+        """
+        Initialize the reservoir.
+
+        Args:
+            size (int): Number of examples kept.
+            seed (int): Seed for the random generator, for reproducible profiles.
+        """
+        self.size = size
+        self.seen = 0
+        self.items: List[Any] = []
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: pd.Series):
+        """
+        Offer the non-null values of a chunk to the reservoir (Algorithm R).
+
+        Args:
+            values (pd.Series): Non-null values to add.
+        """
+        if values.empty:
+            return
+        array = values.to_numpy()
+        fill = min(self.size - len(self.items), len(array))
+        if fill > 0:
+            self.items.extend(array[:fill].tolist())
+        rest = array[fill:]
+        if len(rest):
+            # Value i (1-based over everything seen) replaces a slot with probability size / i
+            positions = np.arange(self.seen + fill + 1, self.seen + len(array) + 1)
+            slots = self._rng.integers(0, positions)
+            hits = np.flatnonzero(slots < self.size)
+            for hit in hits:
+                self.items[slots[hit]] = rest[hit:hit + 1].tolist()[0]
+        self.seen += len(array)
+
+    def merge(self, other: "Reservoir") -> "Reservoir":
+        """
+        Merge another reservoir into this one, weighting each by what it has seen.
+
+        Args:
+            other (Reservoir): Reservoir to merge.
+
+        Returns:
+            Reservoir: This reservoir, updated in place.
+        """
+        if not other.seen:
+            return self
+        if not self.seen:
+            self.items, self.seen = list(other.items), other.seen
+            return self
+        k = min(self.size, len(self.items) + len(other.items))
+        from_self = int(self._rng.hypergeometric(self.seen, other.seen, k))
+        from_self = max(k - len(other.items), min(from_self, len(self.items)))
+        mine = self._rng.permutation(len(self.items))[:from_self]
+        theirs = self._rng.permutation(len(other.items))[:k - from_self]
+        self.items = [self.items[i] for i in mine] + [other.items[i] for i in theirs]
+        self.seen += other.seen
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the reservoir, including its random state, to a JSON-compatible dict."""
+        return {
+            "version": SKETCH_STATE_VERSION,
+            "size": self.size,
+            "seen": self.seen,
+            "items": [encode_value(item) for item in self.items],
+            "rng": self._rng.bit_generator.state
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "Reservoir":
+        """
+        Rebuild a reservoir from to_dict output.
+
+        Args:
+            state (Dict[str, Any]): Output of to_dict.
+
+        Returns:
+            Reservoir: The restored reservoir.
+
+        Raises:
+            ValueError: If the state has another version.
+        """
+        _check_version(state, cls)
+        reservoir = cls(state["size"])
+        reservoir.seen = state["seen"]
+        reservoir.items = [decode_value(item) for item in state["items"]]
+        reservoir._rng.bit_generator.state = state["rng"]
+        return reservoir
+
+class ExactSum:
+    """Exact, order-independent sum of float64 values.
+
+    Each value is split into an integer mantissa and a power-of-two exponent,
+    and mantissas are summed as integers per exponent, so partial sums over
+    any split of the data merge to bit-identical totals.
+    """
+
+    def __init__(self):
+        """Initialize an empty sum."""
+        self.total = Fraction(0)
+        self.non_finite = 0.0
+
+    def update(self, values: pd.Series):
+        """
+        Add the non-null numeric values of a chunk.
+
+        Args:
+            values (pd.Series): Non-null numeric values to add.
+        """
+        if values.empty:
+            return
+        array = values.to_numpy(dtype=np.float64)
+        finite = np.isfinite(array)
+        if not finite.all():
+            self.non_finite += float(array[~finite].sum())
+            array = array[finite]
+        if not len(array):
+            return
+        mantissas, exponents = np.frexp(array)
+        integers = (mantissas * (1 << 53)).astype(np.int64)
+        unique_exponents, inverse = np.unique(exponents, return_inverse=True)
+        # Split into 26-bit halves so per-exponent int64 sums cannot overflow
+        high = np.zeros(len(unique_exponents), dtype=np.int64)
+        low = np.zeros(len(unique_exponents), dtype=np.int64)
+        np.add.at(high, inverse, integers >> 26)
+        np.add.at(low, inverse, integers & ((1 << 26) - 1))
+        for exponent, high_sum, low_sum in zip(unique_exponents.tolist(), high.tolist(), low.tolist()):
+            self.total += Fraction((high_sum << 26) + low_sum) * Fraction(2) ** (exponent - 53)
+
+    def merge(self, other: "ExactSum") -> "ExactSum":
+        """
+        Merge another sum into this one.
+
+        Args:
+            other (ExactSum): Sum to merge.
+
+        Returns:
+            ExactSum: This sum, updated in place.
+        """
+        self.total += other.total
+        self.non_finite += other.non_finite
+        return self
+
+    def value(self) -> float:
+        """Return the correctly rounded sum."""
+        return float(self.total) + self.non_finite
+
+    def mean(self, count: int) -> float:
+        """Return the correctly rounded mean of count values."""
+        if not count:
+            return float('nan')
+        if self.non_finite:
+            return self.value() / count
+        return float(self.total / count)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the sum to a JSON-compatible dict; the exact total is kept as a fraction."""
+        return {
+            "version": SKETCH_STATE_VERSION,
+            "numerator": str(self.total.numerator),
+            "denominator": str(self.total.denominator),
+            "non_finite": encode_value(self.non_finite)
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "ExactSum":
+        """
+        Rebuild a sum from to_dict output.
+
+        Args:
+            state (Dict[str, Any]): Output of to_dict.
+
+        Returns:
+            ExactSum: The restored sum.
+
+        Raises:
+            ValueError: If the state has another version.
+        """
+        _check_version(state, cls)
+        exact_sum = cls()
+        exact_sum.total = Fraction(int(state["numerator"]), int(state["denominator"]))
+        exact_sum.non_finite = decode_value(state["non_finite"])
+        return exact_sum
+
+class RunningMoments:
+    """Count, mean and variance accumulated with Welford's method."""
+
+    def __init__(self):
+        """Initialize empty moments."""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: pd.Series):
+        """
+        Add the non-null numeric values of a chunk.
+
+        Args:
+            values (pd.Series): Non-null numeric values to add.
+        """
+        if values.empty:
+            return
+        array = values.to_numpy(dtype=np.float64)
+        chunk = RunningMoments()
+        chunk.count = len(array)
+        chunk.mean = float(array.mean())
+        chunk.m2 = float(np.square(array - chunk.mean).sum())
+        self.merge(chunk)
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        """
+        Merge another set of moments into this one (Chan et al.).
+
+        Args:
+            other (RunningMoments): Moments to merge.
+
+        Returns:
+            RunningMoments: These moments, updated in place.
+        """
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the moments to a JSON-compatible dict."""
+        return {
+            "version": SKETCH_STATE_VERSION,
+            "count": self.count,
+            "mean": encode_value(self.mean),
+            "m2": encode_value(self.m2)
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "RunningMoments":
+        """
+        Rebuild moments from to_dict output.
+
+        Args:
+            state (Dict[str, Any]): Output of to_dict.
+
+        Returns:
+            RunningMoments: The restored moments.
+
+        Raises:
+            ValueError: If the state has another version.
+        """
+        _check_version(state, cls)
+        moments = cls()
+        moments.count = state["count"]
+        moments.mean = decode_value(state["mean"])
+        moments.m2 = decode_value(state["m2"])
+        return moments
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (ddof=1), matching Postgres VARIANCE and pandas."""
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+class CoMoments:
+    """
+    Pairwise counts, means, variances and co-moments of numeric columns.
+
+    Every statistic is kept per pair of columns over the rows where both are
+    present, so the correlations match pandas' pairwise-complete corr().
+    Chunks are centered before their sums are taken and merged with Chan's
+    formulas, which keeps large offsets from cancelling out precision.
+    """
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        """
+        Initialize empty co-moments.
+
+        Args:
+            columns (Optional[List[str]]): Columns tracked; taken from the
+                first chunk when not given.
+        """
+        self.columns = list(columns) if columns is not None else None
+        size = len(self.columns) if self.columns is not None else 0
+        self.count = np.zeros((size, size), dtype=np.float64)
+        # means[i, j] and m2[i, j] describe column i over the rows where j is present too
+        self.means = np.zeros((size, size), dtype=np.float64)
+        self.m2 = np.zeros((size, size), dtype=np.float64)
+        self.comoments = np.zeros((size, size), dtype=np.float64)
+
+    def update(self, frame: pd.DataFrame):
+        """
+        Add a chunk of numeric columns.
+
+        Args:
+            frame (pd.DataFrame): Chunk with at least the tracked columns.
+        """
+        if self.columns is None:
+            self.__init__(list(frame.columns))
+        if frame.empty or not self.columns:
+            return
+        values = frame[self.columns].to_numpy(dtype=np.float64)
+        present = np.isfinite(values)
+        with np.errstate(invalid='ignore'):
+            shift = np.where(present.any(axis=0), np.nanmean(np.where(present, values, np.nan), axis=0), 0.0)
+        centered = np.where(present, values - shift, 0.0)
+        mask = present.astype(np.float64)
+
+        chunk = CoMoments(self.columns)
+        chunk.count = mask.T @ mask
+        sums = centered.T @ mask
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centered_means = np.where(chunk.count > 0, sums / chunk.count, 0.0)
+        chunk.means = centered_means + shift[:, None]
+        chunk.m2 = np.square(centered).T @ mask - sums * centered_means
+        chunk.comoments = centered.T @ centered - sums * centered_means.T
+        self.merge(chunk)
+
+    def merge(self, other: "CoMoments") -> "CoMoments":
+        """
+        Merge other co-moments into these.
+
+        Only the columns tracked by both are kept, so a column that stops
+        being numeric in a later chunk drops out.
+
+        Args:
+            other (CoMoments): Co-moments to merge.
+
+        Returns:
+            CoMoments: These co-moments, updated in place.
+        """
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__init__(other.columns)
+        grid = (slice(None), slice(None))
+        if other.columns != self.columns:
+            shared = [column for column in self.columns if column in other.columns]
+            self._select(shared)
+            positions = [other.columns.index(column) for column in shared]
+            grid = np.ix_(positions, positions)
+        other_count, other_means = other.count[grid], other.means[grid]
+        other_m2, other_comoments = other.m2[grid], other.comoments[grid]
+
+        total = self.count + other_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = np.where(total > 0, other_count / total, 0.0)
+        delta = other_means - self.means
+        self.means = self.means + delta * share
+        self.m2 = self.m2 + other_m2 + np.square(delta) * self.count * share
+        self.comoments = self.comoments + other_comoments + delta * delta.T * self.count * share
+        self.count = total
+        return self
+
+    def correlation(self) -> pd.DataFrame:
+        """
+        Pearson correlation of every pair of columns.
+
+        Returns:
+            pd.DataFrame: Correlation matrix; NaN for pairs with fewer than
+                two rows or without variance.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matrix = self.comoments / np.sqrt(self.m2 * self.m2.T)
+        matrix = np.where((self.count >= 2) & np.isfinite(matrix), np.clip(matrix, -1.0, 1.0), np.nan)
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+    def _select(self, columns: List[str]):
+        """Keep only the given columns."""
+        index = [self.columns.index(column) for column in columns]
+        grid = np.ix_(index, index)
+        self.count, self.means = self.count[grid], self.means[grid]
+        self.m2, self.comoments = self.m2[grid], self.comoments[grid]
+        self.columns = list(columns)
+
+class KLLSketch:
+    """KLL quantile sketch over numeric values."""
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        """
+        Initialize the KLL sketch.
+
+        Args:
+            k (int): Size of the top compactor; rank error is about 1.7 / k.
+            seed (int): Seed for the compaction coin flips.
+        """
+        self.k = k
+        self.count = 0
+        self.levels: List[np.ndarray] = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: pd.Series):
+        """
+        Add the non-null numeric values of a chunk.
+
+        Args:
+            values (pd.Series): Non-null numeric values to add.
+        """
+        if values.empty:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values.to_numpy(dtype=np.float64)])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """
+        Merge another sketch into this one.
+
+        Args:
+            other (KLLSketch): Sketch to merge.
+
+        Returns:
+            KLLSketch: This sketch, updated in place.
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for height, items in enumerate(other.levels):
+            self.levels[height] = np.concatenate([self.levels[height], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantiles(self, qs: List[float]) -> List[float]:
+        """
+        Estimate several quantiles at once.
+
+        Args:
+            qs (List[float]): Quantiles between 0 and 1.
+
+        Returns:
+            List[float]: Estimated values, NaN if the sketch is empty.
+        """
+        if self.count == 0:
+            return [float('nan')] * len(qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 1 << height, dtype=np.int64) for height, level in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        ranks = np.asarray(qs, dtype=np.float64) * cumulative[-1]
+        positions = np.minimum(np.searchsorted(cumulative, ranks, side='left'), len(items) - 1)
+        return items[positions].tolist()
+
+    def cdf(self, points: List[float]) -> List[float]:
+        """
+        Estimate the share of values at or below each of several points.
+
+        Args:
+            points (List[float]): Points to evaluate, in any order.
+
+        Returns:
+            List[float]: Estimated shares between 0 and 1, NaN if the sketch
+                is empty.
+        """
+        if self.count == 0:
+            return [float('nan')] * len(points)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 1 << height, dtype=np.int64) for height, level in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(items, np.asarray(points, dtype=np.float64), side='right')
+        below = np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0)
+        return (below / cumulative[-1]).tolist()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the sketch, including its random state, to a JSON-compatible dict."""
+        return {
+            "version": SKETCH_STATE_VERSION,
+            "k": self.k,
+            "count": self.count,
+            "levels": [[encode_value(item) for item in level.tolist()] for level in self.levels],
+            "rng": self._rng.bit_generator.state
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "KLLSketch":
+        """
+        Rebuild a sketch from to_dict output.
+
+        Args:
+            state (Dict[str, Any]): Output of to_dict.
+
+        Returns:
+            KLLSketch: The restored sketch.
+
+        Raises:
+            ValueError: If the state has another version.
+        """
+        _check_version(state, cls)
+        sketch = cls(state["k"])
+        sketch.count = state["count"]
+        sketch.levels = [
+            np.array([decode_value(item) for item in level], dtype=np.float64) for level in state["levels"]
+        ]
+        sketch._rng.bit_generator.state = state["rng"]
+        return sketch
+
+    def _capacity(self, height: int) -> int:
+        """Capacity of a level; lower levels shrink geometrically by 2/3."""
+        depth = len(self.levels) - height - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        """Compact over-full levels, promoting every other sorted item upwards."""
+        height = 0
+        while height < len(self.levels):
+            level = self.levels[height]
+            if len(level) > self._capacity(height):
+                if height + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                level = np.sort(level)
+                keep = level[-1:] if len(level) % 2 else level[:0]
+                pairs = level[:len(level) - len(keep)]
+                promoted = pairs[int(self._rng.integers(0, 2))::2]
+                self.levels[height] = keep
+                self.levels[height + 1] = np.concatenate([self.levels[height + 1], promoted])
+            height += 1
+
+def encode_value(value: Any) -> Any:
+    """
+    Convert a value seen by a sketch to a JSON-compatible one.
+
+    NumPy scalars become Python ones, and infinities and NaN, which JSON
+    cannot hold, become a tagged dict.
+
+    Args:
+        value (Any): Number or text.
+
+    Returns:
+        Any: JSON-compatible value that decode_value turns back.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return {"float": repr(value)}
+    return value
+
+def decode_value(value: Any) -> Any:
+    """
+    Invert encode_value.
+
+    Args:
+        value (Any): Output of encode_value.
+
+    Returns:
+        Any: The original value.
+    """
+    if isinstance(value, dict):
+        return float(value["float"])
+    return value
+
+def _check_version(state: Dict[str, Any], sketch_type: type):
+    """Refuse a sketch state written in another layout."""
+    version = state.get("version")
+    if version != SKETCH_STATE_VERSION:
+        raise ValueError(
+            f"{sketch_type.__name__} state has version {version}, expected {SKETCH_STATE_VERSION}"
+        )
+
+def _hash_values(values: pd.Series) -> np.ndarray:
+    """
+    Hash values to uint64 so that equal values hash equally across chunks.
+
+    Numeric values are hashed as float64, so 5 and 5.0 count as one value
+    even when the chunks were parsed with different dtypes.
+    """
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return pd.util.hash_array(values.to_numpy(dtype=np.float64))
+    return pd.util.hash_array(values.to_numpy(dtype=object))
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length for uint64 arrays."""
+    x = x.copy()
+    for shift in (1, 2, 4, 8, 16, 32):
+        x |= x >> np.uint64(shift)
+    return np.bitwise_count(x).astype(np.int64)
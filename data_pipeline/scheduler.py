@@ -0,0 +1,199 @@
+"""
+Module for scheduling the processing of many CSV files.
+
+Files are admitted against a memory budget estimated from their size, the
+largest first so that the slowest file does not start last. Once admitted,
+a file moves through the profile, load, LLM and visualize stages, each of
+which has its own concurrency limit, so one file can be parsed while
+another is still loading or waiting on the LLM.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from data_pipeline.metrics import MetricsRecorder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGE_LIMITS = {
+    'profile': 2,
+    'load': 2,
+    'llm': 4,
+    'sql': 2,
+    'visualize': 1
+}
+
+class PipelineScheduler:
+    """Class that admits files by memory and limits how many are in each stage."""
+
+    def __init__(
+        self,
+        stage_limits: Optional[Dict[str, int]] = None,
+        memory_budget: int = 2 * 1024 * 1024 * 1024,
+        memory_factor: float = 3.0,
+        metrics: Optional[MetricsRecorder] = None
+    ):
+        """
+        Initialize the PipelineScheduler.
+
+        Args:
+            stage_limits (Optional[Dict[str, int]]): Files allowed in each stage
+                at once, on top of the defaults.
+            memory_budget (int): Bytes of estimated memory all admitted files
+                may use together.
+            memory_factor (float): Estimated memory use of a file as a
+                multiple of its size on disk.
+            metrics (Optional[MetricsRecorder]): Measures every stage a file
+                goes through when set.
+        """
+        self.stage_limits = {**DEFAULT_STAGE_LIMITS, **(stage_limits or {})}
+        self.memory_budget = memory_budget
+        self.memory_factor = memory_factor
+        self.metrics = metrics
+        self.statuses: Dict[str, Dict[str, Any]] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._memory = asyncio.Condition()
+        self._reserved = 0
+
+    def estimate_memory(self, size: int) -> int:
+        """
+        Estimate the memory needed to process a file.
+
+        Args:
+            size (int): Size of the file in bytes.
+
+        Returns:
+            int: Estimated bytes, capped at the budget so that a file larger
+                than the budget can still run on its own.
+        """
+        return min(int(size * self.memory_factor), self.memory_budget)
+
+    async def run(
+        self,
+        files: Dict[str, int],
+        worker: Callable[[str], Awaitable[Any]]
+    ) -> Dict[str, Any]:
+        """
+        Process files largest-first within the memory budget.
+
+        Args:
+            files (Dict[str, int]): File sizes in bytes by file name.
+            worker (Callable[[str], Awaitable[Any]]): Coroutine function that
+                processes one file, using stage() around its steps.
+
+        Returns:
+            Dict[str, Any]: Result of the worker by file name; None for files
+                whose worker raised.
+        """
+        order = sorted(files, key=files.get, reverse=True)
+        for name in order:
+            self.statuses[name] = self._new_status(files[name])
+        results = await asyncio.gather(*(self._run_file(name, worker) for name in order))
+        return dict(zip(order, results))
+
+    async def _run_file(self, name: str, worker: Callable[[str], Awaitable[Any]]) -> Any:
+        """
+        Admit one file, run its worker and record how it ended.
+
+        Args:
+            name (str): Name of the file.
+            worker (Callable[[str], Awaitable[Any]]): Coroutine function that
+                processes one file.
+
+        Returns:
+            Any: Result of the worker, or None if it raised.
+        """
+        status = self.statuses[name]
+        needed = self.estimate_memory(status['size'])
+        async with self._memory:
+            await self._memory.wait_for(lambda: self._reserved + needed <= self.memory_budget)
+            self._reserved += needed
+
+        status['status'] = 'running'
+        started = time.perf_counter()
+        try:
+            result = await worker(name)
+            if status['status'] == 'running':
+                status['status'] = 'done'
+            return result
+        except Exception as e:
+            logger.exception(f"Error processing {name}: {str(e)}")
+            self.fail(name, str(e))
+            return None
+        finally:
+            status['durations']['total'] = time.perf_counter() - started
+            async with self._memory:
+                self._reserved -= needed
+                self._memory.notify_all()
+
+    @asynccontextmanager
+    async def stage(self, name: str, stage: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Hold one of the slots of a stage while a file is in it.
+
+        Time spent waiting for the slot is not measured.
+
+        Args:
+            name (str): Name of the file.
+            stage (str): Name of the stage.
+
+        Yields:
+            Dict[str, Any]: Measurement of the stage, on which the rows and
+                bytes it processed can be set; a throwaway dict without
+                metrics.
+        """
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            semaphore = self._semaphores[stage] = asyncio.Semaphore(self.stage_limits.get(stage, 1))
+        status = self.statuses.setdefault(name, self._new_status(0, 'running'))
+        async with semaphore:
+            status['stage'] = stage
+            started = time.perf_counter()
+            try:
+                with self.metrics.measure(name, stage) if self.metrics is not None else nullcontext({}) as record:
+                    yield record
+            finally:
+                durations = status['durations']
+                durations[stage] = durations.get(stage, 0.0) + time.perf_counter() - started
+
+    def fail(self, name: str, reason: str):
+        """
+        Mark a file as failed.
+
+        Args:
+            name (str): Name of the file.
+            reason (str): Why processing failed.
+        """
+        status = self.statuses.setdefault(name, self._new_status(0, 'running'))
+        status['status'] = 'failed'
+        status['error'] = reason
+
+    @staticmethod
+    def _new_status(size: int, state: str = 'pending') -> Dict[str, Any]:
+        """Status entry of a file that has not been processed yet."""
+        return {'size': size, 'status': state, 'stage': None, 'durations': {}, 'error': None}
+
+    def summary(self) -> str:
+        """
+        Generate a human-readable summary of how every file was processed.
+
+        Returns:
+            str: One line per file with its status and time spent per stage.
+        """
+        done = sum(1 for status in self.statuses.values() if status['status'] == 'done')
+        summary = f"Processed {done} of {len(self.statuses)} files:\n"
+        for name, status in self.statuses.items():
+            durations = status['durations']
+            timings = ", ".join(
+                f"{stage} {durations[stage]:.1f}s" for stage in (*self.stage_limits, 'total') if stage in durations
+            )
+            summary += f"  {name} ({status['size'] / 1024 / 1024:.1f} MB): {status['status']}"
+            if timings:
+                summary += f" [{timings}]"
+            if status['error']:
+                summary += f" at {status['stage'] or 'admission'}: {status['error']}"
+            summary += "\n"
+        return summary
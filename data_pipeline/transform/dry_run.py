@@ -0,0 +1,364 @@
+"""
+Module for checking generated SQL before it reaches a production table.
+
+The SQL the LLM suggests is extracted from its reply and split into
+statements. Each statement is first EXPLAINed against the real table for
+the planner's cost and row estimates, then run on a TABLESAMPLE copy of the
+table inside a transaction that is always rolled back. The time measured
+on the copy is extrapolated to the full table. Statements over the cost or
+time budget are rejected, and only a batch in which every statement passed
+may be applied to the real table.
+
+The copy is a temporary table with the same name as the real one, which
+shadows it for unqualified references, so the statements run unchanged.
+"""
+
+import json
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+from data_pipeline.ingest.pool import PoolManager
+
+logger = logging.getLogger(__name__)
+
+_FENCED_BLOCK = re.compile(r"```[ \t]*(?:sql|postgresql|postgres|pgsql)?[ \t]*\n(.*?)```", re.IGNORECASE | re.DOTALL)
+_DOLLAR_TAG = re.compile(r"\$[A-Za-z_0-9]*\$")
+
+# Statements that would end or alter the dry run's own transaction, or
+# cannot run inside one
+_TRANSACTION_CONTROL = {'BEGIN', 'START', 'COMMIT', 'END', 'ROLLBACK', 'ABORT', 'SAVEPOINT', 'RELEASE', 'PREPARE'}
+
+def extract_statements(text: str) -> List[str]:
+    """
+    Extract the SQL statements from an LLM reply.
+
+    Only fenced code blocks are read, as the prose around them is not SQL.
+    Statements are split on semicolons outside of quotes, comments and
+    dollar-quoted bodies; comment-only fragments are dropped.
+
+    Args:
+        text (str): Reply of the LLM.
+
+    Returns:
+        List[str]: Statements without their trailing semicolons, in order.
+    """
+    statements = []
+    for block in _FENCED_BLOCK.findall(text or ""):
+        statements.extend(split_statements(block))
+    return statements
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split a SQL script into statements.
+
+    Comments are removed, so each statement starts with its keyword.
+
+    Args:
+        sql (str): SQL script.
+
+    Returns:
+        List[str]: Non-empty statements without trailing semicolons.
+    """
+    statements = []
+    parts: List[str] = []
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if sql.startswith('--', i) or sql.startswith('/*', i):
+            if sql.startswith('--', i):
+                end = sql.find('\n', i)
+                i = len(sql) if end == -1 else end + 1
+            else:
+                end = sql.find('*/', i + 2)
+                i = len(sql) if end == -1 else end + 2
+            parts.append(' ')
+            continue
+        if char in ("'", '"'):
+            # A doubled quote inside a literal is an escaped quote
+            end = i + 1
+            while True:
+                end = sql.find(char, end)
+                if end == -1 or not sql.startswith(char * 2, end):
+                    break
+                end += 2
+            end = len(sql) if end == -1 else end + 1
+        elif char == '$' and _DOLLAR_TAG.match(sql, i):
+            tag = _DOLLAR_TAG.match(sql, i).group()
+            end = sql.find(tag, i + len(tag))
+            end = len(sql) if end == -1 else end + len(tag)
+        elif char == ';':
+            statements.append(''.join(parts).strip())
+            parts = []
+            i += 1
+            continue
+        else:
+            end = i + 1
+        parts.append(sql[i:end])
+        i = end
+    statements.append(''.join(parts).strip())
+    return [statement for statement in statements if statement]
+
+class SQLDryRunner:
+    """Class for estimating and trying SQL statements without changing the table."""
+
+    def __init__(
+        self,
+        pools: PoolManager,
+        max_cost: float = 1e7,
+        max_seconds: float = 60.0,
+        sample_percent: float = 1.0,
+        min_sample_rows: int = 10000,
+        lock_timeout: float = 5.0
+    ):
+        """
+        Initialize the SQLDryRunner.
+
+        Args:
+            pools (PoolManager): Shared connection pools.
+            max_cost (float): Largest planner cost a statement may have on
+                the full table.
+            max_seconds (float): Longest extrapolated run time a statement
+                may have on the full table; also the timeout on the sample.
+            sample_percent (float): Percentage of the table copied for the
+                trial runs.
+            min_sample_rows (int): Rows the copy should have at least; small
+                tables are copied whole.
+            lock_timeout (float): Seconds to wait for a lock on the real table.
+        """
+        self.pools = pools
+        self.max_cost = max_cost
+        self.max_seconds = max_seconds
+        self.sample_percent = sample_percent
+        self.min_sample_rows = min_sample_rows
+        self.lock_timeout = lock_timeout
+
+    async def check(self, db_name: str, table_name: str, statements: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Estimate and try statements against a table, changing nothing.
+
+        Args:
+            db_name (str): Name of the database.
+            table_name (str): Name of the table the statements work on.
+            statements (List[str]): Statements in the order they would run.
+
+        Returns:
+            Optional[Dict[str, Any]]: Report with the table's row count, the
+                sample size, whether every statement was accepted, and per
+                statement its planner cost and rows, where the cost came
+                from ('table' or 'sample'), the time on the sample, the
+                extrapolated time and its status ('accepted', 'rejected',
+                'failed' or 'skipped') with a reason. None if the dry run
+                itself could not be set up.
+        """
+        results = [self._new_result(statement) for statement in statements]
+        try:
+            async with self.pools.acquire(db_name) as conn:
+                transaction = conn.transaction()
+                await transaction.start()
+                try:
+                    await conn.execute(f"SET LOCAL lock_timeout = {int(self.lock_timeout * 1000)}")
+                    total_rows = await self._row_count(conn, table_name)
+
+                    # Planner estimates on the real table, before it is shadowed
+                    for result in results:
+                        if result['status'] != 'skipped':
+                            await self._explain(conn, result, 'table', 1.0)
+
+                    sample_rows = await self._create_sample(conn, table_name, total_rows)
+                    scale = total_rows / sample_rows if sample_rows else 1.0
+                    await conn.execute(f"SET LOCAL statement_timeout = {int(self.max_seconds * 1000)}")
+                    for result in results:
+                        if result['status'] != 'skipped':
+                            await self._try(conn, result, scale)
+                finally:
+                    await transaction.rollback()
+        except asyncpg.PostgresError as e:
+            logger.error(f"Error during SQL dry run on {table_name}: {e}")
+            return None
+
+        return {
+            'table': table_name,
+            'total_rows': total_rows,
+            'sample_rows': sample_rows,
+            'accepted': (
+                any(result['status'] == 'accepted' for result in results)
+                and all(result['status'] in ('accepted', 'skipped') for result in results)
+            ),
+            'statements': results
+        }
+
+    async def apply(self, db_name: str, table_name: str, report: Dict[str, Any]) -> bool:
+        """
+        Run the statements of a dry run on the real table.
+
+        The statements depend on each other, so they run in one transaction
+        and only if every one of them was accepted; skipped transaction
+        control statements are left out.
+
+        Args:
+            db_name (str): Name of the database.
+            table_name (str): Name of the table.
+            report (Dict[str, Any]): Report from check().
+
+        Returns:
+            bool: Whether the statements were applied.
+        """
+        if not report or not report['accepted']:
+            logger.warning(f"Not applying SQL transformations to {table_name}: not every statement passed the dry run")
+            return False
+        try:
+            async with self.pools.acquire(db_name) as conn:
+                async with conn.transaction():
+                    await conn.execute(f"SET LOCAL lock_timeout = {int(self.lock_timeout * 1000)}")
+                    statements = [result['statement'] for result in report['statements'] if result['status'] == 'accepted']
+                    for statement in statements:
+                        await conn.execute(statement)
+            logger.info(f"Applied {len(statements)} SQL transformations to {table_name}.")
+            return True
+        except asyncpg.PostgresError as e:
+            logger.error(f"Error applying SQL transformations to {table_name}: {e}")
+            return False
+
+    def summary(self, report: Optional[Dict[str, Any]]) -> str:
+        """
+        Generate a human-readable summary of a dry run.
+
+        Args:
+            report (Optional[Dict[str, Any]]): Report from check().
+
+        Returns:
+            str: One line per statement with its status and estimates.
+        """
+        if report is None:
+            return "SQL dry run failed."
+        summary = (
+            f"SQL dry run on {report['table']} ({report['sample_rows']} of {report['total_rows']} rows sampled):\n"
+        )
+        for index, result in enumerate(report['statements'], 1):
+            first_line = result['statement'].splitlines()[0][:60]
+            estimates = []
+            if result['cost'] is not None:
+                estimates.append(f"cost {result['cost']:.0f} ({result['cost_source']})")
+            if result['estimated_seconds'] is not None:
+                estimates.append(f"~{result['estimated_seconds']:.2f}s on the full table")
+            summary += f"  {index}. {result['status']}: {first_line}"
+            if estimates:
+                summary += f" [{', '.join(estimates)}]"
+            if result['reason']:
+                summary += f" - {result['reason']}"
+            summary += "\n"
+        return summary
+
+    @staticmethod
+    def _new_result(statement: str) -> Dict[str, Any]:
+        """Result entry of a statement that has not been checked yet."""
+        result = {
+            'statement': statement,
+            'cost': None,
+            'plan_rows': None,
+            'cost_source': None,
+            'sample_seconds': None,
+            'estimated_seconds': None,
+            'status': 'pending',
+            'reason': None
+        }
+        first_word = statement.split(None, 1)[0].upper() if statement.split() else ''
+        if first_word in _TRANSACTION_CONTROL:
+            result.update(status='skipped', reason='transaction control')
+        return result
+
+    async def _row_count(self, conn: asyncpg.Connection, table_name: str) -> int:
+        """Row count of a table, from the statistics when they exist."""
+        estimate = await conn.fetchval("SELECT reltuples FROM pg_class WHERE oid = $1::regclass", f'"{table_name}"')
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+        # Never analyzed: count once
+        return await conn.fetchval(f'SELECT COUNT(*) FROM "{table_name}"')
+
+    async def _create_sample(self, conn: asyncpg.Connection, table_name: str, total_rows: int) -> int:
+        """
+        Shadow the table with a sampled temporary copy.
+
+        Args:
+            conn (asyncpg.Connection): Connection in the dry run's transaction.
+            table_name (str): Name of the table.
+            total_rows (int): Rows of the table.
+
+        Returns:
+            int: Rows in the copy.
+        """
+        percent = self.sample_percent
+        if total_rows:
+            percent = max(percent, 100.0 * self.min_sample_rows / total_rows)
+        schema = await conn.fetchval("SELECT relnamespace::regnamespace::text FROM pg_class WHERE oid = $1::regclass", f'"{table_name}"')
+        source = f'{schema}."{table_name}"'
+        if percent >= 100:
+            query = f'CREATE TEMP TABLE "{table_name}" ON COMMIT DROP AS SELECT * FROM {source}'
+        else:
+            query = f'CREATE TEMP TABLE "{table_name}" ON COMMIT DROP AS SELECT * FROM {source} TABLESAMPLE SYSTEM ({percent!r})'
+        status = await conn.execute(query)
+        if status.split()[-1] == '0' and total_rows and percent < 100:
+            # SYSTEM picks whole pages and may pick none of a small table
+            await conn.execute(f'DROP TABLE pg_temp."{table_name}"')
+            status = await conn.execute(query.replace('TABLESAMPLE SYSTEM', 'TABLESAMPLE BERNOULLI'))
+        await conn.execute(f'ANALYZE pg_temp."{table_name}"')
+        return int(status.split()[-1])
+
+    async def _explain(self, conn: asyncpg.Connection, result: Dict[str, Any], source: str, scale: float):
+        """
+        Record the planner's estimates for a statement.
+
+        Statements that cannot be explained, such as DDL, or that depend on
+        earlier statements, leave the estimates empty.
+
+        Args:
+            conn (asyncpg.Connection): Connection in the dry run's transaction.
+            result (Dict[str, Any]): Result entry of the statement.
+            source (str): 'table' or 'sample'.
+            scale (float): Factor from the explained table to the full table.
+        """
+        try:
+            async with conn.transaction():
+                plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {result['statement']}")
+        except asyncpg.PostgresError:
+            return
+        top = json.loads(plan)[0]['Plan']
+        result.update(cost=top['Total Cost'] * scale, plan_rows=int(top['Plan Rows'] * scale), cost_source=source)
+
+    async def _try(self, conn: asyncpg.Connection, result: Dict[str, Any], scale: float):
+        """
+        Run a statement on the sample and judge it against the budgets.
+
+        A failing statement is undone on its own, so later statements still
+        run after it.
+
+        Args:
+            conn (asyncpg.Connection): Connection in the dry run's transaction.
+            result (Dict[str, Any]): Result entry of the statement.
+            scale (float): Rows of the table per row of the sample.
+        """
+        if result['cost'] is None:
+            await self._explain(conn, result, 'sample', scale)
+        try:
+            async with conn.transaction():
+                started = time.perf_counter()
+                await conn.execute(result['statement'])
+                result['sample_seconds'] = time.perf_counter() - started
+        except asyncpg.QueryCanceledError:
+            result.update(status='rejected', reason=f"exceeded {self.max_seconds}s on the sample")
+            return
+        except asyncpg.PostgresError as e:
+            result.update(status='failed', reason=str(e))
+            return
+
+        result['estimated_seconds'] = result['sample_seconds'] * scale
+        if result['cost'] is not None and result['cost'] > self.max_cost:
+            result.update(status='rejected', reason=f"cost {result['cost']:.0f} over budget {self.max_cost:.0f}")
+        elif result['estimated_seconds'] > self.max_seconds:
+            result.update(status='rejected', reason=f"estimated {result['estimated_seconds']:.1f}s over budget {self.max_seconds}s")
+        else:
+            result['status'] = 'accepted'
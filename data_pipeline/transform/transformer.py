@@ -0,0 +1,417 @@
+"""
+Module for declarative, set-based table transformations.
+
+A transformation spec is a list of steps, applied in order:
+
+- scale: {'op': 'scale', 'column': c, 'factor': f} or {..., 'divisor': d}
+- cap: {'op': 'cap', 'column': c, 'stddevs': k} caps values at k standard
+  deviations from the mean; {..., 'lower': a, 'upper': b} at fixed bounds
+- rename: {'op': 'rename', 'column': c, 'to': new_name}
+- derive: {'op': 'derive', 'column': c, 'expression': sql, 'type': sql_type}
+  adds a column; columns are referenced in the expression as {name}
+- recompute: {'op': 'recompute', 'column': c, 'expression': sql,
+  'tolerance': t} replaces values that differ from the expression by more
+  than t (every value when t is not given)
+
+Instead of one UPDATE per step, each of which rewrites every row and leaves
+as many dead tuples, the steps are composed into one SELECT list. The
+aggregates that caps need are computed together in a single scan, and the
+table is rewritten once with CREATE TABLE AS and swapped in within the same
+transaction, keeping its defaults, NOT NULL constraints, primary key,
+indexes and serial sequences.
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from data_pipeline.ingest.pool import PoolManager
+
+logger = logging.getLogger(__name__)
+
+# Transformations of the MLB bat tracking dataset
+MLB_BAT_TRACKING_TRANSFORMATIONS = [
+    # Standardize scales (convert percentages to 0-1 scale)
+    {'op': 'scale', 'column': 'percent_swings_competitive', 'divisor': 100},
+    # Handle outliers
+    {'op': 'cap', 'column': 'batter_run_value', 'stddevs': 3},
+    # Consistent naming conventions
+    {'op': 'rename', 'column': 'avg_bat_speed', 'to': 'average_bat_speed'},
+    # Feature engineering
+    {
+        'op': 'derive',
+        'column': 'contact_rate',
+        'expression': 'CAST({contact} AS FLOAT) / NULLIF({swings_competitive}, 0)',
+        'type': 'FLOAT'
+    },
+    # Data validation: ensure whiff_per_swing is consistent
+    {
+        'op': 'recompute',
+        'column': 'whiff_per_swing',
+        'expression': 'CAST({whiffs} AS FLOAT) / NULLIF({swings_competitive}, 0)',
+        'tolerance': 0.0001
+    }
+]
+
+_REQUIRED_KEYS = {
+    'scale': ('column',),
+    'cap': ('column',),
+    'rename': ('column', 'to'),
+    'derive': ('column', 'expression', 'type'),
+    'recompute': ('column', 'expression')
+}
+
+class TransformationEngine:
+    """Class for applying a transformation spec to a table in one rewrite."""
+
+    def __init__(self, pools: PoolManager):
+        """
+        Initialize the TransformationEngine.
+
+        Args:
+            pools (PoolManager): Shared connection pools.
+        """
+        self.pools = pools
+
+    async def apply(
+        self,
+        db_name: str,
+        table_name: str,
+        transformations: List[Dict[str, Any]],
+        profile: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Apply a transformation spec to a table.
+
+        Args:
+            db_name (str): Name of the database.
+            table_name (str): Name of the table to transform.
+            transformations (List[Dict[str, Any]]): Steps of the spec.
+            profile (Optional[Dict[str, Any]]): Profile of the loaded file. Its
+                mean and std replace the aggregates of caps on columns that no
+                earlier step changed.
+
+        Returns:
+            bool: Whether the transformations were applied; on failure the
+                table is left as it was.
+        """
+        if not transformations:
+            return True
+        try:
+            async with self.pools.acquire(db_name) as conn:
+                async with conn.transaction():
+                    columns = await self._column_types(conn, table_name)
+                    renames, select, caps = self.build_select(list(columns), transformations)
+                    for old, new in renames:
+                        await conn.execute(f'ALTER TABLE "{table_name}" RENAME COLUMN "{old}" TO "{new}"')
+                    await self._resolve_caps(conn, table_name, caps, select, (profile or {}).get('full_profile', {}))
+                    await self._rewrite(conn, table_name, select, columns)
+            logger.info(f"Applied {len(transformations)} transformations to table {table_name} in one pass.")
+            return True
+        except (asyncpg.PostgresError, ValueError) as e:
+            logger.error(f"Error applying transformations: {e}")
+            return False
+
+    def build_select(
+        self,
+        columns: List[str],
+        transformations: List[Dict[str, Any]]
+    ) -> Tuple[List[Tuple[str, str]], Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Compose the steps of a spec into one expression per output column.
+
+        Renames are done up front on the table itself, so expressions refer
+        to the source columns by their final names. Caps whose bounds come
+        from aggregates leave placeholders in the expressions.
+
+        Args:
+            columns (List[str]): Columns of the table, in order.
+            transformations (List[Dict[str, Any]]): Steps of the spec.
+
+        Returns:
+            Tuple[List[Tuple[str, str]], Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+                Renames to apply as (old, new) pairs; per output column, its
+                expression, whether it changed and its type if derived; and
+                the caps needing aggregates.
+
+        Raises:
+            ValueError: If a step is malformed, refers to a missing column or
+                renames a column to the name of another.
+        """
+        # Where each source column ends up after all renames; derived
+        # columns (None) are only named in the select list
+        final_names = {column: column for column in columns}
+        current: Dict[str, Optional[str]] = {column: column for column in columns}
+        renames = []
+        for step in transformations:
+            self._check_step(step)
+            if step['op'] == 'derive':
+                current[step['column']] = None
+            elif step['op'] == 'rename':
+                if step['column'] not in current:
+                    raise ValueError(f"Cannot rename missing column {step['column']}")
+                if step['to'] in current and step['to'] != step['column']:
+                    # Swapping two columns needs a rename through a free name
+                    raise ValueError(f"Cannot rename {step['column']} to existing column {step['to']}")
+                source = current.pop(step['column'])
+                current[step['to']] = source
+                if source is not None:
+                    final_names[source] = step['to']
+                    renames.append((step['column'], step['to']))
+
+        select = {
+            final_names[column]: {'expression': f'"{final_names[column]}"', 'changed': False, 'type': None, 'source': column}
+            for column in columns
+        }
+        # Maps the names used by the steps, which change with renames, to output columns
+        names = {column: final_names[column] for column in columns}
+        caps = []
+        for step in transformations:
+            op, column = step['op'], step['column']
+            if op == 'rename':
+                output = names.pop(column)
+                if select[output]['source'] is None:
+                    select = {step['to'] if key == output else key: entry for key, entry in select.items()}
+                    output = step['to']
+                names[step['to']] = output
+                continue
+            if op == 'derive':
+                expression = self._format(step['expression'], names, select)
+                names[column] = column
+                select[column] = {'expression': expression, 'changed': True, 'type': step['type'], 'source': None}
+                continue
+
+            if column not in names:
+                raise ValueError(f"Cannot {op} missing column {column}")
+            entry = select[names[column]]
+            current_expression = entry['expression']
+            if op == 'scale':
+                if step.get('divisor') is not None:
+                    expression = f"{current_expression} / {self._literal(step['divisor'])}"
+                else:
+                    expression = f"{current_expression} * {self._literal(step.get('factor', 1))}"
+            elif op == 'cap':
+                lower, upper = step.get('lower'), step.get('upper')
+                if step.get('stddevs') is not None:
+                    marker = f"__cap{len(caps)}"
+                    caps.append({
+                        'marker': marker,
+                        'expression': current_expression,
+                        'stddevs': step['stddevs'],
+                        # Profile statistics hold only while the column is untouched
+                        'source': entry['source'] if not entry['changed'] else None
+                    })
+                    lower, upper = f"{marker}_lower__", f"{marker}_upper__"
+                else:
+                    lower = 'NULL' if lower is None else self._literal(lower)
+                    upper = 'NULL' if upper is None else self._literal(upper)
+                expression = (
+                    f"CASE WHEN {current_expression} > {upper} THEN {upper} "
+                    f"WHEN {current_expression} < {lower} THEN {lower} "
+                    f"ELSE {current_expression} END"
+                )
+            else:
+                computed = self._format(step['expression'], names, select)
+                if step.get('tolerance') is None:
+                    expression = computed
+                else:
+                    expression = (
+                        f"CASE WHEN ABS({current_expression} - ({computed})) > {self._literal(step['tolerance'])} "
+                        f"THEN {computed} ELSE {current_expression} END"
+                    )
+            entry['expression'] = f"({expression})"
+            entry['changed'] = True
+        return renames, select, caps
+
+    @staticmethod
+    def _check_step(step: Dict[str, Any]):
+        """Raise a ValueError if a step has an unknown op or lacks a key."""
+        required = _REQUIRED_KEYS.get(step.get('op'))
+        if required is None:
+            raise ValueError(f"Unknown transformation: {step.get('op')}")
+        missing = [key for key in required if key not in step]
+        if missing:
+            raise ValueError(f"Transformation {step['op']} is missing {', '.join(missing)}")
+        if step['op'] == 'cap' and step.get('stddevs') is None and step.get('lower') is None and step.get('upper') is None:
+            raise ValueError(f"Cap of {step['column']} needs stddevs, lower or upper")
+
+    @staticmethod
+    def _format(template: str, names: Dict[str, str], select: Dict[str, Dict[str, Any]]) -> str:
+        """Substitute the current expression of every {column} in a template."""
+        try:
+            return template.format_map({name: select[output]['expression'] for name, output in names.items()})
+        except KeyError as e:
+            raise ValueError(f"Expression {template!r} refers to missing column {e}")
+
+    @staticmethod
+    def _literal(value: Any) -> str:
+        """Render a number as a SQL literal."""
+        if value is None:
+            return 'NULL'
+        if isinstance(value, float):
+            if math.isnan(value) or math.isinf(value):
+                return f"'{value}'::double precision"
+            return repr(value)
+        return str(value)
+
+    async def _column_types(self, conn: asyncpg.Connection, table_name: str) -> Dict[str, str]:
+        """
+        Read the columns of a table with their SQL types, in order.
+
+        Args:
+            conn (asyncpg.Connection): Open database connection.
+            table_name (str): Name of the table.
+
+        Returns:
+            Dict[str, str]: SQL type by column name.
+        """
+        rows = await conn.fetch(
+            """
+            SELECT attname, format_type(atttypid, atttypmod) AS sql_type
+            FROM pg_attribute
+            WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum
+            """,
+            f'"{table_name}"'
+        )
+        return {row['attname']: row['sql_type'] for row in rows}
+
+    async def _resolve_caps(
+        self,
+        conn: asyncpg.Connection,
+        table_name: str,
+        caps: List[Dict[str, Any]],
+        select: Dict[str, Dict[str, Any]],
+        full_profile: Dict[str, Any]
+    ):
+        """
+        Compute the bounds of all caps and put them into the expressions.
+
+        Bounds come from the profile where possible. All others are computed
+        in one aggregate query, except for caps that depend on the bounds of
+        earlier caps (e.g. a column capped twice), which need another.
+
+        Args:
+            conn (asyncpg.Connection): Open database connection.
+            table_name (str): Name of the table.
+            caps (List[Dict[str, Any]]): Caps from build_select.
+            select (Dict[str, Dict[str, Any]]): Expressions to fill in.
+            full_profile (Dict[str, Any]): Finalized profile by column.
+        """
+        bounds = {}
+        pending = []
+        for cap in caps:
+            stats = full_profile.get(cap['source'], {}) if cap['source'] else {}
+            if stats.get('numeric') and not math.isnan(stats.get('std', float('nan'))):
+                spread = cap['stddevs'] * stats['std']
+                bounds[cap['marker']] = (
+                    self._literal(float(stats['mean'] - spread)), self._literal(float(stats['mean'] + spread))
+                )
+            else:
+                pending.append(cap)
+
+        while pending:
+            ready = [cap for cap in pending if '__cap' not in self._fill(cap['expression'], bounds)]
+            if not ready:
+                raise ValueError("Cap bounds depend on each other")
+            aggregates = []
+            for cap in ready:
+                expression = self._fill(cap['expression'], bounds)
+                aggregates.append(f"AVG({expression}) - {cap['stddevs']} * STDDEV({expression})")
+                aggregates.append(f"AVG({expression}) + {cap['stddevs']} * STDDEV({expression})")
+            row = await conn.fetchrow(f'SELECT {", ".join(aggregates)} FROM "{table_name}"')
+            for index, cap in enumerate(ready):
+                bounds[cap['marker']] = (self._literal(row[2 * index]), self._literal(row[2 * index + 1]))
+            pending = [cap for cap in pending if cap not in ready]
+
+        for entry in select.values():
+            entry['expression'] = self._fill(entry['expression'], bounds)
+
+    @staticmethod
+    def _fill(expression: str, bounds: Dict[str, Tuple[str, str]]) -> str:
+        """Replace the placeholders of computed cap bounds in an expression."""
+        for marker, (lower, upper) in bounds.items():
+            expression = expression.replace(f"{marker}_lower__", lower).replace(f"{marker}_upper__", upper)
+        return expression
+
+    async def _rewrite(
+        self,
+        conn: asyncpg.Connection,
+        table_name: str,
+        select: Dict[str, Dict[str, Any]],
+        column_types: Dict[str, str]
+    ):
+        """
+        Rewrite a table from its select list and swap the result in.
+
+        Must run inside a transaction. Changed columns keep their type, as
+        they would with UPDATE; derived columns get their declared type.
+
+        Args:
+            conn (asyncpg.Connection): Connection with an open transaction.
+            table_name (str): Name of the table.
+            select (Dict[str, Dict[str, Any]]): Expression by output column.
+            column_types (Dict[str, str]): Types of the source columns by
+                their names before any renames.
+        """
+        rewrite = f"{table_name}__rewrite"
+        select_list = []
+        for column, entry in select.items():
+            if not entry['changed']:
+                select_list.append(f'"{column}"')
+            else:
+                sql_type = entry['type'] or column_types[entry['source']]
+                select_list.append(f'CAST({entry["expression"]} AS {sql_type}) AS "{column}"')
+
+        relation = f'"{table_name}"'
+        defaults = await conn.fetch(
+            """
+            SELECT a.attname, pg_get_expr(d.adbin, d.adrelid) AS expression
+            FROM pg_attrdef d JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum
+            WHERE d.adrelid = $1::regclass
+            """,
+            relation
+        )
+        not_null = await conn.fetch(
+            "SELECT attname FROM pg_attribute WHERE attrelid = $1::regclass AND attnum > 0 AND attnotnull AND NOT attisdropped",
+            relation
+        )
+        indexes = await conn.fetch(
+            """
+            SELECT i.indisprimary, pg_get_indexdef(i.indexrelid) AS definition, c.conname,
+                   ARRAY(SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY k(attnum, n)
+                         JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                         ORDER BY k.n) AS columns
+            FROM pg_index i LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.contype = 'p'
+            WHERE i.indrelid = $1::regclass
+            """,
+            relation
+        )
+        sequences = {}
+        for column in (column for column, entry in select.items() if entry['source'] is not None):
+            sequence = await conn.fetchval("SELECT pg_get_serial_sequence($1, $2)", relation, column)
+            if sequence:
+                sequences[column] = sequence
+
+        await conn.execute(f'DROP TABLE IF EXISTS "{rewrite}"')
+        await conn.execute(f'CREATE TABLE "{rewrite}" AS SELECT {", ".join(select_list)} FROM "{table_name}"')
+        for sequence in sequences.values():
+            await conn.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+        await conn.execute(f'DROP TABLE "{table_name}"')
+        await conn.execute(f'ALTER TABLE "{rewrite}" RENAME TO "{table_name}"')
+
+        for row in defaults:
+            await conn.execute(f'ALTER TABLE "{table_name}" ALTER COLUMN "{row["attname"]}" SET DEFAULT {row["expression"]}')
+        for row in not_null:
+            await conn.execute(f'ALTER TABLE "{table_name}" ALTER COLUMN "{row["attname"]}" SET NOT NULL')
+        for row in indexes:
+            if row['indisprimary']:
+                columns = ", ".join(f'"{column}"' for column in row['columns'])
+                await conn.execute(f'ALTER TABLE "{table_name}" ADD CONSTRAINT "{row["conname"]}" PRIMARY KEY ({columns})')
+            else:
+                await conn.execute(row['definition'])
+        for column, sequence in sequences.items():
+            await conn.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table_name}"."{column}"')
+        await conn.execute(f'ANALYZE "{table_name}"')
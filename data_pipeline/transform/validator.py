@@ -0,0 +1,202 @@
+"""
+Module for declarative data validation in a single table scan.
+
+Rules are declared per table as a list of dicts:
+
+- range: {'rule': 'range', 'column': c, 'min': a, 'max': b} fails values
+  outside [a, b]; NULLs fail too unless 'allow_null' is true (the default)
+- not_null: {'rule': 'not_null', 'column': c}
+- ratio: {'rule': 'ratio', 'column': c, 'numerator': n, 'denominator': d,
+  'tolerance': t} fails values further than t from n / d
+- unique: {'rule': 'unique', 'column': c} or {..., 'columns': [c1, c2]}
+  counts the rows that repeat an earlier non-NULL value
+
+Each rule may have a 'name'. All rules compile into one aggregate query of
+COUNT(*) FILTER (WHERE ...) terms, so N rules cost one scan instead of N.
+With a sample percentage the query reads a TABLESAMPLE instead, for fast
+approximate checks on very large tables; duplicates are then only found
+when both rows fall in the sample.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from data_pipeline.ingest.pool import PoolManager
+
+logger = logging.getLogger(__name__)
+
+# Validation rules of the MLB bat tracking dataset, after its transformations
+MLB_BAT_TRACKING_RULES = [
+    {'rule': 'range', 'column': 'percent_swings_competitive', 'max': 1},
+    {'rule': 'range', 'column': 'contact_rate', 'min': 0, 'max': 1, 'allow_null': False},
+    {
+        'rule': 'ratio',
+        'column': 'whiff_per_swing',
+        'numerator': 'whiffs',
+        'denominator': 'swings_competitive',
+        'tolerance': 0.0001
+    }
+]
+
+SAMPLE_METHODS = ('SYSTEM', 'BERNOULLI')
+
+def _quote(identifier: str) -> str:
+    """Quote a table or column name, doubling the quotes inside it."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+class TableValidator:
+    """Class for checking declared rules against a table in one query."""
+
+    def __init__(
+        self,
+        pools: PoolManager,
+        rules: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        sample_method: str = 'SYSTEM'
+    ):
+        """
+        Initialize the TableValidator.
+
+        Args:
+            pools (PoolManager): Shared connection pools.
+            rules (Optional[Dict[str, List[Dict[str, Any]]]]): Rules by table name.
+            sample_method (str): TABLESAMPLE method; SYSTEM samples whole
+                pages and is fastest, BERNOULLI samples rows and is more even.
+        """
+        if sample_method not in SAMPLE_METHODS:
+            raise ValueError(f"Invalid sample method: {sample_method}")
+        self.pools = pools
+        self.rules = rules or {}
+        self.sample_method = sample_method
+
+    async def validate(
+        self,
+        db_name: str,
+        table_name: str,
+        rules: Optional[List[Dict[str, Any]]] = None,
+        sample_percent: Optional[float] = None,
+        sample_min_rows: int = 0,
+        seed: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Check the rules of a table.
+
+        Args:
+            db_name (str): Name of the database.
+            table_name (str): Name of the table to validate.
+            rules (Optional[List[Dict[str, Any]]]): Rules to check; the rules
+                declared for the table when not given.
+            sample_percent (Optional[float]): Percentage of the table to
+                sample; the whole table is scanned when not set.
+            sample_min_rows (int): Only sample tables with at least this many
+                rows, by the planner's estimate.
+            seed (Optional[int]): Seed that makes the sample repeatable.
+
+        Returns:
+            Optional[Dict[str, Any]]: Result with the table, the rows checked,
+                the sample percentage (None for a full scan), whether every
+                rule passed, and per rule its name, failure count and
+                outcome; None if the query failed.
+        """
+        rules = self.rules.get(table_name, []) if rules is None else rules
+        try:
+            terms = [self.compile_rule(rule) for rule in rules]
+            async with self.pools.acquire(db_name) as conn:
+                if sample_percent is not None and sample_min_rows:
+                    estimate = await conn.fetchval("SELECT reltuples FROM pg_class WHERE oid = $1::regclass", _quote(table_name))
+                    if estimate < sample_min_rows:
+                        sample_percent = None
+                row = await conn.fetchrow(self.build_query(table_name, terms, sample_percent, seed))
+        except (asyncpg.PostgresError, ValueError) as e:
+            logger.error(f"Error during data validation: {e}")
+            return None
+
+        results = []
+        for index, (rule, (name, _)) in enumerate(zip(rules, terms)):
+            failures = row[f'rule_{index}']
+            results.append({'name': name, 'rule': rule['rule'], 'failures': failures, 'passed': failures == 0})
+        return {
+            'table': table_name,
+            'rows_checked': row['rows_checked'],
+            'sample_percent': sample_percent,
+            'passed': all(result['passed'] for result in results),
+            'rules': results
+        }
+
+    def build_query(
+        self,
+        table_name: str,
+        terms: List[Tuple[str, str]],
+        sample_percent: Optional[float] = None,
+        seed: Optional[int] = None
+    ) -> str:
+        """
+        Build the single aggregate query that checks all rules.
+
+        Args:
+            table_name (str): Name of the table.
+            terms (List[Tuple[str, str]]): Rule names and aggregate terms from
+                compile_rule.
+            sample_percent (Optional[float]): Percentage to sample, if any.
+            seed (Optional[int]): Seed of the sample.
+
+        Returns:
+            str: SQL query with a rows_checked column and one rule_<i>
+                column per term.
+        """
+        columns = ["COUNT(*) AS rows_checked"] + [f"{term} AS rule_{index}" for index, (_, term) in enumerate(terms)]
+        query = f'SELECT {", ".join(columns)} FROM {_quote(table_name)}'
+        if sample_percent is not None:
+            query += f" TABLESAMPLE {self.sample_method} ({float(sample_percent)!r})"
+            if seed is not None:
+                query += f" REPEATABLE ({int(seed)})"
+        return query
+
+    @staticmethod
+    def compile_rule(rule: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Compile a rule into an aggregate term counting its failures.
+
+        Args:
+            rule (Dict[str, Any]): Rule declaration.
+
+        Returns:
+            Tuple[str, str]: Name of the rule and its aggregate term.
+
+        Raises:
+            ValueError: If the rule is unknown or incomplete.
+        """
+        kind = rule.get('rule')
+        columns = rule.get('columns') or ([rule['column']] if 'column' in rule else [])
+        if not columns:
+            raise ValueError(f"Validation rule {kind} needs a column")
+        column = _quote(columns[0])
+        name = rule.get('name') or f"{kind}:{','.join(columns)}"
+
+        if kind == 'range':
+            if rule.get('min') is None and rule.get('max') is None:
+                raise ValueError(f"Range rule {name} needs min or max")
+            conditions = []
+            if rule.get('min') is not None:
+                conditions.append(f"{column} < {rule['min']!r}")
+            if rule.get('max') is not None:
+                conditions.append(f"{column} > {rule['max']!r}")
+            if not rule.get('allow_null', True):
+                conditions.append(f"{column} IS NULL")
+            return name, f"COUNT(*) FILTER (WHERE {' OR '.join(conditions)})"
+        if kind == 'not_null':
+            return name, f"COUNT(*) FILTER (WHERE {column} IS NULL)"
+        if kind == 'ratio':
+            missing = [key for key in ('numerator', 'denominator') if key not in rule]
+            if missing:
+                raise ValueError(f"Ratio rule {name} is missing {', '.join(missing)}")
+            expected = f"CAST({_quote(rule['numerator'])} AS FLOAT) / NULLIF({_quote(rule['denominator'])}, 0)"
+            return name, f"COUNT(*) FILTER (WHERE ABS({column} - {expected}) > {rule.get('tolerance', 0)!r})"
+        if kind == 'unique':
+            if len(columns) == 1:
+                return name, f"COUNT({column}) - COUNT(DISTINCT {column})"
+            row = ", ".join(_quote(c) for c in columns)
+            not_null = " AND ".join(f'{_quote(c)} IS NOT NULL' for c in columns)
+            return name, f"COUNT(*) FILTER (WHERE {not_null}) - COUNT(DISTINCT ({row})) FILTER (WHERE {not_null})"
+        raise ValueError(f"Unknown validation rule: {kind}")
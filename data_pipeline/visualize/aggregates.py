@@ -0,0 +1,151 @@
+"""
+Module for accumulating what the charts of a table need, chunk by chunk.
+
+Charts are drawn from these aggregates instead of the cleaned DataFrame, so
+the visualize stage needs the same small amount of memory whatever the
+number of rows:
+
+- correlation heatmap: pairwise co-moments of the numeric columns
+- box plots and histograms: a quantile sketch, min and max per numeric column
+- bar charts: the most frequent values and their counts per column
+
+Aggregates of different chunks merge, so chunks can be aggregated in
+worker processes like they are profiled.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from data_pipeline.profiling.sketches import CoMoments, KLLSketch, SpaceSaving
+
+# Numeric columns beyond this many are left out of the correlation matrix,
+# whose cost grows with the square of the columns and which is unreadable
+# well before then
+_MAX_CORRELATION_COLUMNS = 50
+
+class ChartAggregates:
+    """Bounded-memory summary of a table for drawing its charts."""
+
+    def __init__(self, top_k: int = 128, quantile_k: int = 400):
+        """
+        Initialize empty aggregates.
+
+        Args:
+            top_k (int): Counters kept per column for the most frequent values.
+            quantile_k (int): Size of the quantile sketches; histogram and
+                box plot error is about 1.7 / quantile_k of the rows.
+        """
+        self.top_k = top_k
+        self.quantile_k = quantile_k
+        self.row_count = 0
+        self.columns: Dict[str, Dict[str, Any]] = {}
+        self.comoments = CoMoments()
+
+    def update(self, chunk: pd.DataFrame):
+        """
+        Add a cleaned chunk.
+
+        Args:
+            chunk (pd.DataFrame): Cleaned chunk of the table.
+        """
+        self.merge(aggregate_chunk(chunk, self.top_k, self.quantile_k))
+
+    def merge(self, other: "ChartAggregates") -> "ChartAggregates":
+        """
+        Merge the aggregates of other rows into these.
+
+        A column that is numeric in one part but text in the other is kept
+        as text.
+
+        Args:
+            other (ChartAggregates): Aggregates to merge.
+
+        Returns:
+            ChartAggregates: These aggregates, updated in place.
+        """
+        self.row_count += other.row_count
+        for column, theirs in other.columns.items():
+            ours = self.columns.get(column)
+            if ours is None:
+                self.columns[column] = theirs
+                continue
+            ours['non_null'] += theirs['non_null']
+            ours['top_values'].merge(theirs['top_values'])
+            if ours['numeric'] and theirs['numeric']:
+                ours['integral'] = ours['integral'] and theirs['integral']
+                ours['quantiles'].merge(theirs['quantiles'])
+                ours['min'] = _combine(min, ours['min'], theirs['min'])
+                ours['max'] = _combine(max, ours['max'], theirs['max'])
+            elif ours['numeric']:
+                self.columns[column] = {**ours, **_text_stats(ours), 'numeric': False}
+        self.comoments.merge(other.comoments)
+        return self
+
+    def numeric_columns(self) -> List[str]:
+        """Columns that held only numbers."""
+        return [column for column, stats in self.columns.items() if stats['numeric']]
+
+    def correlation(self, columns: List[str]) -> pd.DataFrame:
+        """
+        Correlation matrix of numeric columns.
+
+        Args:
+            columns (List[str]): Columns to correlate.
+
+        Returns:
+            pd.DataFrame: Correlation matrix of the columns that were tracked.
+        """
+        matrix = self.comoments.correlation()
+        kept = [column for column in columns if column in matrix.columns]
+        return matrix.loc[kept, kept]
+
+def aggregate_chunk(chunk: pd.DataFrame, top_k: int = 128, quantile_k: int = 400) -> ChartAggregates:
+    """
+    Build the aggregates of a single chunk.
+
+    A plain function, so it can run in a worker process and the result be
+    merged back into the running aggregates.
+
+    Args:
+        chunk (pd.DataFrame): Cleaned chunk of the table.
+        top_k (int): Counters kept per column for the most frequent values.
+        quantile_k (int): Size of the quantile sketches.
+
+    Returns:
+        ChartAggregates: Aggregates of the chunk.
+    """
+    aggregates = ChartAggregates(top_k, quantile_k)
+    aggregates.row_count = len(chunk)
+    numeric_columns = []
+    for column in chunk.columns:
+        series = chunk[column]
+        numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        # Missing text is written as '' by the cleaner
+        values = series.dropna() if numeric else series[series.notna() & (series != '')]
+        stats = {'numeric': numeric, 'non_null': len(values), 'top_values': SpaceSaving(top_k)}
+        stats['top_values'].update(values)
+        if numeric:
+            numeric_columns.append(column)
+            quantiles = KLLSketch(quantile_k)
+            quantiles.update(values)
+            stats.update({
+                'integral': bool((values % 1 == 0).all()),
+                'quantiles': quantiles,
+                'min': float(values.min()) if len(values) else None,
+                'max': float(values.max()) if len(values) else None
+            })
+        aggregates.columns[column] = stats
+    aggregates.comoments = CoMoments(numeric_columns[:_MAX_CORRELATION_COLUMNS])
+    aggregates.comoments.update(chunk)
+    return aggregates
+
+def _text_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Numeric entries of a column's stats cleared, for a column that turned out to be text."""
+    return {key: None for key in ('integral', 'quantiles', 'min', 'max') if key in stats}
+
+def _combine(func, left: Optional[float], right: Optional[float]) -> Optional[float]:
+    """Combine two optional extremes."""
+    if left is None or right is None:
+        return right if left is None else left
+    return func(left, right)
@@ -0,0 +1,259 @@
+"""
+Module for planning and rendering charts.
+
+Charts are planned in two steps. First the profile decides which columns
+are worth a chart. Identifier-like columns, which are unique per row, and
+constant columns are skipped. Text columns with many categories are
+bucketed into their most frequent values plus 'Other', and integer columns
+with few values get a bar chart instead of a histogram. Then the
+ChartAggregates of the table are turned into a small payload for each
+chart (a correlation matrix, histogram bins, value counts, box plot
+statistics); the rows themselves are never needed.
+
+Only these payloads are sent to the rendering processes. There every chart
+is drawn on its own matplotlib Figure with the Agg canvas, independent of
+pyplot's global state, and returned as PNG bytes.
+"""
+
+import io
+import logging
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+import matplotlib
+
+# Rendering happens in worker processes without a display
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from data_pipeline.visualize.aggregates import ChartAggregates
+
+logger = logging.getLogger(__name__)
+
+# Fewest and most bins of a histogram
+_MIN_BINS = 10
+_MAX_BINS = 50
+
+# Correlation matrices larger than this are drawn without numbers
+_MAX_ANNOTATED_COLUMNS = 15
+
+def plan_charts(
+    aggregates: ChartAggregates,
+    table_name: str,
+    full_profile: Optional[Dict[str, Any]] = None,
+    max_charts: int = 20,
+    max_categories: int = 20,
+    max_unique_ratio: float = 0.5
+) -> List[Dict[str, Any]]:
+    """
+    Decide which charts to draw for a table and compute their payloads.
+
+    Charts come in order of priority: the correlation heatmap, the box
+    plots, then one chart per column. Only the first max_charts are kept.
+
+    Args:
+        aggregates (ChartAggregates): Aggregates of the cleaned table.
+        table_name (str): Name of the table.
+        full_profile (Optional[Dict[str, Any]]): Profile of the table by
+            column, for the number of distinct values; estimated from the
+            most frequent values when not given.
+        max_charts (int): Most charts drawn for the table.
+        max_categories (int): Most bars in a bar chart; further categories
+            are bucketed into 'Other'.
+        max_unique_ratio (float): Share of distinct values above which a
+            text or integer column counts as an identifier and is skipped.
+
+    Returns:
+        List[Dict[str, Any]]: Chart specs with the kind, title, file name
+            and the data to draw.
+    """
+    full_profile = full_profile or {}
+    numeric_columns = []
+    column_charts = []
+    for column, stats in aggregates.columns.items():
+        unique_count = full_profile.get(column, {}).get('unique_count')
+        if unique_count is None:
+            unique_count = _estimate_unique_count(stats)
+        if stats['non_null'] == 0 or unique_count <= 1:
+            logger.debug(f"Skipping charts of {column} in {table_name}: no information")
+            continue
+        integral = not stats['numeric'] or stats['integral']
+        if integral and unique_count > max_categories and unique_count > max_unique_ratio * stats['non_null']:
+            logger.debug(f"Skipping charts of {column} in {table_name}: identifier-like ({unique_count} distinct values)")
+            continue
+
+        if stats['numeric']:
+            numeric_columns.append(column)
+        if stats['numeric'] and unique_count > max_categories:
+            column_charts.append(_histogram_chart(stats, column, table_name))
+        else:
+            column_charts.append(_bar_chart(stats, column, table_name, max_categories))
+
+    charts = []
+    if len(numeric_columns) > 1:
+        charts.append(_heatmap_chart(aggregates.correlation(numeric_columns), table_name))
+    if numeric_columns:
+        charts.append(_box_chart(aggregates, numeric_columns, table_name))
+    charts.extend(column_charts)
+    if len(charts) > max_charts:
+        logger.info(f"Drawing {max_charts} of {len(charts)} charts for {table_name}")
+    return charts[:max_charts]
+
+def _estimate_unique_count(stats: Dict[str, Any]) -> int:
+    """Distinct values of a column, known exactly while its value counters are not all taken."""
+    top_values = stats['top_values']
+    if len(top_values.counts) < top_values.capacity:
+        return len(top_values.counts)
+    # Counters all taken by values seen about once each: as good as unique
+    if top_values.top(1)[0][1] <= 1:
+        return stats['non_null']
+    return top_values.capacity
+
+def _heatmap_chart(matrix: pd.DataFrame, table_name: str) -> Dict[str, Any]:
+    """Correlation heatmap of the numeric columns."""
+    return {
+        'kind': 'heatmap',
+        'title': f"Correlation Heatmap for {table_name}",
+        'filename': f"{table_name}_correlation_heatmap.png",
+        'figsize': (10, 8),
+        'data': matrix
+    }
+
+def _box_chart(aggregates: ChartAggregates, columns: List[str], table_name: str) -> Dict[str, Any]:
+    """
+    Box plots of the numeric columns from their quantile sketches.
+
+    Whiskers reach the extremes or stop at 1.5 IQR from the box, like
+    matplotlib's; beyond them only the extremes are drawn as outliers.
+    """
+    stats = []
+    for column in columns:
+        column_stats = aggregates.columns[column]
+        q1, median, q3 = column_stats['quantiles'].quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        low, high = column_stats['min'], column_stats['max']
+        whislo, whishi = max(low, q1 - 1.5 * iqr), min(high, q3 + 1.5 * iqr)
+        stats.append({
+            'label': column,
+            'q1': q1,
+            'med': median,
+            'q3': q3,
+            'whislo': whislo,
+            'whishi': whishi,
+            'fliers': [value for value in (low, high) if value < whislo or value > whishi]
+        })
+    return {
+        'kind': 'box',
+        'title': f"Box Plots for Numeric Columns in {table_name}",
+        'filename': f"{table_name}_box_plots.png",
+        'figsize': (12, 6),
+        'data': stats
+    }
+
+def _histogram_chart(stats: Dict[str, Any], column: str, table_name: str) -> Dict[str, Any]:
+    """
+    Histogram of a numeric column from its quantile sketch.
+
+    Bins follow the Freedman-Diaconis rule within [_MIN_BINS, _MAX_BINS],
+    rounded to whole numbers for integer columns; their counts come from
+    the sketch's distribution function.
+    """
+    sketch = stats['quantiles']
+    low, high = stats['min'], stats['max']
+    q1, q3 = sketch.quantiles([0.25, 0.75])
+    bins = _MIN_BINS
+    if q3 > q1:
+        width = 2 * (q3 - q1) / sketch.count ** (1 / 3)
+        bins = min(max(math.ceil((high - low) / width), _MIN_BINS), _MAX_BINS)
+    if stats['integral']:
+        # Whole-number bins centered on the values, so none gets an extra value
+        width = max(math.ceil((high - low + 1) / bins), 1)
+        edges = low - 0.5 + width * np.arange(math.ceil((high - low + 1) / width) + 1)
+    else:
+        edges = np.linspace(low, high, bins + 1)
+    shares = np.asarray(sketch.cdf(edges))
+    shares[0] = 0.0
+    shares[-1] = 1.0
+    counts = np.rint(np.diff(shares) * sketch.count).astype(np.int64)
+    return {
+        'kind': 'histogram',
+        'title': f"Distribution of {column} in {table_name}",
+        'filename': f"{table_name}_{column}_histogram.png",
+        'figsize': (8, 6),
+        'column': column,
+        'data': {'counts': counts, 'edges': edges}
+    }
+
+def _bar_chart(stats: Dict[str, Any], column: str, table_name: str, max_categories: int) -> Dict[str, Any]:
+    """Bar chart of the most frequent values, the rest bucketed into 'Other'."""
+    top_values = stats['top_values'].top(max_categories)
+    if stats['numeric'] and len(stats['top_values'].counts) <= max_categories:
+        # Few distinct numbers read best in their own order
+        top_values = sorted(top_values)
+    labels = [str(int(value)) if stats['numeric'] and stats['integral'] else str(value) for value, _ in top_values]
+    counts = [count for _, count in top_values]
+    other = stats['non_null'] - sum(counts)
+    if other > 0:
+        labels.append('Other')
+        counts.append(other)
+    return {
+        'kind': 'bar',
+        'title': f"Distribution of {column} in {table_name}",
+        'filename': f"{table_name}_{column}_bar_plot.png",
+        'figsize': (10, 6),
+        'column': column,
+        'data': {'labels': labels, 'counts': counts}
+    }
+
+def render_chart(chart: Dict[str, Any]) -> bytes:
+    """
+    Draw a planned chart.
+
+    Args:
+        chart (Dict[str, Any]): Chart spec from plan_charts.
+
+    Returns:
+        bytes: The chart as a PNG image.
+    """
+    figure = Figure(figsize=chart['figsize'])
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    _DRAWERS[chart['kind']](ax, chart)
+    ax.set_title(chart['title'])
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+def _draw_heatmap(ax: Axes, chart: Dict[str, Any]):
+    matrix = chart['data']
+    sns.heatmap(matrix, annot=len(matrix) <= _MAX_ANNOTATED_COLUMNS, cmap="coolwarm", ax=ax)
+
+def _draw_box(ax: Axes, chart: Dict[str, Any]):
+    ax.bxp(chart['data'])
+    ax.tick_params(axis='x', labelrotation=45)
+
+def _draw_histogram(ax: Axes, chart: Dict[str, Any]):
+    ax.stairs(chart['data']['counts'], chart['data']['edges'], fill=True)
+    ax.set_xlabel(chart['column'])
+    ax.set_ylabel('Count')
+
+def _draw_bar(ax: Axes, chart: Dict[str, Any]):
+    positions = np.arange(len(chart['data']['labels']))
+    ax.bar(positions, chart['data']['counts'])
+    ax.set_xticks(positions, chart['data']['labels'], rotation=45, ha='right')
+    ax.set_xlabel(chart['column'])
+    ax.set_ylabel('Count')
+
+_DRAWERS: Dict[str, Callable[[Axes, Dict[str, Any]], None]] = {
+    'heatmap': _draw_heatmap,
+    'box': _draw_box,
+    'histogram': _draw_histogram,
+    'bar': _draw_bar
+}
@@ -1,94 +1,122 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
+import asyncio
 import os
 import logging
+from typing import Any, Dict, List, Optional
+
 import aiofiles
+import pandas as pd
+
+from data_pipeline.executor import run_stage
+from data_pipeline.visualize.aggregates import ChartAggregates, aggregate_chunk
+from data_pipeline.visualize.renderer import plan_charts, render_chart
 
 logger = logging.getLogger(__name__)
 
 class Visualizer:
-    def __init__(self, output_dir='visualizations'):
+    def __init__(
+        self,
+        output_dir='visualizations',
+        executor=None,
+        max_charts: int = 20,
+        max_seconds: float = 120.0,
+        max_categories: int = 20,
+        max_unique_ratio: float = 0.5
+    ):
+        """
+        Initialize the Visualizer.
+
+        Args:
+            output_dir: Directory the PNG files are written to.
+            executor: Data is aggregated in the executor's 'aggregate' pool
+                and charts are drawn in its 'visualize' pool when one is given.
+            max_charts (int): Most charts drawn per table.
+            max_seconds (float): Time after which the charts of a table that
+                are not drawn yet are given up.
+            max_categories (int): Most bars per bar chart before the rest
+                are bucketed.
+            max_unique_ratio (float): Share of distinct values above which a
+                column counts as an identifier and gets no chart.
+        """
         self.output_dir = output_dir
+        self.executor = executor
+        self.max_charts = max_charts
+        self.max_seconds = max_seconds
+        self.max_categories = max_categories
+        self.max_unique_ratio = max_unique_ratio
         os.makedirs(output_dir, exist_ok=True)
 
-    async def create_visualizations(self, df: pd.DataFrame, table_name: str) -> str:
+    async def aggregate(self, df: pd.DataFrame) -> ChartAggregates:
+        """
+        Aggregate a whole cleaned DataFrame for drawing its charts.
+
+        Args:
+            df (pd.DataFrame): Cleaned data of the table.
+
+        Returns:
+            ChartAggregates: Aggregates of the table.
+        """
+        return await run_stage(self.executor, 'aggregate', aggregate_chunk, df)
+
+    async def create_visualizations(
+        self,
+        aggregates: ChartAggregates,
+        table_name: str,
+        full_profile: Optional[Dict[str, Any]] = None
+    ) -> Optional[List[str]]:
+        """
+        Draw the charts of a table and write them as PNG files.
+
+        Args:
+            aggregates (ChartAggregates): Aggregates of the cleaned table,
+                from the streaming ingest or aggregate().
+            table_name (str): Name of the table.
+            full_profile (Optional[Dict[str, Any]]): Profile of the table,
+                used to pick the columns worth a chart.
+
+        Returns:
+            Optional[List[str]]: Paths of the files written, or None if no
+                chart could be drawn.
+        """
         try:
-            numeric_df = df.select_dtypes(include=['int64', 'float64'])
-            if numeric_df.empty:
-                logger.warning(f"No numeric columns found in {table_name}. Skipping visualizations.")
+            charts = plan_charts(
+                aggregates, table_name, full_profile,
+                max_charts=self.max_charts,
+                max_categories=self.max_categories,
+                max_unique_ratio=self.max_unique_ratio
+            )
+            if not charts:
+                logger.warning(f"No columns worth a chart found in {table_name}. Skipping visualizations.")
                 return None
 
-            # Create a correlation heatmap for numeric columns
-            plt.figure(figsize=(10, 8))
-            sns.heatmap(numeric_df.corr(), annot=True, cmap="coolwarm")
-            plt.title(f"Correlation Heatmap for {table_name}")
-            plt.tight_layout()
-            
-            # Save the plot asynchronously
-            filename = os.path.join(self.output_dir, f"{table_name}_correlation_heatmap.png")
-            plt.savefig(filename)
-            plt.close()
-
-            logger.info(f"Visualization created for {table_name}")
-            return filename
+            tasks = [asyncio.ensure_future(self._draw(chart)) for chart in charts]
+            done, pending = await asyncio.wait(tasks, timeout=self.max_seconds)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"Gave up {len(pending)} charts of {table_name} after {self.max_seconds}s")
+
+            filenames = [task.result() for task in tasks if task in done and task.exception() is None]
+            for task in done:
+                if task.exception() is not None:
+                    logger.error(f"Error drawing a chart for {table_name}: {task.exception()}")
+            logger.info(f"Created {len(filenames)} visualizations for {table_name}")
+            return filenames or None
         except Exception as e:
             logger.error(f"Error creating visualization for {table_name}: {str(e)}")
             return None
 
-    def _create_summary_stats(self, df: pd.DataFrame, table_name: str):
-        numeric_df = df.select_dtypes(include=['int64', 'float64'])
-        if not numeric_df.empty:
-            plt.figure(figsize=(10, 6))
-            sns.heatmap(numeric_df.describe().transpose(), annot=True, cmap="YlGnBu")
-            plt.title(f"Summary Statistics for {table_name}")
-            plt.tight_layout()
-            plt.savefig(os.path.join(self.output_dir, f"{table_name}_summary_stats.png"))
-            plt.close()
-
-    def _create_correlation_heatmap(self, df: pd.DataFrame, table_name: str):
-        numeric_df = df.select_dtypes(include=['int64', 'float64'])
-        if not numeric_df.empty:
-            plt.figure(figsize=(10, 8))
-            sns.heatmap(numeric_df.corr(), annot=True, cmap="coolwarm")
-            plt.title(f"Correlation Heatmap for {table_name}")
-            plt.tight_layout()
-            plt.savefig(os.path.join(self.output_dir, f"{table_name}_correlation_heatmap.png"))
-            plt.close()
-
-    def _create_histograms(self, df: pd.DataFrame, table_name: str):
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
-        for col in numeric_cols:
-            plt.figure(figsize=(8, 6))
-            sns.histplot(df[col], kde=True)
-            plt.title(f"Distribution of {col} in {table_name}")
-            plt.tight_layout()
-            plt.savefig(os.path.join(self.output_dir, f"{table_name}_{col}_histogram.png"))
-            plt.close()
-
-    def _create_box_plots(self, df: pd.DataFrame, table_name: str):
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
-        if not numeric_cols.empty:
-            plt.figure(figsize=(12, 6))
-            df[numeric_cols].boxplot()
-            plt.title(f"Box Plots for Numeric Columns in {table_name}")
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.savefig(os.path.join(self.output_dir, f"{table_name}_box_plots.png"))
-            plt.close()
-
-    def _create_bar_plots(self, df: pd.DataFrame, table_name: str):
-        categorical_cols = df.select_dtypes(include=['object']).columns
-        for col in categorical_cols:
-            plt.figure(figsize=(10, 6))
-            value_counts = df[col].value_counts()
-            if len(value_counts) > 20:  # If too many categories, only plot top 20
-                value_counts = value_counts.nlargest(20)
-            value_counts.plot(kind='bar')
-            plt.title(f"Distribution of {col} in {table_name}")
-            plt.xlabel(col)
-            plt.ylabel('Count')
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.savefig(os.path.join(self.output_dir, f"{table_name}_{col}_bar_plot.png"))
-            plt.close()
\ No newline at end of file
+    async def _draw(self, chart: Dict[str, Any]) -> str:
+        """
+        Render a chart and write its PNG file.
+
+        Args:
+            chart (Dict[str, Any]): Chart spec from plan_charts.
+
+        Returns:
+            str: Path of the file written.
+        """
+        png = await run_stage(self.executor, 'visualize', render_chart, chart)
+        filename = os.path.join(self.output_dir, chart['filename'])
+        async with aiofiles.open(filename, 'wb') as f:
+            await f.write(png)
+        return filename
@@ -1,9 +1,12 @@
+import asyncio
+import atexit
 import os
-import psycopg2
-from psycopg2 import sql
-from psycopg2.extras import execute_batch
+import re
+import threading
 from dotenv import load_dotenv
 
+from data_pipeline.ingest.pool import PoolManager
+
 # Load environment variables
 load_dotenv()
 
@@ -16,22 +19,69 @@ db_params = {
     'port': os.getenv('DB_PORT', '5432')
 }
 
+# Connection pool, shared with the rest of the package through PoolManager.
+# asyncpg pools belong to the event loop that created them, so queries from
+# synchronous callers run on a loop of their own in a background thread.
+pool_min_size = int(os.getenv('DB_POOL_MIN', '1'))
+pool_max_size = int(os.getenv('DB_POOL_MAX', '10'))
+statement_cache_size = int(os.getenv('DB_STATEMENT_CACHE', '100'))
+_pools = None
+_loop = None
+_pool_lock = threading.Lock()
+
+# psycopg2-style placeholders, translated to asyncpg's numbered ones
+_PLACEHOLDER = re.compile(r'%%|%s')
+
+def get_pool():
+    global _pools, _loop
+    if _pools is None:
+        with _pool_lock:
+            if _pools is None:
+                _loop = asyncio.new_event_loop()
+                threading.Thread(target=_loop.run_forever, name='db_utils', daemon=True).start()
+                _pools = PoolManager(
+                    {key: value for key, value in db_params.items() if key != 'dbname'},
+                    min_size=pool_min_size,
+                    max_size=pool_max_size,
+                    statement_cache_size=statement_cache_size
+                )
+    return _pools
+
+def close_pool():
+    global _pools, _loop
+    with _pool_lock:
+        if _pools is not None:
+            asyncio.run_coroutine_threadsafe(_pools.close(), _loop).result()
+            _loop.call_soon_threadsafe(_loop.stop)
+            _pools = None
+            _loop = None
+
+atexit.register(close_pool)
+
+def _numbered_placeholders(query):
+    counter = iter(range(1, query.count('%s') + 1))
+    return _PLACEHOLDER.sub(lambda match: '%' if match.group() == '%%' else f'${next(counter)}', query)
+
+async def _execute(pools, query, params):
+    async with pools.acquire(db_params['dbname']) as conn:
+        async with conn.transaction():
+            if params and isinstance(params[0], tuple):
+                await conn.executemany(_numbered_placeholders(query), params)
+                return None
+            if not params and ';' in query.strip().rstrip(';'):
+                # Several statements cannot be prepared; like psycopg2, return no rows for them
+                await conn.execute(query)
+                return None
+            statement = await conn.prepare(_numbered_placeholders(query) if params else query)
+            records = await statement.fetch(*(params or ()))
+            # Like psycopg2, statements without a result set return None
+            if not statement.get_attributes():
+                return None
+    return [tuple(record) for record in records]
+
 def execute_sql(query, params=None):
-    conn = psycopg2.connect(**db_params)
-    try:
-        with conn.cursor() as cur:
-            if params:
-                if isinstance(params[0], tuple):
-                    execute_batch(cur, query, params)
-                else:
-                    cur.execute(query, params)
-            else:
-                cur.execute(query)
-            conn.commit()
-            if cur.description:
-                return cur.fetchall()
-    finally:
-        conn.close()
+    pools = get_pool()
+    return asyncio.run_coroutine_threadsafe(_execute(pools, query, params), _loop).result()
 
 def get_db_info():
     return {
@@ -39,4 +89,4 @@ def get_db_info():
         'user': db_params['user'],
         'host': db_params['host'],
         'port': db_params['port']
-    }
\ No newline at end of file
+    }
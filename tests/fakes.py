@@ -0,0 +1,70 @@
+"""
+Test doubles for the LLM client.
+
+FakeLLMClient stands in for AsyncAnthropic with configurable delays and
+injected errors, so the dispatcher can be exercised without network access.
+"""
+
+import asyncio
+import random
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+class FakeAPIError(Exception):
+    """Error raised by FakeLLMClient, shaped like an API status error."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"fake API error {status_code}")
+        self.status_code = status_code
+        headers = {} if retry_after is None else {"retry-after": str(retry_after)}
+        self.response = SimpleNamespace(headers=headers)
+
+class FakeLLMClient:
+    """Local stand-in for AsyncAnthropic that injects delays and errors."""
+
+    def __init__(
+        self,
+        delay: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 429,
+        errors: Optional[List[Exception]] = None,
+        reply: str = "OK",
+        seed: int = 0
+    ):
+        """
+        Initialize the FakeLLMClient.
+
+        Args:
+            delay (float): Seconds each call takes.
+            error_rate (float): Probability that a call fails.
+            error_status (int): Status of the randomly injected errors.
+            errors (Optional[List[Exception]]): Errors raised by the first
+                calls, in order, before the random ones apply.
+            reply (str): Text of every reply.
+            seed (int): Seed of the injected errors.
+        """
+        self.delay = delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.errors = list(errors or [])
+        self.reply = reply
+        self.calls = 0
+        self.messages = self
+        self._random = random.Random(seed)
+
+    async def create(self, **request: Any) -> Any:
+        """Mimic messages.create: wait, maybe fail, then reply with usage."""
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        if self._random.random() < self.error_rate:
+            raise FakeAPIError(self.error_status)
+        prompt = str(request.get("system", "")) + "".join(
+            str(message.get("content", "")) for message in request.get("messages", [])
+        )
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=self.reply)],
+            usage=SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=len(self.reply) // 4)
+        )
@@ -0,0 +1,92 @@
+"""
+Tests for the chunked aggregates the charts are drawn from.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_pipeline.visualize.aggregates import ChartAggregates, aggregate_chunk
+from data_pipeline.visualize.renderer import plan_charts
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(0)
+    rows = 3000
+    return pd.DataFrame({
+        'id': np.arange(rows),
+        'score': rng.normal(50, 10, rows).round(2),
+        'level': rng.integers(1, 6, rows),
+        'team': rng.choice(['red', 'blue', 'green', ''], rows),
+        'amount': np.where(rng.random(rows) < 0.05, np.nan, rng.lognormal(3, 1, rows)),
+    })
+
+def chunked(frame, size, **kwargs):
+    aggregates = ChartAggregates(**kwargs)
+    for start in range(0, len(frame), size):
+        aggregates.update(frame.iloc[start:start + size])
+    return aggregates
+
+def assert_same_payloads(left, right):
+    assert left.keys() == right.keys()
+    for key, value in left.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(value, right[key], rtol=1e-9)
+        elif isinstance(value, dict):
+            assert_same_payloads(value, right[key])
+        elif isinstance(value, np.ndarray):
+            np.testing.assert_allclose(value, right[key], rtol=1e-9)
+        else:
+            assert value == pytest.approx(right[key], rel=1e-9), key
+
+def test_merged_chunks_equal_the_whole_table(table):
+    # Sketches large enough to keep every value, so nothing is approximated
+    whole = aggregate_chunk(table, top_k=4000, quantile_k=4000)
+    merged = chunked(table, 700, top_k=4000, quantile_k=4000)
+
+    assert merged.row_count == whole.row_count == len(table)
+    assert merged.numeric_columns() == whole.numeric_columns() == ['id', 'score', 'level', 'amount']
+    for column, stats in whole.columns.items():
+        theirs = merged.columns[column]
+        assert (theirs['non_null'], theirs['numeric']) == (stats['non_null'], stats['numeric'])
+        assert dict(theirs['top_values'].top()) == dict(stats['top_values'].top())
+        if stats['numeric']:
+            assert (theirs['min'], theirs['max'], theirs['integral']) == (stats['min'], stats['max'], stats['integral'])
+            assert theirs['quantiles'].quantiles([0.1, 0.5, 0.9]) == stats['quantiles'].quantiles([0.1, 0.5, 0.9])
+    # Missing text does not count
+    assert whole.columns['team']['non_null'] == (table['team'] != '').sum()
+
+    whole_charts = plan_charts(whole, 'table')
+    merged_charts = plan_charts(merged, 'table')
+    assert [chart['filename'] for chart in merged_charts] == [
+        'table_correlation_heatmap.png', 'table_box_plots.png', 'table_score_histogram.png',
+        'table_level_bar_plot.png', 'table_team_bar_plot.png', 'table_amount_histogram.png'
+    ]
+    for ours, theirs in zip(whole_charts, merged_charts):
+        if ours['kind'] == 'box':
+            for left, right in zip(ours['data'], theirs['data']):
+                assert_same_payloads(left, right)
+        else:
+            assert_same_payloads(ours, theirs)
+
+def test_default_sketches_stay_close_to_the_whole_table(table):
+    merged = chunked(table, 700)
+    values = table['amount'].dropna()
+
+    quantiles = merged.columns['amount']['quantiles'].quantiles([0.25, 0.5, 0.75])
+    ranks = [(values <= estimate).mean() for estimate in quantiles]
+    assert ranks == pytest.approx([0.25, 0.5, 0.75], abs=0.02)
+    pd.testing.assert_frame_equal(
+        merged.correlation(['score', 'amount']), table[['score', 'amount']].corr(), atol=1e-9
+    )
+
+def test_column_numeric_in_one_chunk_and_text_in_another_is_text():
+    first = aggregate_chunk(pd.DataFrame({'code': [1, 2, 2]}))
+    second = aggregate_chunk(pd.DataFrame({'code': ['2', 'X']}))
+
+    merged = first.merge(second)
+
+    stats = merged.columns['code']
+    assert not stats['numeric'] and stats['quantiles'] is None and stats['min'] is None
+    assert stats['non_null'] == 5
+    assert merged.numeric_columns() == []
@@ -0,0 +1,97 @@
+"""
+Tests for the on-disk cache of LLM responses.
+"""
+
+import asyncio
+
+import pytest
+
+from data_pipeline.analyze import cache as cache_module
+from data_pipeline.analyze.analyzer import LLMAnalyzer
+from data_pipeline.analyze.cache import ResponseCache
+from tests.fakes import FakeLLMClient
+
+class Clock:
+    """Settable replacement for time.time."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'time', clock)
+    return clock
+
+def make_cache(tmp_path, **kwargs) -> ResponseCache:
+    return ResponseCache(str(tmp_path / 'cache' / 'responses.sqlite'), **kwargs)
+
+def test_miss_then_hit(tmp_path):
+    cache = make_cache(tmp_path)
+    key = ResponseCache.make_key('model', 'system', 'user', 100)
+
+    assert asyncio.run(cache.get(key)) is None
+    asyncio.run(cache.set(key, 'réponse'))
+    assert asyncio.run(cache.get(key)) == 'réponse'
+    # Entries survive reopening the cache
+    assert asyncio.run(make_cache(tmp_path).get(key)) == 'réponse'
+
+def test_key_depends_on_every_input():
+    keys = {
+        ResponseCache.make_key('model', 'system', 'user', 100),
+        ResponseCache.make_key('other', 'system', 'user', 100),
+        ResponseCache.make_key('model', 'other', 'user', 100),
+        ResponseCache.make_key('model', 'system', 'other', 100),
+        ResponseCache.make_key('model', 'system', 'user', 200),
+        ResponseCache.make_key('model', 'system user', '', 100),
+    }
+
+    assert len(keys) == 6
+    assert ResponseCache.make_key('model', 'system', 'user', 100) in keys
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    asyncio.run(cache.set('key', 'response'))
+
+    clock.now += 59
+    assert asyncio.run(cache.get('key')) == 'response'
+    clock.now += 2
+    assert asyncio.run(cache.get('key')) is None
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    for key in ('a', 'b'):
+        asyncio.run(cache.set(key, key))
+        clock.now += 1
+    asyncio.run(cache.get('a'))
+    clock.now += 1
+
+    asyncio.run(cache.set('c', 'c'))
+
+    assert [asyncio.run(cache.get(key)) for key in ('a', 'b', 'c')] == ['a', None, 'c']
+
+def test_entries_are_evicted_beyond_the_byte_limit(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=25)
+    for key in ('a', 'b', 'c'):
+        asyncio.run(cache.set(key, key * 10))
+        clock.now += 1
+
+    assert [asyncio.run(cache.get(key)) for key in ('a', 'b', 'c')] == [None, 'b' * 10, 'c' * 10]
+
+def test_analyzer_answers_repeated_requests_from_the_cache(tmp_path):
+    client = FakeLLMClient(reply="Looks clean.")
+    analyzer = LLMAnalyzer(api_key='unused', client=client, cache=make_cache(tmp_path))
+    structure = {'columns': ['id'], 'full_profile': {}}
+
+    first = asyncio.run(analyzer.analyze_structure(structure))
+    second = asyncio.run(analyzer.analyze_structure(structure))
+
+    assert first[0] == second[0] == "Looks clean."
+    assert client.calls == 1
+
+    bypassing = LLMAnalyzer(api_key='unused', client=client, cache=analyzer.cache, bypass_cache=True)
+    asyncio.run(bypassing.analyze_structure(structure))
+    assert client.calls == 2
@@ -0,0 +1,43 @@
+"""
+Tests for the compact types of cleaned data.
+"""
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+from data_pipeline.cleaning import cleaner as cleaner_module
+from data_pipeline.cleaning.cleaner import DataCleaner
+from data_pipeline.profiling.profiler import DataProfiler
+
+@pytest.fixture
+def people(tmp_path):
+    path = tmp_path / 'people.csv'
+    pd.DataFrame({
+        'id': range(1000),
+        'score': [i / 4 for i in range(1000)],
+        'state': ['NC', 'SC', 'VA', 'GA'] * 250,
+        'name': [f"person {i}" for i in range(1000)],
+    }).to_csv(path, index=False)
+    df = pd.read_csv(path)
+    return df, asyncio.run(DataProfiler().profile_csv(str(path)))
+
+@pytest.mark.parametrize('arrow', [True, False])
+def test_compact_types_keep_the_values(people, monkeypatch, arrow):
+    if arrow:
+        pytest.importorskip('pyarrow')
+    else:
+        monkeypatch.setattr(cleaner_module, 'pyarrow', None)
+    df, profile = people
+
+    full = asyncio.run(DataCleaner(compact=False).clean_data(df, profile))
+    compact = asyncio.run(DataCleaner().clean_data(df, profile))
+
+    assert compact['id'].dtype == 'int16'
+    assert compact['score'].dtype == 'float32'
+    assert isinstance(compact['state'].dtype, pd.CategoricalDtype)
+    assert compact['name'].dtype == pd.StringDtype('pyarrow' if arrow else 'python')
+    pd.testing.assert_frame_equal(compact.astype(object), full.astype(object))
+    # The input frame is left as it was
+    assert df['name'].dtype == object
@@ -0,0 +1,90 @@
+"""
+Tests for the Arrow cache of parsed datasets.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from data_pipeline.cleaning.cleaner import DataCleaner
+from data_pipeline.ingest import cache as cache_module
+from data_pipeline.ingest.cache import DatasetCache
+
+pytest.importorskip('pyarrow')
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('id,name\n1,a\n2,b\n')
+    return path
+
+def frame() -> pd.DataFrame:
+    return pd.DataFrame({'id': [1, 2], 'name': ['a', 'b'], 'value': [0.5, None]})
+
+def test_miss_then_hit(tmp_path, source):
+    cache = DatasetCache(tmp_path / 'cache')
+
+    assert cache.read(source, 'parsed') is None
+    assert cache.write(source, 'parsed', frame())
+    pd.testing.assert_frame_equal(cache.read(source, 'parsed'), frame())
+    pd.testing.assert_frame_equal(cache.read(source, 'parsed', columns=['name']), frame()[['name']])
+    # Kinds are cached apart
+    assert cache.read(source, 'cleaned') is None
+
+def test_changed_source_misses_and_replaces_the_stale_entry(tmp_path, source):
+    cache = DatasetCache(tmp_path / 'cache')
+    cache.write(source, 'parsed', frame())
+
+    source.write_text('id,name\n1,a\n2,b\n3,c\n')
+
+    assert cache.read(source, 'parsed') is None
+    cache.write(source, 'parsed', frame().head(1))
+    assert len(list((tmp_path / 'cache').iterdir())) == 1
+
+def test_unreadable_entry_is_discarded(tmp_path, source):
+    cache = DatasetCache(tmp_path / 'cache')
+    cache.write(source, 'parsed', frame())
+    entry, = (tmp_path / 'cache').iterdir()
+    entry.write_bytes(b'not arrow')
+
+    assert cache.read(source, 'parsed') is None
+    assert not entry.exists()
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    sources = []
+    for name in ('a', 'b', 'c'):
+        path = tmp_path / f'{name}.csv'
+        path.write_text('x\n1\n')
+        sources.append(path)
+    cache = DatasetCache(tmp_path / 'cache')
+    for when, path in enumerate(sources[:2]):
+        cache.write(path, 'parsed', frame())
+        entry, = (tmp_path / 'cache').glob(f'{cache._source_key(path)}-*')
+        os.utime(entry, (when, when))
+    cache.max_bytes = sum(entry.stat().st_size for entry in (tmp_path / 'cache').iterdir())
+
+    cache.write(sources[2], 'parsed', frame())
+
+    assert cache.read(sources[0], 'parsed') is None
+    assert cache.read(sources[1], 'parsed') is not None
+    assert cache.read(sources[2], 'parsed') is not None
+
+def test_without_pyarrow_nothing_is_cached(tmp_path, source, monkeypatch):
+    monkeypatch.setattr(cache_module, 'pa', None)
+    cache = DatasetCache(tmp_path / 'cache')
+
+    assert not cache.write(source, 'parsed', frame())
+    assert cache.read(source, 'parsed') is None
+
+def test_settings_are_cached_apart(tmp_path, source):
+    cache = DatasetCache(tmp_path / 'cache')
+    compact = DataCleaner(compact=True).cache_key
+    loose = DataCleaner(compact=False).cache_key
+    cache.write(source, 'cleaned', frame(), variant=compact)
+
+    assert DataCleaner(category_max_ratio=0.1).cache_key != compact
+    assert cache.read(source, 'cleaned', variant=loose) is None
+    pd.testing.assert_frame_equal(cache.read(source, 'cleaned', variant=compact), frame())
+    cache.write(source, 'cleaned', frame().head(1), variant=loose)
+    assert cache.read(source, 'cleaned', variant=compact) is None
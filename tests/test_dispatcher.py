@@ -0,0 +1,127 @@
+"""
+Tests for the rate-limited, retrying LLM dispatcher.
+"""
+
+import asyncio
+
+import pytest
+
+from data_pipeline.analyze.dispatcher import LLMDispatcher, TokenBucket
+from tests.fakes import FakeAPIError, FakeLLMClient
+
+REQUEST = {"model": "test", "max_tokens": 100, "messages": [{"role": "user", "content": "hello"}]}
+
+class FakeClock:
+    """Clock that only moves when something sleeps on it."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def dispatcher(client, clock, **kwargs) -> LLMDispatcher:
+    kwargs.setdefault("requests_per_minute", None)
+    kwargs.setdefault("tokens_per_minute", None)
+    return LLMDispatcher(client, sleep=clock.sleep, seed=0, **kwargs)
+
+def test_retries_transient_errors_until_success():
+    clock = FakeClock()
+    client = FakeLLMClient(errors=[FakeAPIError(429), FakeAPIError(529), ConnectionError()])
+    llm = dispatcher(client, clock, base_delay=1.0, max_delay=8.0)
+
+    response = asyncio.run(llm.create(label="analysis", **REQUEST))
+
+    assert response.content[0].text == "OK"
+    assert client.calls == 4
+    assert len(clock.sleeps) == 3
+    assert all(0 <= delay <= min(8.0, 2 ** attempt) for attempt, delay in enumerate(clock.sleeps))
+    summary = llm.summary()
+    assert summary["requests"] == 1
+    assert summary["retries"] == 3
+    assert summary["failures"] == 0
+
+def test_retry_waits_at_least_retry_after():
+    clock = FakeClock()
+    client = FakeLLMClient(errors=[FakeAPIError(429, retry_after=7)])
+    llm = dispatcher(client, clock, base_delay=0.01)
+
+    asyncio.run(llm.create(**REQUEST))
+
+    assert clock.sleeps == [7.0]
+
+def test_does_not_retry_client_errors():
+    clock = FakeClock()
+    client = FakeLLMClient(errors=[FakeAPIError(400)])
+    llm = dispatcher(client, clock)
+
+    with pytest.raises(FakeAPIError):
+        asyncio.run(llm.create(**REQUEST))
+
+    assert client.calls == 1
+    assert clock.sleeps == []
+    assert llm.summary()["failures"] == 1
+
+def test_gives_up_after_max_retries():
+    clock = FakeClock()
+    client = FakeLLMClient(error_rate=1.0, error_status=503)
+    llm = dispatcher(client, clock, max_retries=2)
+
+    with pytest.raises(FakeAPIError):
+        asyncio.run(llm.create(**REQUEST))
+
+    assert client.calls == 3
+    assert llm.metrics[-1]["attempts"] == 3
+    assert llm.metrics[-1]["status"] == "error"
+
+def test_request_rate_limit_spaces_out_requests():
+    clock = FakeClock()
+    client = FakeLLMClient()
+    llm = dispatcher(client, clock, requests_per_minute=60)
+    llm.request_bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+
+    async def send(count: int):
+        for _ in range(count):
+            await llm.create(**REQUEST)
+
+    asyncio.run(send(5))
+
+    # Two requests fit the bucket; the other three wait a second each
+    assert client.calls == 5
+    assert clock.now == pytest.approx(3.0)
+
+def test_token_bucket_refunds_unused_tokens():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock=clock, sleep=clock.sleep)
+
+    async def take():
+        await bucket.acquire(500)
+        bucket.refund(400)
+        await bucket.acquire(450)
+
+    asyncio.run(take())
+
+    assert clock.sleeps == []
+    assert bucket.tokens == pytest.approx(50)
+
+def test_metrics_history_is_bounded_but_totals_are_not():
+    clock = FakeClock()
+    client = FakeLLMClient(reply="a longer reply")
+    llm = dispatcher(client, clock, history=3)
+
+    async def send(count: int):
+        for _ in range(count):
+            await llm.create(**REQUEST)
+
+    asyncio.run(send(10))
+
+    assert len(llm.metrics) == 3
+    summary = llm.summary()
+    assert summary["requests"] == 10
+    assert summary["output_tokens"] == 10 * (len("a longer reply") // 4)
+    assert summary["latency_p50"] is not None
@@ -0,0 +1,82 @@
+"""
+Tests for extracting and splitting the SQL an LLM suggests.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from data_pipeline.transform.dry_run import SQLDryRunner, extract_statements, split_statements
+
+def test_semicolons_in_strings_and_identifiers_do_not_split():
+    sql = "UPDATE t SET note = 'a; b', \"odd;name\" = 'it''s; fine'; DELETE FROM t"
+
+    assert split_statements(sql) == [
+        "UPDATE t SET note = 'a; b', \"odd;name\" = 'it''s; fine'",
+        "DELETE FROM t"
+    ]
+
+def test_semicolons_in_dollar_quoted_bodies_do_not_split():
+    sql = (
+        "CREATE FUNCTION f() RETURNS int AS $$ BEGIN RETURN 1; END; $$ LANGUAGE plpgsql;\n"
+        "DO $body$ BEGIN PERFORM 1; END $body$;"
+    )
+
+    assert split_statements(sql) == [
+        "CREATE FUNCTION f() RETURNS int AS $$ BEGIN RETURN 1; END; $$ LANGUAGE plpgsql",
+        "DO $body$ BEGIN PERFORM 1; END $body$"
+    ]
+
+def test_comments_are_removed_and_comment_only_fragments_dropped():
+    sql = (
+        "-- Normalize the scores; they are percentages\n"
+        "UPDATE t SET score = score / 100; /* done; */\n"
+        "-- nothing else;\n"
+        ";\n"
+        "/* unterminated; comment"
+    )
+
+    assert split_statements(sql) == ["UPDATE t SET score = score / 100"]
+
+def test_only_fenced_blocks_are_read():
+    reply = (
+        "First, drop the rows; they are empty. DELETE FROM t WHERE x IS NULL;\n"
+        "```sql\nDELETE FROM t WHERE x IS NULL;\n```\n"
+        "Then, optionally:\n"
+        "```\nALTER TABLE t ADD COLUMN y int;\n```\n"
+        "```python\nprint('not sql; at all')\n```"
+    )
+
+    assert extract_statements(reply) == ["DELETE FROM t WHERE x IS NULL", "ALTER TABLE t ADD COLUMN y int"]
+    assert extract_statements("No SQL needed; the data is clean.") == []
+    assert extract_statements(None) == []
+
+class Connection:
+    def __init__(self):
+        self.executed = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, statement):
+        self.executed.append(statement)
+
+class Pools:
+    def __init__(self):
+        self.conn = Connection()
+
+    @asynccontextmanager
+    async def acquire(self, db_name):
+        yield self.conn
+
+def test_transaction_control_is_excluded():
+    statements = extract_statements("```sql\nBEGIN;\nUPDATE t SET x = 1;\ncommit;\nEND;\n```")
+    results = [SQLDryRunner._new_result(statement) for statement in statements]
+
+    assert [result['status'] for result in results] == ['skipped', 'pending', 'skipped', 'skipped']
+
+    results[1]['status'] = 'accepted'
+    pools = Pools()
+    report = {'accepted': True, 'statements': results}
+    assert asyncio.run(SQLDryRunner(pools).apply('db', 't', report))
+    assert pools.conn.executed[1:] == ["UPDATE t SET x = 1"]
@@ -0,0 +1,74 @@
+"""
+Tests for running stages inline, in threads or in processes.
+"""
+
+import asyncio
+import os
+import pickle
+import threading
+
+import pytest
+
+from data_pipeline.executor import StageExecutor, run_stage
+
+def where(items=None):
+    """Process and thread a function runs in, recording the call in items."""
+    if items is not None:
+        items.append('called')
+    return os.getpid(), threading.get_ident()
+
+@pytest.fixture
+def executor():
+    executor = StageExecutor({'inline_stage': 'inline', 'thread_stage': 'thread', 'process_stage': 'process'},
+                             process_workers=1)
+    yield executor
+    executor.shutdown()
+
+def test_inline_stage_runs_in_the_calling_thread(executor):
+    items = []
+
+    async def run():
+        return await executor.run('inline_stage', where, items), threading.get_ident()
+
+    (pid, thread), caller = asyncio.run(run())
+
+    assert (pid, thread) == (os.getpid(), caller)
+    # Inline functions see the caller's objects, not copies
+    assert items == ['called']
+    assert executor.pool_for('inline_stage') is None
+    assert executor.pool_for('unknown_stage') is None
+
+def test_thread_stage_runs_in_a_pool_thread(executor):
+    pid, thread = asyncio.run(executor.run('thread_stage', where))
+
+    assert pid == os.getpid()
+    assert thread != threading.get_ident()
+
+def test_process_stage_runs_in_another_process(executor):
+    items = []
+
+    pid, _ = asyncio.run(executor.run('process_stage', where, items))
+
+    assert pid != os.getpid()
+    # The worker changed its own copy of the arguments
+    assert items == []
+
+def test_run_stage_without_an_executor_runs_inline():
+    assert asyncio.run(run_stage(None, 'profile', where)) == (os.getpid(), threading.get_ident())
+
+def test_invalid_pool_kind_is_refused():
+    with pytest.raises(ValueError):
+        StageExecutor({'parse': 'gpu'})
+
+@pytest.mark.parametrize('stage', ['inline_stage', 'thread_stage', 'process_stage'])
+def test_iterate_yields_every_item(executor, stage):
+    async def collect():
+        return [item async for item in executor.iterate(stage, iter(range(5)))]
+
+    assert asyncio.run(collect()) == [0, 1, 2, 3, 4]
+
+def test_pickled_executor_runs_every_stage_inline(executor):
+    copy = pickle.loads(pickle.dumps(executor))
+
+    assert set(copy.stage_pools.values()) == {'inline'}
+    assert copy.pool_for('process_stage') is None
@@ -0,0 +1,18 @@
+"""
+Tests for the imports each command makes.
+"""
+
+from data_pipeline.cli import COMMANDS, measure_imports, unneeded_libraries
+
+def test_commands_load_only_the_libraries_of_their_stages():
+    timings = measure_imports(list(COMMANDS), repeat=1)
+
+    assert {command: unneeded_libraries(command, libraries) for command, (_, libraries) in timings.items()} == {
+        command: [] for command in COMMANDS
+    }
+    assert timings['profile'][1] == []
+
+def test_unneeded_libraries():
+    assert unneeded_libraries('profile', ['asyncpg']) == ['asyncpg']
+    assert unneeded_libraries('analyze', ['anthropic', 'matplotlib']) == ['matplotlib']
+    assert unneeded_libraries('run', ['anthropic', 'asyncpg', 'matplotlib', 'seaborn']) == []
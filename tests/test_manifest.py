@@ -0,0 +1,167 @@
+"""
+Tests for deciding how a source file is ingested.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+
+from data_pipeline.ingest.manifest import IngestManifest
+from data_pipeline.ingest.reader import CSVChunkReader
+from data_pipeline.profiling.profiler import DataProfiler, profile_state_to_dict
+
+ROWS = ''.join(f'{i},name {i}\n' for i in range(100))
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class Connection:
+    def __init__(self, entry):
+        self.entry = entry
+        self.executed = []
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+
+    async def fetchrow(self, query, *args):
+        return self.entry
+
+    async def fetchval(self, query, *args):
+        return True
+
+class Pools:
+    def __init__(self, entry=None):
+        self.conn = Connection(entry)
+
+    @asynccontextmanager
+    async def acquire(self, db_name):
+        yield self.conn
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('id,name\n' + ROWS)
+    return path
+
+def loaded_entry(path, profile_state=True):
+    """Manifest entry of a file as it is now, fully loaded."""
+    data = path.read_bytes()
+    stat = path.stat()
+    profile = DataProfiler().profile_chunk(next(iter(CSVChunkReader(path))))
+    return {
+        'file_name': path.name,
+        'table_name': 'data',
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'content_hash': sha256(data),
+        'loaded_bytes': len(data),
+        'row_count': 100,
+        'column_types': json.dumps({'id': 'SMALLINT', 'name': 'VARCHAR(8)'}),
+        'profile_state': json.dumps(profile_state_to_dict(profile)) if profile_state else None
+    }
+
+def rewrite(path, data: bytes):
+    """Change a file's contents and move its modification time on."""
+    mtime = path.stat().st_mtime_ns
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+
+@pytest.mark.parametrize('block_size', [7, 64, 1 << 20])
+def test_hash_of_a_grown_file_keeps_its_prefix(source, block_size):
+    original = source.read_bytes()
+    source.write_bytes(original + b'100,name 100\n')
+    manifest = IngestManifest(Pools(), block_size=block_size)
+
+    content_hash, prefix_hash, ends_row = manifest._hash_file(source, source.stat().st_size, len(original))
+
+    assert content_hash == sha256(source.read_bytes())
+    assert prefix_hash == sha256(original)
+    assert ends_row
+
+@pytest.mark.parametrize('block_size', [7, 1 << 20])
+def test_hash_of_a_file_changed_midway_differs_in_the_prefix(source, block_size):
+    original = source.read_bytes()
+    changed = original.replace(b'name 50\n', b'name 5X\n') + b'100,name 100\n'
+    source.write_bytes(changed)
+    manifest = IngestManifest(Pools(), block_size=block_size)
+
+    _, prefix_hash, ends_row = manifest._hash_file(source, len(changed), len(original))
+
+    assert prefix_hash != sha256(original)
+    assert ends_row
+
+def test_hash_of_a_prefix_without_trailing_newline(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'id\n1\n2')
+    manifest = IngestManifest(Pools(), block_size=2)
+
+    assert manifest._hash_file(path, 6, 6) == (sha256(b'id\n1\n2'), sha256(b'id\n1\n2'), False)
+    assert manifest._hash_file(path, 6, 5)[1:] == (sha256(b'id\n1\n'), True)
+    # A prefix past the end of the file has no hash
+    assert manifest._hash_file(path, 6, 20)[1] is None
+    assert manifest._hash_file(path, 6, 0)[1:] == (sha256(b''), False)
+
+def plan(source, entry):
+    manifest = IngestManifest(Pools(entry))
+    result = asyncio.run(manifest.plan('db', source, 'data'))
+    return result, manifest.pools.conn
+
+def test_new_file_is_loaded(source):
+    result, _ = plan(source, None)
+
+    assert result['action'] == 'load'
+    assert result['content_hash'] == sha256(source.read_bytes())
+
+def test_unchanged_file_is_skipped_without_reading_it(source, monkeypatch):
+    entry = loaded_entry(source)
+    monkeypatch.setattr(IngestManifest, '_hash_file', None)
+
+    result, _ = plan(source, entry)
+
+    assert result['action'] == 'skip'
+    assert set(result['profile_state']) == {'id', 'name'}
+
+def test_touched_file_is_skipped_and_its_mtime_recorded(source):
+    entry = loaded_entry(source)
+    rewrite(source, source.read_bytes())
+
+    result, conn = plan(source, entry)
+
+    assert result['action'] == 'skip'
+    assert conn.executed[-1][1] == ('data.csv', source.stat().st_mtime_ns)
+
+def test_grown_file_is_appended_from_the_loaded_end(source):
+    entry = loaded_entry(source)
+    rewrite(source, source.read_bytes() + b'100,name 100\n101,name 101\n')
+
+    result, _ = plan(source, entry)
+
+    assert result['action'] == 'append'
+    assert result['start'] == entry['loaded_bytes']
+    assert result['row_count'] == 100
+    assert result['column_types'] == {'id': 'SMALLINT', 'name': 'VARCHAR(8)'}
+    assert set(result['profile_state']) == {'id', 'name'}
+
+@pytest.mark.parametrize('change', ['midway', 'unfinished row', 'shrunk', 'no profile'])
+def test_other_changes_replace_the_table(tmp_path, source, change):
+    if change == 'unfinished row':
+        # The last loaded row was still being written: its end is not a row boundary
+        source.write_bytes(source.read_bytes()[:-1])
+    entry = loaded_entry(source, profile_state=change != 'no profile')
+    data = source.read_bytes()
+    if change == 'midway':
+        data = data.replace(b'name 50\n', b'name 5X\n') + b'100,name 100\n'
+    elif change == 'shrunk':
+        data = data[:len(data) // 2]
+    else:
+        data += b'\n100,name 100\n'
+    rewrite(source, data)
+
+    result, _ = plan(source, entry)
+
+    assert result['action'] == 'replace'
+    assert result['content_hash'] == sha256(data)
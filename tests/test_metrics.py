@@ -0,0 +1,82 @@
+"""
+Tests for stage measurements and their export.
+"""
+
+import asyncio
+import json
+
+from data_pipeline.metrics import MetricsRecorder, count
+
+def test_counts_of_concurrent_stages_do_not_mix(tmp_path):
+    recorder = MetricsRecorder(path=tmp_path / 'stages.jsonl')
+    started = asyncio.Event()
+
+    async def query(times):
+        for _ in range(times):
+            count('db_round_trips')
+            await asyncio.sleep(0)
+
+    async def stage(name, stage_name, times):
+        with recorder.measure(name, stage_name) as record:
+            record['rows'] = times
+            if name == 'a.csv':
+                started.set()
+            else:
+                await started.wait()
+            # Tasks started by the stage count towards it too
+            await asyncio.gather(query(times), asyncio.create_task(query(times)))
+            count('llm_requests', times * 10)
+
+    async def run():
+        await asyncio.gather(stage('a.csv', 'load', 3), stage('b.csv', 'load', 5), stage('a.csv', 'llm', 1))
+
+    asyncio.run(run())
+    count('db_round_trips')
+
+    assert recorder.totals[('a.csv', 'load')]['db_round_trips'] == 6
+    assert recorder.totals[('b.csv', 'load')]['db_round_trips'] == 10
+    assert recorder.totals[('a.csv', 'llm')]['db_round_trips'] == 2
+    assert recorder.totals[('b.csv', 'load')]['llm_requests'] == 50
+    records = [json.loads(line) for line in (tmp_path / 'stages.jsonl').read_text().splitlines()]
+    assert sorted((record['file'], record['stage'], record['rows']) for record in records) == [
+        ('a.csv', 'llm', 1), ('a.csv', 'load', 3), ('b.csv', 'load', 5)
+    ]
+    assert all(record['rows_per_second'] > 0 for record in records)
+
+def test_totals_add_up_over_runs_and_errors_are_recorded():
+    recorder = MetricsRecorder()
+    for rows in (2, 3):
+        with recorder.measure('a.csv', 'load') as record:
+            record['rows'] = rows
+    try:
+        with recorder.measure('a.csv', 'load'):
+            raise ValueError("bad row")
+    except ValueError:
+        pass
+
+    totals = recorder.totals[('a.csv', 'load')]
+    assert (totals['runs'], totals['rows']) == (3, 5)
+    assert 'a.csv' not in recorder.summary() and 'load:' in recorder.summary()
+
+def test_textfile_format(tmp_path):
+    textfile = tmp_path / 'pipeline.prom'
+    recorder = MetricsRecorder(textfile_path=textfile)
+    with recorder.measure('odd "name"\\\n.csv', 'load') as record:
+        record['rows'] = 10
+        count('db_seconds', 0.25)
+    with recorder.measure('b.csv', 'profile') as record:
+        record['bytes'] = 2 ** 40
+
+    lines = textfile.read_text().splitlines()
+
+    assert '# HELP data_pipeline_stage_rows_total Rows processed by the stage.' in lines
+    assert '# TYPE data_pipeline_stage_rows_total counter' in lines
+    assert 'data_pipeline_stage_rows_total{file="odd \\"name\\"\\\\\\n.csv",stage="load"} 10' in lines
+    assert 'data_pipeline_stage_db_seconds_total{file="odd \\"name\\"\\\\\\n.csv",stage="load"} 0.25' in lines
+    assert 'data_pipeline_stage_bytes_total{file="b.csv",stage="profile"} 1099511627776' in lines
+    assert 'data_pipeline_stage_runs_total{file="b.csv",stage="profile"} 1' in lines
+    # Counters a stage never set are left out
+    assert not any(line.startswith('data_pipeline_stage_rows_total{file="b.csv"') for line in lines)
+    samples = [line for line in lines if not line.startswith('#')]
+    assert all(len(line.rsplit(' ', 1)) == 2 and float(line.rsplit(' ', 1)[1]) >= 0 for line in samples)
+    assert not list(tmp_path.glob('.*.tmp'))
@@ -0,0 +1,70 @@
+"""
+Tests for taking a file through the stages of the pipeline.
+"""
+
+import asyncio
+
+import pytest
+
+from data_pipeline.ingest.files import CSVLoader
+from data_pipeline.pipeline import process_csv
+
+PROFILE = {'full_profile': {'x': {'total_count': 2}}}
+
+SQL_REPLY = "```sql\nUPDATE data SET x = x / 100;\n```"
+
+class Profiler:
+    async def profile_stored(self, file_path, running_profile):
+        return PROFILE
+
+    def generate_report(self, profile):
+        return ''
+
+class Manifest:
+    def __init__(self, action):
+        self.action = action
+
+    async def plan(self, db_name, file_path, table_name):
+        return {'action': self.action, 'profile_state': object()}
+
+class Ingestor:
+    async def ingest(self, file_path, db_name, table_name, keep_frame, plan, charts):
+        return PROFILE, None, {'x': 'INTEGER'}
+
+class Analyzer:
+    async def analyze_structure(self, profile, table_name):
+        return "Rescale x.", None
+
+    async def generate_sql_transformations(self, analysis, table_name):
+        return SQL_REPLY, None
+
+class DryRunner:
+    def __init__(self):
+        self.checked = []
+        self.applied = 0
+
+    async def check(self, db_name, table_name, statements):
+        self.checked.append(statements)
+        return {'statements': statements}
+
+    def summary(self, report):
+        return ''
+
+    async def apply(self, db_name, table_name, report):
+        self.applied += 1
+        return True
+
+@pytest.mark.parametrize('action, applied', [('load', 1), ('replace', 1), ('append', 0), ('skip', 0)])
+def test_generated_sql_is_applied_only_to_a_rebuilt_table(tmp_path, action, applied):
+    (tmp_path / 'data.csv').write_text('x\n1\n2\n')
+    dry_runner = DryRunner()
+
+    table_name, _, sql = asyncio.run(process_csv(
+        CSVLoader(tmp_path), None, Analyzer(), None, Profiler(), None, 'db', 'data.csv',
+        ingestor=Ingestor(), manifest=Manifest(action), dry_runner=dry_runner, apply_sql=True,
+        stages=('profile', 'load', 'llm')
+    ))
+
+    assert (table_name, sql) == ('data', SQL_REPLY)
+    assert dry_runner.applied == applied
+    assert len(dry_runner.checked) == applied
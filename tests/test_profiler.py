@@ -0,0 +1,117 @@
+"""
+Tests for the CSV profiler.
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_pipeline.executor import StageExecutor
+from data_pipeline.ingest.reader import CSVChunkReader
+from data_pipeline.profiling.profiler import DataProfiler, profile_state_from_dict, profile_state_to_dict
+
+# Statistics that do not depend on how the file was split into chunks
+EXACT_FIELDS = (
+    'total_count', 'null_count', 'max_length', 'boolean', 'temporal', 'date_format', 'has_time',
+    'numeric', 'integral', 'min', 'max', 'scale', 'sum', 'mean', 'unique_count'
+)
+
+@pytest.fixture
+def mixed_csv(tmp_path):
+    """CSV whose columns change dtype partway through, so chunks parse differently."""
+    rng = np.random.default_rng(7)
+    rows = 40000
+    code = rng.integers(0, 20, rows).astype(object)
+    code[30000:] = np.where(rng.random(rows - 30000) < 0.5, code[30000:].astype(str), 'X')
+    value = np.arange(rows).astype(object)
+    value[25000:] = [f"v{i}" for i in range(25000, rows)]
+    amount = np.round(rng.normal(100, 20, rows), 2)
+    amount[rng.random(rows) < 0.01] = np.nan
+    count = rng.integers(0, 50, rows).astype(float)
+    count[rng.random(rows) < 0.001] = np.nan
+    frame = pd.DataFrame({
+        'code': code,
+        'value': value,
+        'amount': amount,
+        'count': count,
+        'flag': rng.choice(['True', 'False'], rows),
+        'day': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, rows), unit='D'),
+        'city': rng.choice(['Asheville', 'Boone', 'Durham', '0'], rows)
+    })
+    path = tmp_path / 'mixed.csv'
+    frame.to_csv(path, index=False)
+    return path
+
+def profile(path, **kwargs):
+    """Full profile of a CSV file."""
+    return asyncio.run(DataProfiler(**kwargs).profile_csv(str(path)))['full_profile']
+
+def test_parallel_profile_matches_serial(mixed_csv):
+    serial = profile(mixed_csv, chunk_bytes=64 * 1024)
+    parallel = profile(mixed_csv, chunk_bytes=64 * 1024, workers=2, parallel_min_bytes=0)
+
+    assert serial.keys() == parallel.keys()
+    for column, info in serial.items():
+        for field in EXACT_FIELDS:
+            assert info.get(field) == parallel[column].get(field), f"{column}.{field}"
+        # Top values are exact as long as the sketch can hold every distinct value
+        if info['unique_count'] < 100:
+            assert info['top_values'] == parallel[column]['top_values'], column
+
+def test_parallel_profile_runs_in_the_shared_pool(mixed_csv):
+    executor = StageExecutor(process_workers=2)
+    try:
+        parallel = profile(mixed_csv, chunk_bytes=64 * 1024, workers=2, parallel_min_bytes=0, executor=executor)
+        pool = executor._processes
+        assert pool is not None
+        profile(mixed_csv, chunk_bytes=64 * 1024, workers=2, parallel_min_bytes=0, executor=executor)
+        assert executor._processes is pool
+    finally:
+        executor.shutdown()
+
+    serial = profile(mixed_csv, chunk_bytes=64 * 1024)
+    for column, info in serial.items():
+        for field in EXACT_FIELDS:
+            assert info.get(field) == parallel[column].get(field), f"{column}.{field}"
+
+def test_values_count_the_same_whatever_their_chunk_dtype(mixed_csv):
+    full_profile = profile(mixed_csv, chunk_bytes=64 * 1024)
+
+    # 0..19 read as integers in early chunks and as text later, plus 'X'
+    assert full_profile['code']['unique_count'] == 21
+    top_codes = [value for value, _ in full_profile['code']['top_values']]
+    assert len(top_codes) == len({str(value) for value in top_codes})
+    assert not full_profile['value']['numeric']
+    assert full_profile['flag']['boolean']
+    assert full_profile['day']['date_detected']
+
+def test_profile_state_resumes_from_json(mixed_csv):
+    profiler = DataProfiler()
+    chunks = list(CSVChunkReader(mixed_csv, chunk_rows=5000))
+    single_pass: dict = {}
+    resumed: dict = {}
+    for index, chunk in enumerate(chunks):
+        profiler.update_profile(single_pass, chunk)
+        profiler.update_profile(resumed, chunk)
+        # Store and restore the running profile after every chunk, as appends do
+        resumed = profile_state_from_dict(json.loads(json.dumps(profile_state_to_dict(resumed), allow_nan=False)))
+
+    expected = profiler.finalize_profile(single_pass)
+    actual = profiler.finalize_profile(resumed)
+    assert list(actual) == list(expected)
+    for column, info in expected.items():
+        for field in EXACT_FIELDS + ('top_values', 'examples', 'variance', 'median', 'p99'):
+            if field in info:
+                assert actual[column][field] == info[field], f"{column}.{field}"
+
+def test_profile_state_of_another_version_is_refused(mixed_csv):
+    state = profile_state_to_dict(DataProfiler().profile_chunk(next(iter(CSVChunkReader(mixed_csv)))))
+
+    with pytest.raises(ValueError):
+        profile_state_from_dict(dict(state, version=0))
+    state['columns'][0][1]['distinct_sketch']['version'] = 0
+    with pytest.raises(ValueError):
+        profile_state_from_dict(state)
@@ -0,0 +1,73 @@
+"""
+Tests for the record-aligned CSV chunk reader.
+"""
+
+import pandas as pd
+import pytest
+
+from data_pipeline.ingest.reader import CSVChunkReader, find_row_start
+
+@pytest.fixture
+def quoted_csv(tmp_path):
+    """CSV file whose quoted fields hold newlines, commas and escaped quotes."""
+    rows = []
+    for i in range(500):
+        note = f'line one\nline "" two, {i}\n\nend' if i % 3 == 0 else f"plain {i}"
+        rows.append(f'{i},"{note}",{i * 0.5}\n')
+    path = tmp_path / 'quoted.csv'
+    path.write_bytes(('\ufeffid,note,value\n' + ''.join(rows)).encode('utf-8'))
+    return path
+
+def test_find_row_start_skips_newlines_inside_quotes():
+    data = b'a,b\n1,"x\ny\nz"\n2,w\n'
+    first_row = data.index(b'1')
+
+    assert find_row_start(data, 0, 0, len(data)) == first_row
+    # Every offset inside the quoted row resolves to the start of the next row
+    for target in range(first_row, data.index(b'2')):
+        assert find_row_start(data, first_row, target, len(data)) == data.index(b'2')
+    assert find_row_start(data, first_row, len(data) - 1, len(data)) == len(data)
+
+def test_find_row_start_treats_escaped_quotes_as_text():
+    data = b'1,"say ""hi""\nthere"\n2,x\n'
+
+    assert find_row_start(data, 0, 3, len(data)) == data.index(b'2')
+
+def test_find_row_start_stops_at_end():
+    data = b'1,"open\n2,x\n'
+
+    assert find_row_start(data, 0, 2, len(data)) == len(data)
+    assert find_row_start(data, 0, 20, 10) == 10
+
+@pytest.mark.parametrize('parts', [1, 2, 7, 64, 5000])
+def test_split_ranges_cover_every_row_once(quoted_csv, parts):
+    reader = CSVChunkReader(quoted_csv, chunk_bytes=4096)
+    ranges = reader.split_ranges(parts)
+
+    assert ranges[0][0] == reader.data_start
+    assert ranges[-1][1] == quoted_csv.stat().st_size
+    assert all(start < end for start, end in ranges)
+    assert all(previous[1] == current[0] for previous, current in zip(ranges, ranges[1:]))
+    dtypes = reader.read_dtypes()
+    parsed = pd.concat(
+        [chunk for start, end in ranges for chunk in
+         CSVChunkReader(quoted_csv, chunk_bytes=4096, dtypes=dtypes).iter_range(start, end)],
+        ignore_index=True
+    )
+    expected = pd.read_csv(quoted_csv, encoding='utf-8-sig')
+    pd.testing.assert_frame_equal(parsed, expected)
+
+@pytest.mark.parametrize('chunk_rows, chunk_bytes', [(37, None), (None, 1000)])
+def test_chunks_match_a_single_read(quoted_csv, chunk_rows, chunk_bytes):
+    chunks = list(CSVChunkReader(quoted_csv, chunk_rows=chunk_rows, chunk_bytes=chunk_bytes))
+
+    if chunk_rows:
+        assert all(len(chunk) == chunk_rows for chunk in chunks[:-1])
+    combined = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(combined, pd.read_csv(quoted_csv, encoding='utf-8-sig'))
+
+def test_split_ranges_of_empty_file(tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_bytes(b'')
+
+    assert CSVChunkReader(path).split_ranges(4) == []
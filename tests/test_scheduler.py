@@ -0,0 +1,74 @@
+"""
+Tests for admitting files by memory and limiting the files in each stage.
+"""
+
+import asyncio
+
+from data_pipeline.scheduler import PipelineScheduler
+
+def test_stage_concurrency_never_exceeds_its_limit():
+    scheduler = PipelineScheduler(stage_limits={'load': 2, 'llm': 3})
+    active = {'load': 0, 'llm': 0}
+    peak = {'load': 0, 'llm': 0}
+
+    async def worker(name):
+        for stage in ('load', 'llm'):
+            async with scheduler.stage(name, stage):
+                active[stage] += 1
+                peak[stage] = max(peak[stage], active[stage])
+                # The LLM is slow, so files queue up behind its limit
+                await asyncio.sleep(0.01 if stage == 'load' else 0.05)
+                active[stage] -= 1
+        return name
+
+    results = asyncio.run(scheduler.run({f'f{i}.csv': 1 for i in range(8)}, worker))
+
+    assert peak == {'load': 2, 'llm': 3}
+    assert results == {f'f{i}.csv': f'f{i}.csv' for i in range(8)}
+    assert all(status['status'] == 'done' for status in scheduler.statuses.values())
+
+def test_memory_reservation_blocks_until_released():
+    scheduler = PipelineScheduler(memory_budget=100, memory_factor=1.0)
+    events = []
+
+    async def worker(name):
+        events.append(f'start {name}')
+        await asyncio.sleep(0.02)
+        events.append(f'end {name}')
+
+    # Largest first; b does not fit next to a, c does not fit next to b
+    asyncio.run(scheduler.run({'c.csv': 50, 'a.csv': 80, 'b.csv': 60}, worker))
+
+    assert events == ['start a.csv', 'end a.csv', 'start b.csv', 'end b.csv', 'start c.csv', 'end c.csv']
+    assert scheduler._reserved == 0
+
+def test_small_files_share_the_budget_and_large_ones_run_alone():
+    scheduler = PipelineScheduler(memory_budget=100, memory_factor=1.0)
+    running = []
+    peak = []
+
+    async def worker(name):
+        running.append(name)
+        peak.append(sorted(running))
+        await asyncio.sleep(0.01)
+        running.remove(name)
+
+    asyncio.run(scheduler.run({'huge.csv': 1000, 'x.csv': 30, 'y.csv': 30}, worker))
+
+    assert scheduler.estimate_memory(1000) == 100
+    assert peak == [['huge.csv'], ['x.csv'], ['x.csv', 'y.csv']]
+
+def test_failed_worker_releases_its_memory():
+    scheduler = PipelineScheduler(memory_budget=100, memory_factor=1.0)
+
+    async def worker(name):
+        if name == 'bad.csv':
+            raise RuntimeError("broken file")
+        return 'ok'
+
+    results = asyncio.run(scheduler.run({'bad.csv': 90, 'good.csv': 90}, worker))
+
+    assert results == {'bad.csv': None, 'good.csv': 'ok'}
+    assert scheduler.statuses['bad.csv']['status'] == 'failed'
+    assert scheduler.statuses['bad.csv']['error'] == 'broken file'
+    assert 'bad.csv (0.0 MB): failed [total 0.0s] at admission: broken file' in scheduler.summary()
@@ -0,0 +1,161 @@
+"""
+Tests for the mergeable profiling sketches.
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_pipeline.profiling.sketches import (
+    ExactSum, HyperLogLog, KLLSketch, Reservoir, RunningMoments, SpaceSaving
+)
+
+def split(values: pd.Series, parts: int = 2):
+    bounds = np.linspace(0, len(values), parts + 1).astype(int)
+    return [values.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+def test_hyperloglog_merge_equals_single_pass():
+    values = pd.Series(np.arange(50000) % 20000)
+    whole = HyperLogLog()
+    whole.update(values)
+    first, second = HyperLogLog(), HyperLogLog()
+    for sketch, part in zip((first, second), split(values)):
+        sketch.update(part)
+
+    merged = first.merge(second)
+
+    assert np.array_equal(merged.registers, whole.registers)
+    assert merged.estimate() == pytest.approx(20000, rel=0.05)
+
+def test_hyperloglog_hashes_numbers_and_text_apart():
+    sketch = HyperLogLog()
+    sketch.update(pd.Series([1, 2, 3]))
+    sketch.update(pd.Series(['1', '2', '3', 'a']))
+    sketch.update(pd.Series([1.0, 2.0]))
+
+    assert sketch.estimate() == 7
+
+def test_hyperloglog_rejects_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+def test_space_saving_merge_is_exact_below_capacity():
+    values = pd.Series(['a'] * 50 + ['b'] * 30 + ['c'] * 20 + ['d'] * 5).sample(frac=1, random_state=0)
+    first, second = SpaceSaving(capacity=8), SpaceSaving(capacity=8)
+    for sketch, part in zip((first, second), split(values)):
+        sketch.update(part)
+
+    merged = first.merge(second)
+
+    assert merged.top() == [('a', 50), ('b', 30), ('c', 20), ('d', 5)]
+
+def test_space_saving_merge_keeps_heavy_hitters_above_capacity():
+    rng = np.random.default_rng(0)
+    noise = rng.integers(1000, 100000, size=20000)
+    values = pd.Series(np.concatenate([noise, np.repeat([1, 2, 3], [3000, 2000, 1000])]))
+    values = values.sample(frac=1, random_state=0)
+    parts = split(values, 4)
+    sketches = [SpaceSaving(capacity=32) for _ in parts]
+    for sketch, part in zip(sketches, parts):
+        sketch.update(part)
+
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    top = merged.top(3)
+
+    assert [value for value, _ in top] == [1, 2, 3]
+    # Guaranteed counts never exceed the true ones
+    assert all(count <= true for (_, count), true in zip(top, (3000, 2000, 1000)))
+    assert len(merged.counts) <= 32
+
+def test_reservoir_merge_samples_both_parts():
+    first, second = Reservoir(size=20, seed=1), Reservoir(size=20, seed=2)
+    first.update(pd.Series(np.arange(1000)))
+    second.update(pd.Series(np.arange(1000, 2000)))
+
+    merged = first.merge(second)
+
+    assert merged.seen == 2000
+    assert len(merged.items) == 20
+    assert any(item < 1000 for item in merged.items)
+    assert any(item >= 1000 for item in merged.items)
+
+def test_exact_sum_is_independent_of_the_split():
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.normal(0, 1e6, 10000) * 10.0 ** rng.integers(-8, 8, 10000))
+    whole = ExactSum()
+    whole.update(values)
+    parts = [ExactSum() for _ in range(3)]
+    for sketch, part in zip(parts, split(values[::-1], 3)):
+        sketch.update(part)
+
+    merged = parts[2].merge(parts[0]).merge(parts[1])
+
+    assert merged.value() == whole.value() == math.fsum(values)
+    assert merged.mean(len(values)) == whole.mean(len(values))
+
+def test_exact_sum_keeps_infinities():
+    sketch = ExactSum()
+    sketch.update(pd.Series([1.0, np.inf]))
+
+    assert sketch.value() == np.inf
+
+def test_running_moments_merge_matches_numpy():
+    values = pd.Series(np.random.default_rng(0).lognormal(3, 1, 10001))
+    parts = [RunningMoments() for _ in range(3)]
+    for sketch, part in zip(parts, split(values, 3)):
+        sketch.update(part)
+
+    merged = parts[0].merge(parts[1]).merge(parts[2]).merge(RunningMoments())
+
+    assert merged.count == len(values)
+    assert merged.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert merged.variance == pytest.approx(values.var(ddof=1), rel=1e-9)
+
+def test_kll_merge_stays_within_rank_error():
+    values = pd.Series(np.random.default_rng(0).permutation(100000).astype(float))
+    parts = [KLLSketch(k=200, seed=seed) for seed in range(4)]
+    for sketch, part in zip(parts, split(values, 4)):
+        sketch.update(part)
+
+    merged = parts[0]
+    for sketch in parts[1:]:
+        merged.merge(sketch)
+    qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+    estimates = merged.quantiles(qs)
+
+    assert merged.count == len(values)
+    for q, estimate in zip(qs, estimates):
+        assert abs(estimate / len(values) - q) < 0.02
+    assert merged.cdf([50000])[0] == pytest.approx(0.5, abs=0.02)
+
+def test_empty_sketches_merge_into_empty_results():
+    assert math.isnan(KLLSketch().merge(KLLSketch()).quantiles([0.5])[0])
+    assert math.isnan(RunningMoments().merge(RunningMoments()).variance)
+    assert HyperLogLog().merge(HyperLogLog()).estimate() == 0
+    assert SpaceSaving().merge(SpaceSaving()).top() == []
+
+@pytest.mark.filterwarnings("ignore:invalid value:RuntimeWarning")
+def test_sketches_round_trip_through_json_with_infinities():
+    values = pd.Series(np.concatenate([np.random.default_rng(0).normal(0, 1, 5000), [np.inf, -np.inf]]))
+    sketches = [HyperLogLog(), SpaceSaving(capacity=16), Reservoir(size=2000), ExactSum(), RunningMoments(), KLLSketch()]
+    for sketch in sketches:
+        sketch.update(values)
+
+    for sketch in sketches:
+        restored = type(sketch).from_dict(json.loads(json.dumps(sketch.to_dict(), allow_nan=False)))
+        # Restored sketches continue exactly like the originals
+        sketch.update(values)
+        restored.update(values)
+        assert json.dumps(restored.to_dict()) == json.dumps(sketch.to_dict()), type(sketch).__name__
+
+def test_sketch_state_of_another_version_is_refused():
+    state = HyperLogLog().to_dict()
+    state['version'] += 1
+
+    with pytest.raises(ValueError):
+        HyperLogLog.from_dict(state)
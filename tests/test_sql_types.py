@@ -0,0 +1,100 @@
+"""
+Tests for SQL type inference from profile statistics.
+"""
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+from data_pipeline.cleaning.sql_types import infer_sql_types, widen_sql_type
+from data_pipeline.profiling.profiler import DataProfiler
+
+def stats(**overrides):
+    """Profile statistics of a column with ten non-null text values."""
+    info = {
+        'total_count': 10, 'null_count': 0, 'numeric': False, 'integral': False,
+        'boolean': False, 'temporal': False, 'date_format': None, 'has_time': False,
+        'max_length': 5, 'min': None, 'max': None, 'scale': None
+    }
+    info.update(overrides)
+    return info
+
+def number(low, high, scale=0):
+    return stats(numeric=True, integral=scale == 0, min=low, max=high, scale=scale)
+
+@pytest.mark.parametrize('info, expected', [
+    (number(-32768, 32767), 'SMALLINT'),
+    (number(0, 32768), 'INTEGER'),
+    (number(-2 ** 31, 2 ** 31 - 1), 'INTEGER'),
+    (number(0, 2 ** 31), 'BIGINT'),
+    (number(-2 ** 62, 2 ** 62), 'BIGINT'),
+    (number(0, 2 ** 63), 'NUMERIC(19,0)'),
+    (number(-10 ** 30, 1), 'NUMERIC(31,0)'),
+    (number(0.5, 999.25, scale=2), 'REAL'),
+    (number(0.5, 99999.25, scale=2), 'DOUBLE PRECISION'),
+    (number(0.1, 0.3, scale=None), 'DOUBLE PRECISION'),
+    (stats(boolean=True), 'BOOLEAN'),
+    (stats(temporal=True, date_format='%Y-%m-%d'), 'DATE'),
+    (stats(temporal=True, date_format='%Y-%m-%d %H:%M:%S', has_time=True), 'TIMESTAMP'),
+    (stats(temporal=True, date_format=None), 'VARCHAR(5)'),
+    (stats(max_length=0), 'VARCHAR(1)'),
+    (stats(max_length=20000000), 'TEXT'),
+    (stats(null_count=10, numeric=True, integral=True), 'TEXT'),
+])
+def test_infer_sql_types(info, expected):
+    assert infer_sql_types({'column': info}) == {'column': expected}
+
+@pytest.mark.parametrize('info, expected', [
+    (number(0.5, 999.25, scale=2), 'NUMERIC(5,2)'),
+    (number(0.5, 99999.25, scale=2), 'NUMERIC(7,2)'),
+    (number(-0.25, 0.75, scale=2), 'NUMERIC(2,2)'),
+    (number(0.5, 999.123456, scale=6), 'DOUBLE PRECISION'),
+    (number(0.1, 0.3, scale=None), 'DOUBLE PRECISION'),
+    (number(0, 2 ** 31), 'BIGINT'),
+])
+def test_infer_sql_types_with_exact_decimals(info, expected):
+    assert infer_sql_types({'column': info}, exact_decimals=True) == {'column': expected}
+
+def test_infer_sql_types_keeps_column_order():
+    column_stats = {'b': stats(boolean=True), 'a': number(1, 2), 'c': stats()}
+
+    assert list(infer_sql_types(column_stats)) == ['b', 'a', 'c']
+    assert infer_sql_types({}) == {}
+
+def test_infer_sql_types_from_a_profile(tmp_path):
+    path = tmp_path / 'people.csv'
+    pd.DataFrame({
+        'id': range(1, 1001),
+        'population': [3_000_000_000 + i for i in range(1000)],
+        'score': [round(i / 7, 2) for i in range(1000)],
+        'active': ['True', 'False'] * 500,
+        'joined': pd.date_range('2024-01-01', periods=1000).strftime('%Y-%m-%d'),
+        'name': [f"person {i}" for i in range(1000)],
+    }).to_csv(path, index=False)
+    profile = asyncio.run(DataProfiler().profile_csv(str(path)))['full_profile']
+
+    assert infer_sql_types(profile) == {
+        'id': 'SMALLINT',
+        'population': 'BIGINT',
+        'score': 'REAL',
+        'active': 'BOOLEAN',
+        'joined': 'DATE',
+        'name': 'VARCHAR(10)',
+    }
+
+@pytest.mark.parametrize('current, required, expected', [
+    ('SMALLINT', 'SMALLINT', 'SMALLINT'),
+    ('SMALLINT', 'BIGINT', 'BIGINT'),
+    ('INTEGER', 'REAL', 'REAL'),
+    ('DATE', 'TIMESTAMP', 'TIMESTAMP'),
+    ('VARCHAR(20)', 'VARCHAR(10)', 'VARCHAR(20)'),
+    ('VARCHAR(10)', 'VARCHAR(40)', 'VARCHAR(40)'),
+    ('VARCHAR(10)', 'TEXT', 'TEXT'),
+    ('TEXT', 'INTEGER', 'TEXT'),
+    ('INTEGER', 'VARCHAR(3)', 'TEXT'),
+    ('BOOLEAN', 'SMALLINT', 'TEXT'),
+    ('DATE', 'BIGINT', 'TEXT'),
+])
+def test_widen_sql_type(current, required, expected):
+    assert widen_sql_type(current, required) == expected
@@ -0,0 +1,107 @@
+"""
+Tests for composing transformation specs into one SELECT list.
+"""
+
+import pytest
+
+from data_pipeline.transform.transformer import MLB_BAT_TRACKING_TRANSFORMATIONS, TransformationEngine
+
+MLB_COLUMNS = [
+    'player', 'avg_bat_speed', 'percent_swings_competitive', 'batter_run_value',
+    'contact', 'swings_competitive', 'whiffs', 'whiff_per_swing'
+]
+
+def build(columns, transformations):
+    return TransformationEngine(pools=None).build_select(columns, transformations)
+
+def expressions(select):
+    return {column: entry['expression'] for column, entry in select.items() if entry['changed']}
+
+def test_mlb_spec():
+    renames, select, caps = build(MLB_COLUMNS, MLB_BAT_TRACKING_TRANSFORMATIONS)
+    cap = (
+        '(CASE WHEN "batter_run_value" > __cap0_upper__ THEN __cap0_upper__ '
+        'WHEN "batter_run_value" < __cap0_lower__ THEN __cap0_lower__ ELSE "batter_run_value" END)'
+    )
+    whiffs = 'CAST("whiffs" AS FLOAT) / NULLIF("swings_competitive", 0)'
+
+    assert renames == [('avg_bat_speed', 'average_bat_speed')]
+    # Columns keep their positions; the derived one comes last
+    assert list(select) == [
+        'player', 'average_bat_speed', 'percent_swings_competitive', 'batter_run_value',
+        'contact', 'swings_competitive', 'whiffs', 'whiff_per_swing', 'contact_rate'
+    ]
+    assert expressions(select) == {
+        'percent_swings_competitive': '("percent_swings_competitive" / 100)',
+        'batter_run_value': cap,
+        'contact_rate': 'CAST("contact" AS FLOAT) / NULLIF("swings_competitive", 0)',
+        'whiff_per_swing': (
+            f'(CASE WHEN ABS("whiff_per_swing" - ({whiffs})) > 0.0001 THEN {whiffs} ELSE "whiff_per_swing" END)'
+        ),
+    }
+    assert select['contact_rate']['type'] == 'FLOAT'
+    assert select['average_bat_speed']['source'] == 'avg_bat_speed'
+    assert caps == [{'marker': '__cap0', 'expression': '"batter_run_value"', 'stddevs': 3, 'source': 'batter_run_value'}]
+
+def test_rename_chain_renames_once_per_step_and_uses_the_final_name():
+    renames, select, _ = build(['a', 'b'], [
+        {'op': 'rename', 'column': 'a', 'to': 'x'},
+        {'op': 'scale', 'column': 'x', 'factor': 2},
+        {'op': 'rename', 'column': 'x', 'to': 'y'},
+        {'op': 'scale', 'column': 'y', 'divisor': 4},
+    ])
+
+    assert renames == [('a', 'x'), ('x', 'y')]
+    assert list(select) == ['y', 'b']
+    assert expressions(select) == {'y': '(("y" * 2) / 4)'}
+    assert select['y']['source'] == 'a'
+
+def test_derived_column_renamed_and_capped():
+    renames, select, caps = build(['a', 'b'], [
+        {'op': 'derive', 'column': 'ratio', 'expression': '{a} / NULLIF({b}, 0)', 'type': 'FLOAT'},
+        {'op': 'scale', 'column': 'a', 'factor': 10},
+        {'op': 'rename', 'column': 'ratio', 'to': 'share'},
+        {'op': 'cap', 'column': 'share', 'lower': 0, 'upper': 1.5},
+        {'op': 'cap', 'column': 'a', 'stddevs': 2},
+    ])
+
+    # Derived columns are only named in the select list
+    assert renames == []
+    assert list(select) == ['a', 'b', 'share']
+    assert select['share'] == {
+        'expression': '(CASE WHEN "a" / NULLIF("b", 0) > 1.5 THEN 1.5 WHEN "a" / NULLIF("b", 0) < 0 THEN 0 '
+                      'ELSE "a" / NULLIF("b", 0) END)',
+        'changed': True, 'type': 'FLOAT', 'source': None
+    }
+    # The scaled column has no profile statistics to take the cap bounds from
+    assert caps == [{'marker': '__cap0', 'expression': '("a" * 10)', 'stddevs': 2, 'source': None}]
+
+def test_swap_through_a_free_name():
+    renames, select, _ = build(['a', 'b', 'c'], [
+        {'op': 'rename', 'column': 'a', 'to': 'tmp'},
+        {'op': 'rename', 'column': 'b', 'to': 'a'},
+        {'op': 'rename', 'column': 'tmp', 'to': 'b'},
+        {'op': 'scale', 'column': 'a', 'factor': 2},
+    ])
+
+    assert renames == [('a', 'tmp'), ('b', 'a'), ('tmp', 'b')]
+    assert [(column, entry['source']) for column, entry in select.items()] == [('b', 'a'), ('a', 'b'), ('c', 'c')]
+    assert expressions(select) == {'a': '("a" * 2)'}
+
+def test_rename_onto_an_existing_column_is_refused():
+    with pytest.raises(ValueError, match='existing column b'):
+        build(['a', 'b'], [
+            {'op': 'rename', 'column': 'a', 'to': 'b'},
+            {'op': 'rename', 'column': 'b', 'to': 'a'},
+        ])
+
+@pytest.mark.parametrize('step', [
+    {'op': 'explode', 'column': 'a'},
+    {'op': 'rename', 'column': 'a'},
+    {'op': 'cap', 'column': 'a'},
+    {'op': 'scale', 'column': 'missing', 'factor': 2},
+    {'op': 'derive', 'column': 'd', 'expression': '{missing} + 1', 'type': 'INTEGER'},
+])
+def test_malformed_steps_are_refused(step):
+    with pytest.raises(ValueError):
+        build(['a'], [step])
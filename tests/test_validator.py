@@ -0,0 +1,90 @@
+"""
+Tests for compiling validation rules into one aggregate query.
+"""
+
+import pytest
+
+from data_pipeline.transform.validator import MLB_BAT_TRACKING_RULES, TableValidator
+
+compile_rule = TableValidator.compile_rule
+
+@pytest.mark.parametrize('rule, expected', [
+    (
+        {'rule': 'range', 'column': 'score', 'min': 0, 'max': 1.5},
+        ('range:score', 'COUNT(*) FILTER (WHERE "score" < 0 OR "score" > 1.5)')
+    ),
+    (
+        {'rule': 'range', 'column': 'score', 'max': 1, 'allow_null': False, 'name': 'bounded'},
+        ('bounded', 'COUNT(*) FILTER (WHERE "score" > 1 OR "score" IS NULL)')
+    ),
+    (
+        {'rule': 'not_null', 'column': 'id'},
+        ('not_null:id', 'COUNT(*) FILTER (WHERE "id" IS NULL)')
+    ),
+    (
+        {'rule': 'ratio', 'column': 'rate', 'numerator': 'hits', 'denominator': 'tries', 'tolerance': 0.01},
+        ('ratio:rate', 'COUNT(*) FILTER (WHERE ABS("rate" - CAST("hits" AS FLOAT) / NULLIF("tries", 0)) > 0.01)')
+    ),
+    (
+        {'rule': 'unique', 'column': 'id'},
+        ('unique:id', 'COUNT("id") - COUNT(DISTINCT "id")')
+    ),
+    (
+        {'rule': 'unique', 'columns': ['team', 'year']},
+        (
+            'unique:team,year',
+            'COUNT(*) FILTER (WHERE "team" IS NOT NULL AND "year" IS NOT NULL) - '
+            'COUNT(DISTINCT ("team", "year")) FILTER (WHERE "team" IS NOT NULL AND "year" IS NOT NULL)'
+        )
+    ),
+])
+def test_compile_rule(rule, expected):
+    assert compile_rule(rule) == expected
+
+def test_column_names_are_quoted():
+    name, term = compile_rule({'rule': 'ratio', 'column': 'Rate "%"', 'numerator': 'a"b', 'denominator': 'c d'})
+
+    assert name == 'ratio:Rate "%"'
+    assert term == 'COUNT(*) FILTER (WHERE ABS("Rate ""%""" - CAST("a""b" AS FLOAT) / NULLIF("c d", 0)) > 0)'
+    assert compile_rule({'rule': 'unique', 'columns': ['x"y', 'z']})[1].startswith(
+        'COUNT(*) FILTER (WHERE "x""y" IS NOT NULL AND "z" IS NOT NULL)'
+    )
+
+@pytest.mark.parametrize('rule', [
+    {'rule': 'range', 'column': 'x'},
+    {'rule': 'ratio', 'column': 'x', 'numerator': 'a'},
+    {'rule': 'not_null'},
+    {'rule': 'matches', 'column': 'x'},
+])
+def test_incomplete_or_unknown_rules_are_refused(rule):
+    with pytest.raises(ValueError):
+        compile_rule(rule)
+
+def test_build_query_checks_every_rule_in_one_scan():
+    validator = TableValidator(pools=None)
+    terms = [compile_rule(rule) for rule in MLB_BAT_TRACKING_RULES]
+
+    query = validator.build_query('bat "tracking"', terms)
+
+    assert query == (
+        'SELECT COUNT(*) AS rows_checked, '
+        'COUNT(*) FILTER (WHERE "percent_swings_competitive" > 1) AS rule_0, '
+        'COUNT(*) FILTER (WHERE "contact_rate" < 0 OR "contact_rate" > 1 OR "contact_rate" IS NULL) AS rule_1, '
+        'COUNT(*) FILTER (WHERE ABS("whiff_per_swing" - CAST("whiffs" AS FLOAT) / NULLIF("swings_competitive", 0)) '
+        '> 0.0001) AS rule_2 '
+        'FROM "bat ""tracking"""'
+    )
+
+@pytest.mark.parametrize('method, percent, seed, clause', [
+    ('SYSTEM', None, 7, ''),
+    ('SYSTEM', 5, None, ' TABLESAMPLE SYSTEM (5.0)'),
+    ('BERNOULLI', 0.5, 42, ' TABLESAMPLE BERNOULLI (0.5) REPEATABLE (42)'),
+])
+def test_sample_clause(method, percent, seed, clause):
+    query = TableValidator(pools=None, sample_method=method).build_query('t', [], percent, seed)
+
+    assert query == f'SELECT COUNT(*) AS rows_checked FROM "t"{clause}'
+
+def test_unknown_sample_method_is_refused():
+    with pytest.raises(ValueError):
+        TableValidator(pools=None, sample_method='RANDOM')